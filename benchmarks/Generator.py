@@ -0,0 +1,94 @@
+import numpy
+
+LAYOUTS = {
+    'rotation': (['Xposition', 'Yposition', 'Zposition', 'Zrotation', 'Xrotation', 'Yrotation'], ['Zrotation', 'Xrotation', 'Yrotation']),
+    'position': (['Xposition', 'Yposition', 'Zposition', 'Zrotation', 'Xrotation', 'Yrotation'], ['Xposition', 'Yposition', 'Zposition', 'Zrotation', 'Xrotation', 'Yrotation']),
+    'mixed': (['Xposition', 'Yposition', 'Zposition', 'Zrotation', 'Yrotation', 'Xrotation'], None),
+}
+_MIXED_CHANNELS = [
+    ['Zrotation', 'Xrotation', 'Yrotation'],
+    ['Xrotation', 'Yrotation', 'Zrotation'],
+    ['Yrotation', 'Zrotation', 'Xrotation'],
+    ['Zrotation', 'Yrotation', 'Xrotation'],
+    ['Xposition', 'Yposition', 'Zposition', 'Zrotation', 'Xrotation', 'Yrotation'],
+]
+
+
+def generateBvh(path: str, joints: int = 20, depth: int = 5, frames: int = 100, channels: str = 'rotation', frameTime: float = 1 / 30, seed: int = 0) -> str:
+    """Writes a synthetic .bvh file with the given size, the same arguments always create the same file.
+    - The longest chain from the root to a leaf has exactly depth joints, all other joints are attached randomly above that depth.
+    - Channels select the layout of the joints:
+        - 'rotation' -> Root with position and rotation, all other joints with rotation only, as in most captures.
+        - 'position' -> All joints with position and rotation channels.
+        - 'mixed' -> Rotation orders and position channels vary from joint to joint.
+    - The motion is a sum of slow sine waves per channel, so neighbouring frames are similar as in recorded data.
+    - The file is written without bvhio, so it does not change with the version under test.
+
+    Returns the path of the file."""
+    if joints < 1: raise ValueError('joints must be at least 1')
+    if not 1 <= depth <= joints: raise ValueError('depth must be between 1 and the number of joints')
+    if depth == 1 and joints > 1: raise ValueError('depth must be at least 2 if there is more than one joint')
+    if frames < 1: raise ValueError('frames must be at least 1')
+    if channels not in LAYOUTS: raise ValueError(f'channels must be one of {list(LAYOUTS)}')
+
+    random = numpy.random.default_rng(seed)
+    parents, depths = _createTree(random, joints, depth)
+    layout = [_selectChannels(random, channels, index) for index in range(joints)]
+    offsets = random.uniform(-1, 1, (joints, 3)) * 10
+    offsets[0] = 0
+    children = [[] for _ in range(joints)]
+    for index, parent in enumerate(parents[1:], start=1):
+        children[parent].append(index)
+
+    lines = ['HIERARCHY']
+    _writeJoint(lines, 0, children, layout, offsets, 0)
+    lines.extend(['MOTION', f'Frames: {frames}', f'Frame Time: {frameTime}'])
+
+    motion = _createMotion(random, [channel for joint in layout for channel in joint], frames)
+    with open(path, 'w') as file:
+        file.write('\n'.join(lines) + '\n')
+        numpy.savetxt(file, motion, fmt='%.4f')
+    return path
+
+
+def _createTree(random: numpy.random.Generator, joints: int, depth: int) -> tuple[list[int], list[int]]:
+    # a chain guarantees the depth, the other joints are spread over the levels above it
+    parents, depths = [-1], [0]
+    for index in range(1, joints):
+        if index < depth: parent = index - 1
+        else: parent = int(random.choice([joint for joint in range(index) if depths[joint] < depth - 1]))
+        parents.append(parent)
+        depths.append(depths[parent] + 1)
+    return parents, depths
+
+
+def _selectChannels(random: numpy.random.Generator, channels: str, index: int) -> list[str]:
+    rootChannels, jointChannels = LAYOUTS[channels]
+    if index == 0: return list(rootChannels)
+    if jointChannels is None: return list(_MIXED_CHANNELS[random.integers(len(_MIXED_CHANNELS))])
+    return list(jointChannels)
+
+
+def _writeJoint(lines: list[str], index: int, children: list[list[int]], layout: list[list[str]], offsets: numpy.ndarray, indent: int) -> None:
+    space = '  ' * indent
+    lines.append(f'{space}{"ROOT" if index == 0 else "JOINT"} Joint{index}')
+    lines.append(f'{space}{{')
+    lines.append(f'{space}  OFFSET {offsets[index, 0]:.4f} {offsets[index, 1]:.4f} {offsets[index, 2]:.4f}')
+    lines.append(f'{space}  CHANNELS {len(layout[index])} {" ".join(layout[index])}')
+    for child in children[index]:
+        _writeJoint(lines, child, children, layout, offsets, indent + 1)
+    if not children[index]:
+        lines.extend([f'{space}  End Site', f'{space}  {{', f'{space}    OFFSET 0.0000 1.0000 0.0000', f'{space}  }}'])
+    lines.append(f'{space}}}')
+
+
+def _createMotion(random: numpy.random.Generator, channels: list[str], frames: int) -> numpy.ndarray:
+    time = numpy.arange(frames)[:, None] / 30
+    amplitudes = numpy.array([10.0 if 'position' in channel else 60.0 for channel in channels])
+    offsets = random.uniform(-1, 1, len(channels)) * amplitudes
+    motion = numpy.repeat(offsets[None, :], frames, axis=0)
+    for _ in range(3):
+        frequencies = random.uniform(0.1, 2, len(channels))
+        phases = random.uniform(0, 2 * numpy.pi, len(channels))
+        motion += numpy.sin(time * frequencies * 2 * numpy.pi + phases) * amplitudes / 3
+    return motion
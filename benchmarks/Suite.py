@@ -0,0 +1,201 @@
+import json
+import os
+import platform
+import tempfile
+import time
+import timeit
+import tracemalloc
+from typing import Callable, Iterable, Optional
+
+import numpy
+
+import bvhio
+from .Generator import generateBvh
+
+FORMAT_VERSION = 1
+
+DEFAULT_GRID = [
+    {'joints': 20, 'depth': 5, 'frames': 100, 'channels': 'rotation'},
+    {'joints': 60, 'depth': 12, 'frames': 1000, 'channels': 'rotation'},
+    {'joints': 60, 'depth': 12, 'frames': 10000, 'channels': 'rotation'},
+    {'joints': 60, 'depth': 12, 'frames': 1000, 'channels': 'mixed'},
+    {'joints': 250, 'depth': 30, 'frames': 1000, 'channels': 'rotation'},
+]
+
+QUICK_GRID = [
+    {'joints': 20, 'depth': 5, 'frames': 100, 'channels': 'rotation'},
+    {'joints': 60, 'depth': 12, 'frames': 1000, 'channels': 'mixed'},
+]
+
+# loadPose is called for this many frames, spread evenly over the clip
+_POSE_SAMPLES = 200
+
+
+# each benchmark prepares its input outside of the measurement and returns the measured call
+def _readAsBvh(path: str, output: str, size: dict) -> Callable[[], object]:
+    return lambda: bvhio.readAsBvh(path)
+
+
+def _readAsHierarchy(path: str, output: str, size: dict) -> Callable[[], object]:
+    return lambda: bvhio.readAsHierarchy(path)
+
+
+def _convertBvhToHierarchy(path: str, output: str, size: dict) -> Callable[[], object]:
+    bvh = bvhio.readAsBvh(path)
+    return lambda: bvhio.convertBvhToHierarchy(bvh.Root)
+
+
+def _convertHierarchyToBvh(path: str, output: str, size: dict) -> Callable[[], object]:
+    root = bvhio.readAsHierarchy(path)
+    return lambda: bvhio.convertHierarchyToBvh(root, size['frames'])
+
+
+def _writeBvh(path: str, output: str, size: dict) -> Callable[[], object]:
+    bvh = bvhio.readAsBvh(path)
+    return lambda: bvhio.writeBvh(output, bvh)
+
+
+def _writeHierarchy(path: str, output: str, size: dict) -> Callable[[], object]:
+    root = bvhio.readAsHierarchy(path)
+    return lambda: bvhio.writeHierarchy(output, root, 1 / 30)
+
+
+def _loadPose(path: str, output: str, size: dict) -> Callable[[], object]:
+    root = bvhio.readAsHierarchy(path)
+    frames = numpy.linspace(0, size['frames'] - 1, min(size['frames'], _POSE_SAMPLES)).astype(int).tolist()
+    return lambda: [root.loadPose(frame) for frame in frames]
+
+
+def _forwardKinematics(path: str, output: str, size: dict) -> Callable[[], object]:
+    root = bvhio.readAsHierarchy(path)
+    return lambda: bvhio.forwardKinematics(root)
+
+
+BENCHMARKS: dict[str, Callable[[str, str, dict], Callable[[], object]]] = {
+    'readAsBvh': _readAsBvh,
+    'readAsHierarchy': _readAsHierarchy,
+    'convertBvhToHierarchy': _convertBvhToHierarchy,
+    'convertHierarchyToBvh': _convertHierarchyToBvh,
+    'writeBvh': _writeBvh,
+    'writeHierarchy': _writeHierarchy,
+    'loadPose': _loadPose,
+    'forwardKinematics': _forwardKinematics,
+}
+
+
+def runBenchmarks(grid: Iterable[dict] = None, names: Iterable[str] = None, repeat: int = 3, directory: Optional[str] = None, log: Callable[[str], None] = None) -> dict:
+    """Runs the benchmarks for each size of the grid and returns the results as JSON serializable dictionary.
+    - A size is a dictionary with the arguments joints, depth, frames and channels of ``generateBvh()``.
+    - Names select the benchmarks of ``BENCHMARKS``, all of them are run if None.
+    - Each benchmark is timed repeat times, the peak memory is traced in an extra run, so tracing does not slow down the timing.
+    - The synthetic files are created in directory, or in a temporary directory if None."""
+    grid = DEFAULT_GRID if grid is None else list(grid)
+    names = list(BENCHMARKS) if names is None else list(names)
+    for name in names:
+        if name not in BENCHMARKS: raise ValueError(f'Unknown benchmark "{name}", must be one of {list(BENCHMARKS)}')
+
+    results = []
+    with tempfile.TemporaryDirectory() as temporary:
+        directory = temporary if directory is None else directory
+        os.makedirs(directory, exist_ok=True)
+        output = os.path.join(temporary, 'output.bvh')
+        for size in grid:
+            path = os.path.join(directory, 'j{joints}_d{depth}_f{frames}_{channels}.bvh'.format(**size))
+            if not os.path.exists(path): generateBvh(path, **size)
+            for name in names:
+                result = _measure(BENCHMARKS[name](path, output, size), repeat)
+                result.update({'name': name, **size, 'fileBytes': os.path.getsize(path)})
+                results.append(result)
+                if log: log(formatResult(result))
+
+    return {'format': FORMAT_VERSION, 'environment': getEnvironment(), 'results': results}
+
+
+def _measure(function: Callable[[], object], repeat: int) -> dict:
+    seconds = []
+    for _ in range(repeat):
+        start = timeit.default_timer()
+        function()
+        seconds.append(timeit.default_timer() - start)
+
+    tracemalloc.start()
+    try:
+        function()
+        _, peakBytes = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {'seconds': seconds, 'best': min(seconds), 'median': float(numpy.median(seconds)), 'peakBytes': peakBytes}
+
+
+def getEnvironment() -> dict:
+    """Versions and machine the results were measured on."""
+    try:
+        from importlib.metadata import version
+        bvhioVersion = version('bvhio')
+    except Exception:
+        bvhioVersion = 'unknown'
+
+    return {
+        'bvhio': bvhioVersion,
+        'python': platform.python_version(),
+        'numpy': numpy.__version__,
+        'platform': platform.platform(),
+        'processor': platform.processor() or platform.machine(),
+        'cpus': os.cpu_count(),
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+    }
+
+
+def saveResults(path: str, results: dict) -> None:
+    """Writes the results as JSON file."""
+    with open(path, 'w') as file:
+        json.dump(results, file, indent=2)
+
+
+def loadResults(path: str) -> dict:
+    """Reads results that were written by ``saveResults()``."""
+    with open(path, 'r') as file:
+        results = json.load(file)
+    if results.get('format') != FORMAT_VERSION:
+        raise ValueError(f'Results in "{path}" have the format {results.get("format")}, expected {FORMAT_VERSION}')
+    return results
+
+
+def compareResults(baseline: dict, current: dict, threshold: float = 1.1) -> list[dict]:
+    """Compares two results of ``runBenchmarks()`` for the benchmarks and sizes that are in both.
+    - The ratio is current / baseline of the best time and the peak memory.
+    - A benchmark is a regression if one of the ratios is above threshold.
+
+    Returns one dictionary per compared benchmark."""
+    def key(result: dict) -> tuple:
+        return (result['name'], result['joints'], result['depth'], result['frames'], result['channels'])
+
+    baselines = {key(result): result for result in baseline['results']}
+    comparison = []
+    for result in current['results']:
+        before = baselines.get(key(result))
+        if before is None: continue
+        timeRatio = result['best'] / before['best'] if before['best'] else float('inf')
+        memoryRatio = result['peakBytes'] / before['peakBytes'] if before['peakBytes'] else float('inf')
+        comparison.append({
+            'name': result['name'],
+            'joints': result['joints'], 'depth': result['depth'], 'frames': result['frames'], 'channels': result['channels'],
+            'timeRatio': timeRatio,
+            'memoryRatio': memoryRatio,
+            'regression': timeRatio > threshold or memoryRatio > threshold,
+        })
+    return comparison
+
+
+def formatResult(result: dict) -> str:
+    """One line summary of a benchmark result."""
+    size = '{joints}j/{depth}d/{frames}f/{channels}'.format(**result)
+    return f'{result["name"]:<24}{size:<28}{result["best"] * 1000:>12.2f} ms{result["peakBytes"] / (1 << 20):>12.2f} MiB'
+
+
+def formatComparison(comparison: dict) -> str:
+    """One line summary of a compared benchmark."""
+    size = '{joints}j/{depth}d/{frames}f/{channels}'.format(**comparison)
+    flag = 'REGRESSION' if comparison['regression'] else ''
+    return f'{comparison["name"]:<24}{size:<28}{comparison["timeRatio"]:>8.2f}x time{comparison["memoryRatio"]:>8.2f}x memory  {flag}'
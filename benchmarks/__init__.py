@@ -0,0 +1,2 @@
+from .Generator import LAYOUTS, generateBvh
+from .Suite import BENCHMARKS, DEFAULT_GRID, QUICK_GRID, compareResults, formatComparison, formatResult, getEnvironment, loadResults, runBenchmarks, saveResults
@@ -0,0 +1,50 @@
+import argparse
+import sys
+
+from .Generator import LAYOUTS, generateBvh
+from .Suite import BENCHMARKS, DEFAULT_GRID, QUICK_GRID, compareResults, formatComparison, loadResults, runBenchmarks, saveResults
+
+
+def main(arguments: list[str] = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description='Benchmarks of the public bvhio functions on synthetic files.')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run = commands.add_parser('run', help='runs the benchmarks and writes the results as JSON')
+    run.add_argument('--output', help='path of the JSON results')
+    run.add_argument('--quick', action='store_true', help='uses a small grid for a fast check')
+    run.add_argument('--only', nargs='+', choices=list(BENCHMARKS), help='runs only the given benchmarks')
+    run.add_argument('--repeat', type=int, default=3, help='timed runs per benchmark, the best one is compared')
+    run.add_argument('--directory', help='keeps the synthetic files in this directory for following runs')
+
+    compare = commands.add_parser('compare', help='compares two JSON results, exits with 1 on regressions')
+    compare.add_argument('baseline')
+    compare.add_argument('current')
+    compare.add_argument('--threshold', type=float, default=1.1, help='ratio of time or memory above which a benchmark is a regression')
+
+    generate = commands.add_parser('generate', help='writes a synthetic .bvh file')
+    generate.add_argument('path')
+    generate.add_argument('--joints', type=int, default=20)
+    generate.add_argument('--depth', type=int, default=5)
+    generate.add_argument('--frames', type=int, default=100)
+    generate.add_argument('--channels', choices=list(LAYOUTS), default='rotation')
+    generate.add_argument('--seed', type=int, default=0)
+
+    arguments = parser.parse_args(arguments)
+    if arguments.command == 'run':
+        grid = QUICK_GRID if arguments.quick else DEFAULT_GRID
+        results = runBenchmarks(grid, arguments.only, arguments.repeat, arguments.directory, log=print)
+        if arguments.output: saveResults(arguments.output, results)
+        return 0
+
+    if arguments.command == 'compare':
+        comparison = compareResults(loadResults(arguments.baseline), loadResults(arguments.current), arguments.threshold)
+        for result in comparison:
+            print(formatComparison(result))
+        return 1 if any(result['regression'] for result in comparison) else 0
+
+    generateBvh(arguments.path, arguments.joints, arguments.depth, arguments.frames, arguments.channels, seed=arguments.seed)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,4 +1,11 @@
 from .lib.bvh import BvhContainer, BvhJoint
 from .lib.hierarchy import Joint
-from .lib.Parser import convertBvhToHierarchy, convertHierarchyToBvh, readAsHierarchy, readAsBvh, writeBvh, writeHierarchy
+from .lib.BvhCache import BvhCache
+from .lib.BvhCatalog import BvhCatalog, BvhCatalogEntry, hashSkeleton
+from .lib.BvhIndex import BvhIndex
+from .lib.BvhWriter import BvhWriter
+from .lib.Kinematics import forwardKinematics
+from .lib.Profiling import ProfileStats, StageStats, profile
+from .lib.Vectorized import eulerToQuats, quatsToEuler, quatsToMatrices, slerpQuats
+from .lib.Parser import convertBvhToHierarchy, convertHierarchyToBvh, iterateBvh, readAsHierarchy, readMany, readAsBvh, writeBvh, writeHierarchy
 from SpatialTransform import Euler, Pose, Transform
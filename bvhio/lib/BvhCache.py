@@ -0,0 +1,170 @@
+import hashlib
+import json
+import os
+from typing import Optional
+
+import numpy
+
+from .bvh import *
+
+_HASH_BLOCK = 1 << 24
+
+
+class BvhCache:
+    """Binary cache of parsed .bvh files, so that the text has to be parsed only once.
+    - Each file is stored as skeleton description and channel matrix, the matrix is memory mapped when loaded.
+    - An entry is valid as long as the size and modification time of the file are unchanged.
+    - If only the modification time has changed, the content hash decides if the entry is still valid.
+    - If the directory grows beyond maxBytes -> The least recently used entries are removed."""
+
+    @property
+    def Directory(self) -> str:
+        """Directory where the entries are stored."""
+        return self._Directory
+
+    @property
+    def MaxBytes(self) -> int:
+        """Size limit of the directory in bytes, or None if unlimited."""
+        return self._MaxBytes
+
+    def __init__(self, directory: str, maxBytes: int = 1 << 30) -> None:
+        self._Directory = os.path.abspath(os.path.expanduser(directory))
+        self._MaxBytes = maxBytes
+        os.makedirs(self._Directory, exist_ok=True)
+
+    def load(self, path: str, loadKeyFrames: bool = True, dtype: numpy.dtype = None) -> Optional[BvhContainer]:
+        """Returns the cached container of the file, or None if there is no valid entry.
+        - The channel matrix of the container is memory mapped and read only.
+        - If dtype is set -> The channel matrix is converted into it, if it differs from the stored one.
+        A float32 entry is not valid for float64, because its values have lost precision."""
+        metaPath, motionPath = self._getEntryPaths(path)
+        try:
+            with open(metaPath, "r") as file:
+                meta = json.load(file)
+        except (OSError, ValueError):
+            return None
+
+        stat = os.stat(path)
+        if meta['Size'] != stat.st_size:
+            return None
+        if meta['ModifiedTime'] != stat.st_mtime_ns:
+            if meta['Hash'] != _hashFile(path):
+                return None
+            meta['ModifiedTime'] = stat.st_mtime_ns
+            self._writeJson(metaPath, meta)
+
+        bvh = BvhContainer(BvhJoint.fromDict(meta['Root']), meta['FrameCount'], meta['FrameTime'])
+        if loadKeyFrames:
+            try:
+                motion = numpy.load(motionPath, mmap_mode='r')
+            except (OSError, ValueError):
+                return None
+            if dtype is not None and motion.dtype != dtype:
+                if motion.dtype.itemsize < numpy.dtype(dtype).itemsize:
+                    return None
+                motion = motion.astype(dtype)
+            bvh.setMotion(motion)
+
+        # the modification time of the entry is the last access for the eviction
+        os.utime(metaPath)
+        return bvh
+
+    def store(self, path: str, bvh: BvhContainer) -> "BvhCache":
+        """Stores the container for the given file, the container must hold a channel matrix.
+        - The channel matrix is stored with its dtype, so float32 entries take half of the space.
+        - Evicts the least recently used entries if the size limit is exceeded.
+
+        Returns itself."""
+        if bvh.Motion is None:
+            raise ValueError('Only containers with a channel matrix can be cached')
+
+        stat = os.stat(path)
+        metaPath, motionPath = self._getEntryPaths(path)
+        meta = {
+            'Path': os.path.abspath(path),
+            'Size': stat.st_size,
+            'ModifiedTime': stat.st_mtime_ns,
+            'Hash': _hashFile(path),
+            'FrameCount': bvh.FrameCount,
+            'FrameTime': bvh.FrameTime,
+            'Root': bvh.Root.toDict(),
+        }
+
+        # the meta data is written last, so an entry is only found when it is complete
+        with open(f'{motionPath}.tmp', "wb") as file:
+            numpy.save(file, numpy.ascontiguousarray(bvh.Motion))
+        os.replace(f'{motionPath}.tmp', motionPath)
+        self._writeJson(metaPath, meta)
+
+        self.evict()
+        return self
+
+    def remove(self, path: str) -> "BvhCache":
+        """Removes the entry of the given file, if it exists.
+
+        Returns itself."""
+        for entryPath in self._getEntryPaths(path):
+            if os.path.exists(entryPath):
+                os.remove(entryPath)
+        return self
+
+    def clear(self) -> "BvhCache":
+        """Removes all entries.
+
+        Returns itself."""
+        for name in os.listdir(self.Directory):
+            if name.endswith('.json') or name.endswith('.npy'):
+                os.remove(os.path.join(self.Directory, name))
+        return self
+
+    def getSize(self) -> int:
+        """Size of all entries in bytes."""
+        return sum(size for _, size, _ in self._listEntries())
+
+    def evict(self) -> "BvhCache":
+        """Removes the least recently used entries until the size limit is met.
+
+        Returns itself."""
+        if self.MaxBytes is None:
+            return self
+
+        entries = sorted(self._listEntries())
+        size = sum(size for _, size, _ in entries)
+        for _, entrySize, paths in entries:
+            if size <= self.MaxBytes:
+                break
+            for entryPath in paths:
+                if os.path.exists(entryPath):
+                    os.remove(entryPath)
+            size -= entrySize
+        return self
+
+    def _getEntryPaths(self, path: str) -> tuple[str, str]:
+        key = hashlib.sha1(os.path.abspath(path).encode()).hexdigest()
+        return (os.path.join(self.Directory, f'{key}.json'), os.path.join(self.Directory, f'{key}.npy'))
+
+    def _listEntries(self) -> list[tuple[int, int, tuple[str, str]]]:
+        entries = []
+        for name in os.listdir(self.Directory):
+            if not name.endswith('.json'):
+                continue
+            paths = (os.path.join(self.Directory, name), os.path.join(self.Directory, f'{name[:-5]}.npy'))
+            try:
+                stats = [os.stat(entryPath) for entryPath in paths if os.path.exists(entryPath)]
+            except OSError:
+                continue
+            entries.append((stats[0].st_mtime_ns, sum(stat.st_size for stat in stats), paths))
+        return entries
+
+    def _writeJson(self, path: str, data: dict) -> None:
+        with open(f'{path}.tmp', "w") as file:
+            json.dump(data, file)
+        os.replace(f'{path}.tmp', path)
+
+
+def _hashFile(path: str) -> str:
+    hash = hashlib.blake2b(digest_size=20)
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(_HASH_BLOCK), b''):
+            hash.update(block)
+    return hash.hexdigest()
@@ -0,0 +1,230 @@
+import fnmatch
+import hashlib
+import json
+import os
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Optional, Union
+
+from .bvh import *
+from .BvhCache import _hashFile
+from .Parser import _countChannels, _openSource, _parseHeader
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS Clips (
+    Path TEXT PRIMARY KEY,
+    Size INTEGER NOT NULL,
+    ModifiedTime INTEGER NOT NULL,
+    Hash TEXT,
+    Skeleton TEXT,
+    FrameCount INTEGER,
+    FrameTime REAL,
+    Duration REAL,
+    JointCount INTEGER,
+    ChannelCount INTEGER,
+    Root TEXT,
+    Error TEXT
+);
+CREATE INDEX IF NOT EXISTS ClipsBySkeleton ON Clips (Skeleton, Duration);
+CREATE INDEX IF NOT EXISTS ClipsByDuration ON Clips (Duration);
+CREATE INDEX IF NOT EXISTS ClipsByHash ON Clips (Hash);
+'''
+
+PATTERNS = ('*.bvh', '*.bvh.gz', '*.bvh.bz2', '*.bvh.xz', '*.bvh.lzma')
+_COLUMNS = ['Path', 'Size', 'ModifiedTime', 'Hash', 'Skeleton', 'FrameCount', 'FrameTime', 'Duration', 'JointCount', 'ChannelCount', 'Root', 'Error']
+
+
+class BvhCatalogEntry:
+    """Header data of one cataloged .bvh file.
+    - Skeleton is the hash of the joint names, their tree and their channels, it does not include the offsets.
+    - Hash is the hash of the whole file content as stored, so it differs between compressed and plain files.
+    - Duration is FrameCount times FrameTime in seconds."""
+    Path: str
+    Size: int
+    ModifiedTime: int
+    Hash: str
+    Skeleton: str
+    FrameCount: int
+    FrameTime: float
+    Duration: float
+    JointCount: int
+    ChannelCount: int
+
+    def __init__(self, row: tuple) -> None:
+        (self.Path, self.Size, self.ModifiedTime, self.Hash, self.Skeleton, self.FrameCount, self.FrameTime,
+         self.Duration, self.JointCount, self.ChannelCount, self._Root, _) = row
+
+    def __repr__(self) -> str:
+        return (f'{self.Path}: {self.FrameCount} frames, {self.Duration:.3f}s, skeleton {self.Skeleton[:8]}')
+
+    def __str__(self) -> str:
+        return self.__repr__()
+
+    def getRoot(self) -> BvhJoint:
+        """Skeleton definition of the file, without motion data."""
+        return BvhJoint.fromDict(json.loads(self._Root))
+
+
+class BvhCatalog:
+    """Persistent index of the headers of many .bvh files, stored as SQLite database.
+    - ``scan()`` reads the headers of new and changed files in worker processes, the motion is not parsed.
+    - A file is read again if its size or modification time has changed.
+    - Files that cannot be read are recorded with their error, so they are skipped until they change.
+    - Queries by skeleton, frame count, frame time and duration are answered from indices of the database."""
+
+    @property
+    def Path(self) -> str:
+        """Path of the database file."""
+        return self._Path
+
+    def __init__(self, path: str) -> None:
+        self._Path = path if path == ':memory:' else os.path.abspath(os.path.expanduser(path))
+        self._Connection = sqlite3.connect(self._Path)
+        self._Connection.executescript(_SCHEMA)
+
+    def __enter__(self) -> "BvhCatalog":
+        return self
+
+    def __exit__(self, *exception) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return self._Connection.execute('SELECT COUNT(*) FROM Clips WHERE Error IS NULL').fetchone()[0]
+
+    def close(self) -> None:
+        """Closes the database, the catalog can not be used afterwards."""
+        self._Connection.close()
+
+    def scan(self, paths: Union[str, Iterable[str]], pattern: Union[str, Iterable[str]] = PATTERNS, recursive: bool = True, workers: int = None, prune: bool = True) -> dict[str, int]:
+        """Adds new and changed files to the catalog.
+        - Paths are directories which are searched for files that match the pattern, or single files.
+        - Pattern is one or many shell patterns, by default plain and compressed .bvh files are found.
+        - If recursive is True -> Sub directories are searched too.
+        - If workers is None -> As many processes as cpu cores are used, if it is below 2 the files are read in this process.
+        - If prune is True -> Entries of files below the given paths which do not exist anymore are removed.
+
+        Returns the count of 'added', 'updated', 'unchanged', 'removed' and 'failed' files."""
+        paths = [paths] if isinstance(paths, str) else list(paths)
+        files = sorted(set(file for path in paths for file in _findFiles(path, pattern, recursive)))
+        known = dict((path, (size, modified)) for path, size, modified in self._Connection.execute('SELECT Path, Size, ModifiedTime FROM Clips'))
+        counts = {'added': 0, 'updated': 0, 'unchanged': 0, 'removed': 0, 'failed': 0}
+
+        changed = []
+        for file in files:
+            stat = os.stat(file)
+            if known.get(file) == (stat.st_size, stat.st_mtime_ns): counts['unchanged'] += 1
+            else: changed.append(file)
+
+        workers = (os.cpu_count() or 1) if workers is None else workers
+        executor = None
+        if workers < 2 or len(changed) < 2:
+            rows = map(_readHeader, changed)
+        else:
+            executor = ProcessPoolExecutor(max_workers=min(workers, len(changed)))
+            rows = executor.map(_readHeader, changed, chunksize=max(1, min(64, len(changed) // (4 * workers))))
+
+        try:
+            with self._Connection:
+                for row in rows:
+                    counts['updated' if row[0] in known else 'added'] += 1
+                    counts['failed'] += row[-1] is not None
+                    self._Connection.execute(f'INSERT OR REPLACE INTO Clips VALUES ({", ".join("?" * len(_COLUMNS))})', row)
+
+                # files that were deleted or do not match the pattern anymore
+                if prune:
+                    found, roots = set(files), [os.path.abspath(os.path.expanduser(path)) for path in paths]
+                    for path in known:
+                        if path not in found and _isBelow(path, roots):
+                            self._Connection.execute('DELETE FROM Clips WHERE Path = ?', (path,))
+                            counts['removed'] += 1
+        finally:
+            if executor is not None: executor.shutdown()
+        return counts
+
+    def find(self, skeleton: str = None, minDuration: float = None, maxDuration: float = None,
+             minFrames: int = None, maxFrames: int = None, frameTime: float = None, hash: str = None) -> list[BvhCatalogEntry]:
+        """Returns the entries that match all given conditions, ordered by path.
+        - Skeleton and hash are compared for equality, durations are in seconds and inclusive.
+        - frameTime is compared with a tolerance of a microsecond.
+        - Files that could not be read are not returned, see ``getErrors()``."""
+        conditions, values = ['Error IS NULL'], []
+        for condition, value in [
+                ('Skeleton = ?', skeleton), ('Hash = ?', hash),
+                ('Duration >= ?', minDuration), ('Duration <= ?', maxDuration),
+                ('FrameCount >= ?', minFrames), ('FrameCount <= ?', maxFrames),
+                ('ABS(FrameTime - ?) < 1e-6', frameTime)]:
+            if value is None: continue
+            conditions.append(condition)
+            values.append(value)
+
+        query = f'SELECT {", ".join(_COLUMNS)} FROM Clips WHERE {" AND ".join(conditions)} ORDER BY Path'
+        return [BvhCatalogEntry(row) for row in self._Connection.execute(query, values)]
+
+    def get(self, path: str) -> Optional[BvhCatalogEntry]:
+        """Returns the entry of the given file, or None if it is not cataloged or could not be read."""
+        row = self._Connection.execute(f'SELECT {", ".join(_COLUMNS)} FROM Clips WHERE Path = ? AND Error IS NULL', (os.path.abspath(path),)).fetchone()
+        return None if row is None else BvhCatalogEntry(row)
+
+    def getSkeletons(self) -> dict[str, int]:
+        """Returns the skeleton hashes of the catalog with the count of files that use them, the most common first."""
+        return dict(self._Connection.execute(
+            'SELECT Skeleton, COUNT(*) FROM Clips WHERE Error IS NULL GROUP BY Skeleton ORDER BY COUNT(*) DESC, Skeleton'))
+
+    def getErrors(self) -> dict[str, str]:
+        """Returns the files that could not be read with their error message."""
+        return dict(self._Connection.execute('SELECT Path, Error FROM Clips WHERE Error IS NOT NULL ORDER BY Path'))
+
+    def remove(self, path: str) -> "BvhCatalog":
+        """Removes the entry of the given file, if it exists.
+
+        Returns itself."""
+        with self._Connection:
+            self._Connection.execute('DELETE FROM Clips WHERE Path = ?', (os.path.abspath(path),))
+        return self
+
+    def clear(self) -> "BvhCatalog":
+        """Removes all entries.
+
+        Returns itself."""
+        with self._Connection:
+            self._Connection.execute('DELETE FROM Clips')
+        return self
+
+
+def hashSkeleton(root: BvhJoint) -> str:
+    """Hash of the joint names, their tree and their channels.
+    - Skeletons with the same topology have the same hash, even if their offsets differ."""
+    layout = [[joint.Name, depth, joint.Channels] for joint, index, depth in root.layout()]
+    return hashlib.sha1(json.dumps(layout).encode()).hexdigest()
+
+
+def _readHeader(path: str) -> tuple:
+    stat = os.stat(path)
+    try:
+        with _openSource(path) as file:
+            bvh, _ = _parseHeader(file)
+    except (SyntaxError, ValueError, IndexError, UnicodeDecodeError, OSError, EOFError) as error:
+        return (path, stat.st_size, stat.st_mtime_ns) + (None,) * 8 + (f'{type(error).__name__}: {error}',)
+
+    root = bvh.Root
+    return (path, stat.st_size, stat.st_mtime_ns, _hashFile(path), hashSkeleton(root), bvh.FrameCount, bvh.FrameTime,
+            bvh.FrameCount * bvh.FrameTime, len(root.layout()), _countChannels(root), json.dumps(root.toDict()), None)
+
+
+def _findFiles(path: str, pattern: Union[str, Iterable[str]], recursive: bool) -> list[str]:
+    path = os.path.abspath(os.path.expanduser(path))
+    patterns = [pattern] if isinstance(pattern, str) else list(pattern)
+    if os.path.isfile(path):
+        return [path]
+    if not os.path.isdir(path):
+        raise FileNotFoundError(f'"{path}" is neither a file nor a directory')
+
+    files = []
+    for directory, directories, names in os.walk(path):
+        files.extend(os.path.join(directory, name) for name in names if any(fnmatch.fnmatch(name, entry) for entry in patterns))
+        if not recursive: break
+    return files
+
+
+def _isBelow(path: str, roots: list[str]) -> bool:
+    return any(path == root or path.startswith(root.rstrip(os.sep) + os.sep) for root in roots)
@@ -0,0 +1,153 @@
+import errno
+import io
+import mmap
+import os
+
+import numpy
+
+from .bvh import *
+from .Compression import detectCompression
+from .Vectorized import checkFloatType
+from .Parser import _countChannels, _detectNewline, _findRows, _parseHeader, _parseMotion, _translateNewlines
+
+
+class BvhIndex:
+    """Random access to the frames of a .bvh file, without parsing the frames before.
+    - The file is memory mapped and the byte range of every motion line is recorded once.
+    - If save is True -> The index is stored next to the file and reused as long as the file does not change.
+    - Frames are read as channel matrix, the columns follow the joints of ``Root.layout()`` and their channels.
+    - The file stays open until ``close()`` is called or the ``with`` block is left.
+    - Frames are parsed into float64 or float32 matrices, as given by dtype.
+    - Compressed files are not supported, they can only be read as stream, see ``readAsBvh``."""
+
+    @property
+    def Path(self) -> str:
+        """Path of the indexed .bvh file."""
+        return self._Path
+
+    @property
+    def Root(self) -> BvhJoint:
+        """Skeleton definition of the file, without motion data."""
+        return self._Root
+
+    @property
+    def FrameCount(self) -> int:
+        """Count of frames in the file."""
+        return len(self._Offsets)
+
+    @property
+    def FrameTime(self) -> float:
+        """Frame time of the file."""
+        return self._FrameTime
+
+    @property
+    def ChannelCount(self) -> int:
+        """Count of values per frame."""
+        return self._ChannelCount
+
+    @property
+    def Offsets(self) -> numpy.ndarray:
+        """Byte range of every frame line as array with the shape (frames, 2), with start and end."""
+        return self._Offsets
+
+    def __init__(self, path: str, save: bool = False, dtype: numpy.dtype = numpy.float64) -> None:
+        if not os.path.exists(path):
+            raise FileNotFoundError(errno.ENOENT, os.strerror(errno.ENOENT), path)
+        if detectCompression(path) is not None:
+            raise ValueError(f'Compressed file "{path}" can not be memory mapped, it must be decompressed for random access')
+
+        self._Path = path
+        self._Dtype = checkFloatType(dtype)
+        self._File = open(path, "rb")
+        try:
+            # lines that end with a bare carriage return are indexed by it, the header is read through a translation
+            self._Newline = _detectNewline(self._File)
+            lines = _translateNewlines(self._File, self._Newline)
+            header, self._Line = _parseHeader(lines)
+            self._Root = header.Root
+            self._FrameTime = header.FrameTime
+            self._ChannelCount = _countChannels(header.Root)
+            self._MotionStart = lines.tell()
+            self._Map = mmap.mmap(self._File.fileno(), 0, access=mmap.ACCESS_READ)
+            self._Offsets = self._loadIndex(header.FrameCount)
+            if self._Offsets is None:
+                self._Offsets = self._scanLines(header.FrameCount)
+                if save: self._saveIndex()
+        except BaseException:
+            self.close()
+            raise
+
+    def __enter__(self) -> "BvhIndex":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return self.FrameCount
+
+    def close(self) -> None:
+        """Releases the memory map and the file."""
+        if getattr(self, '_Map', None) is not None:
+            self._Map.close()
+            self._Map = None
+        if self._File is not None:
+            self._File.close()
+            self._File = None
+
+    def getIndexPath(self) -> str:
+        """Path where the index is stored next to the file."""
+        return f'{self.Path}.index.npz'
+
+    def readMotion(self, start: int = 0, stop: int = None) -> numpy.ndarray:
+        """Reads the frames from start to stop (exclusive) as channel matrix with the shape (frames, channels).
+        - Start and stop behave like slice indices, so negative values count from the end.
+        - Only the bytes of the requested frames are read."""
+        start, stop, _ = slice(start, stop).indices(self.FrameCount)
+        if stop <= start:
+            return numpy.empty((0, self.ChannelCount), dtype=self._Dtype)
+
+        begin, end = self._Offsets[start, 0], self._Offsets[stop - 1, 1]
+        try:
+            return _parseMotion(io.BytesIO(self._Map[begin:end].replace(self._Newline, b'\n')), 0, stop - start, self.ChannelCount, self._Dtype)
+        except SyntaxError as error:
+            line = self._Line + self._Map[self._MotionStart:begin].count(self._Newline) + (error.lineno or 0)
+            raise SyntaxError(error.msg, (self.Path, line, error.offset, error.text)) from None
+
+    def readFrame(self, frame: int) -> numpy.ndarray:
+        """Reads a single frame as array with the shape (channels,)."""
+        if not -self.FrameCount <= frame < self.FrameCount:
+            raise IndexError(f'Frame {frame} is out of the range of {self.FrameCount} frames')
+        frame %= self.FrameCount
+        return self.readMotion(frame, frame + 1)[0]
+
+    def readAsBvh(self, start: int = 0, stop: int = None) -> BvhContainer:
+        """Reads the frames from start to stop (exclusive) into a container with its own copy of the skeleton.
+        - The frame ids of the container start at 0."""
+        motion = self.readMotion(start, stop)
+        return BvhContainer(self.Root.duplicate(recursive=True), len(motion), self.FrameTime, motion)
+
+    def _stamp(self, frameCount: int) -> numpy.ndarray:
+        stat = os.stat(self._File.fileno())
+        return numpy.array([stat.st_size, stat.st_mtime_ns, frameCount, self._MotionStart], dtype=numpy.int64)
+
+    def _loadIndex(self, frameCount: int) -> numpy.ndarray:
+        if not os.path.exists(self.getIndexPath()):
+            return None
+        try:
+            with numpy.load(self.getIndexPath()) as data:
+                if numpy.array_equal(data['stamp'], self._stamp(frameCount)):
+                    return data['offsets']
+        except (OSError, ValueError, KeyError):
+            pass
+        return None
+
+    def _saveIndex(self) -> None:
+        with open(self.getIndexPath(), "wb") as file:
+            numpy.savez(file, offsets=self._Offsets, stamp=self._stamp(len(self._Offsets)))
+
+    def _scanLines(self, frameCount: int) -> numpy.ndarray:
+        _, _, rows = _findRows(self._Map, self._MotionStart, self._Line, frameCount, newline=self._Newline)
+        if len(rows) < frameCount:
+            raise SyntaxError(f'Expected {frameCount} frames, but the file ends after {len(rows)} frames', (self.Path, self._Line, 0, ''))
+        return numpy.ascontiguousarray(rows[:, :2])
@@ -0,0 +1,125 @@
+import io
+import shutil
+import tempfile
+from typing import IO, Union
+
+import numpy
+
+from .bvh import *
+from .Compression import compressData, detectCompression, openStream
+from .Parser import _countChannels, _formatMotion, _serializeMotion, writeJoint
+
+_FRAME_COUNT_WIDTH = 12
+
+
+class BvhWriter:
+    """Writes a .bvh file frame by frame, so that the animation does not need to be held in memory.
+    - The hierarchy is written from the given skeleton when the writer is created.
+    - Frames are appended with ``write()``, the frame count is filled in when the writer is closed.
+    - The frame count is written into a placeholder of fixed width, so the file is not rewritten.
+    - If the path ends with .gz, .bz2, .xz or .lzma -> The frames are compressed into a temporary file, the file is written when the writer is closed.
+    - Data will be overwritten if the file already exists"""
+
+    @property
+    def Path(self) -> str:
+        """Path of the written .bvh file."""
+        return self._Path
+
+    @property
+    def Root(self) -> BvhJoint:
+        """Skeleton definition that is written."""
+        return self._Root
+
+    @property
+    def FrameCount(self) -> int:
+        """Count of frames written so far."""
+        return self._FrameCount
+
+    @property
+    def ChannelCount(self) -> int:
+        """Count of values per frame."""
+        return self._ChannelCount
+
+    def __init__(self, path: str, root: BvhJoint, frameTime: float, percision: int = 9) -> None:
+        self._Path = path
+        self._Root = root
+        self._Skeleton = BvhJoint.fromDict(root.toDict())
+        self._FrameCount = 0
+        self._ChannelCount = _countChannels(root)
+        self._Percision = percision
+
+        self._FrameTime = frameTime
+        self._Compression = detectCompression(path, reading=False)
+
+        # the frame count can not be filled into a compressed stream,
+        # so the frames are compressed into a temporary stream, which is appended to the header when closing
+        if self._Compression is not None:
+            self._Spool = tempfile.TemporaryFile()
+            self._File = openStream(self._Spool, self._Compression, "w")
+            return
+
+        self._File = open(path, "w")
+        self._writeHeader(self._File, 0)
+
+    def __enter__(self) -> "BvhWriter":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def write(self, frames: Union[numpy.ndarray, BvhContainer]) -> "BvhWriter":
+        """Appends frames to the file.
+        - Frames can be a channel matrix with the shape (frames, channels) or a single frame with the shape (channels,).
+        - The columns of a channel matrix must follow the joints of ``Root.layout()`` and their channels.
+        - Frames can also be a container, whose keyframes are converted like ``writeBvh`` does.
+        - A channel matrix is converted like ``writeBvh`` converts the motion of a container, so both write the same text.
+
+        Returns itself."""
+        if self._File is None:
+            raise ValueError('Cannot write frames, the writer is already closed')
+
+        if isinstance(frames, BvhContainer):
+            frames = _serializeMotion(frames.Root, frames.FrameCount)
+        else:
+            frames = numpy.asarray(frames, dtype=numpy.float64)
+            if frames.ndim == 1:
+                frames = frames.reshape((1, -1))
+            if frames.ndim != 2 or frames.shape[1] != self.ChannelCount:
+                raise ValueError(f'Frames must have the shape (frames, {self.ChannelCount})')
+
+            # the values are taken in the precision of the keyframe poses, as writeBvh takes them
+            frames = _serializeMotion(BvhContainer(self._Skeleton, len(frames), self._FrameTime, frames).Root, len(frames))
+
+        self._File.write(_formatMotion(frames, self._Percision))
+        self._FrameCount += len(frames)
+        return self
+
+    def close(self) -> None:
+        """Fills in the frame count and closes the file."""
+        if self._File is None:
+            return
+
+        if self._Compression is None:
+            self._File.seek(self._FrameCountPosition)
+            self._File.write(f'Frames: {self.FrameCount:<{_FRAME_COUNT_WIDTH}}\n')
+            self._File.close()
+            self._File = None
+            return
+
+        self._File.close()
+        self._File = None
+        header = io.StringIO()
+        self._writeHeader(header, self.FrameCount)
+        with open(self.Path, "wb") as file:
+            file.write(compressData(header.getvalue().encode(), self._Compression))
+            self._Spool.seek(0)
+            shutil.copyfileobj(self._Spool, file)
+        self._Spool.close()
+
+    def _writeHeader(self, file: IO, frameCount: int) -> None:
+        file.write('HIERARCHY\n')
+        writeJoint(file, self.Root, 0, True, self._Percision)
+        file.write('MOTION\n')
+        self._FrameCountPosition = file.tell()
+        file.write(f'Frames: {frameCount:<{_FRAME_COUNT_WIDTH}}\n')
+        file.write(f'Frame Time: {self._FrameTime}\n')
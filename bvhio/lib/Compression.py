@@ -0,0 +1,70 @@
+import bz2
+import gzip
+import lzma
+from typing import IO, Optional, Union
+
+# magic bytes decide when reading, so misnamed files are read too; the extension decides when writing
+# legacy .lzma files have no magic bytes, their header starts with the default properties 0x5D and a dictionary size of at least 64 KiB
+COMPRESSIONS = {
+    'gzip': (b'\x1f\x8b', ('.gz', '.gzip')),
+    'bz2': (b'BZh', ('.bz2',)),
+    'xz': (b'\xfd7zXZ\x00', ('.xz',)),
+    'lzma': (b'\x5d\x00\x00', ('.lzma',)),
+}
+_GZIP_LEVEL = 6
+
+
+def detectCompression(path: str, reading: bool = True) -> Optional[str]:
+    """Returns the compression of a file as 'gzip', 'bz2', 'xz' or 'lzma', or None if it is plain text.
+    - If reading is True -> The compression is detected by the first bytes of the file.
+    - If reading is False -> The compression is selected by the extension of the path."""
+    if reading:
+        with open(path, "rb") as file:
+            return detectMagic(file.read(6))
+    return next((name for name, (_, extensions) in COMPRESSIONS.items() if path.lower().endswith(extensions)), None)
+
+
+def detectMagic(head: bytes) -> Optional[str]:
+    """Returns the compression of data that starts with the given bytes, or None if it is plain text."""
+    return next((name for name, (magic, _) in COMPRESSIONS.items() if head.startswith(magic)), None)
+
+
+def openFile(path: str, mode: str) -> IO:
+    """Opens a .bvh file that may be compressed, the data is decompressed or compressed while it is streamed.
+    - Mode is 'rb' to read bytes or 'w' to write text, like the plain files are opened."""
+    compression = detectCompression(path, reading='r' in mode)
+    if compression is None:
+        return open(path, mode)
+
+    return openStream(path, compression, mode)
+
+
+def openStream(file: Union[str, IO], compression: str, mode: str) -> IO:
+    """Opens a compressed stream of the given compression on a path or a binary file object.
+    - Mode is 'rb' to read bytes or 'w' to write text.
+    - A given file object is not closed with the stream."""
+    mode = mode if 'b' in mode else f'{mode}t'
+    if compression == 'gzip':
+        return gzip.open(file, mode, compresslevel=_GZIP_LEVEL)
+    if compression == 'bz2':
+        return bz2.open(file, mode)
+    if compression == 'lzma':
+        return lzma.open(file, mode, format=lzma.FORMAT_ALONE)
+    return lzma.open(file, mode)
+
+
+def compressData(data: bytes, compression: str) -> bytes:
+    """Compresses the data as a complete stream, which can be appended to another stream of the same compression."""
+    if compression == 'gzip':
+        return gzip.compress(data, compresslevel=_GZIP_LEVEL)
+    if compression == 'bz2':
+        return bz2.compress(data)
+    if compression == 'lzma':
+        return lzma.compress(data, format=lzma.FORMAT_ALONE)
+    return lzma.compress(data)
+
+
+def isCompressed(file: IO) -> bool:
+    """True if the file is a stream of one of the supported compressions, which can not be memory mapped."""
+    file = getattr(file, 'buffer', file)
+    return isinstance(file, (gzip.GzipFile, bz2.BZ2File, lzma.LZMAFile))
@@ -0,0 +1,67 @@
+from typing import Iterable, Union
+
+import numpy
+
+from .hierarchy import Joint
+from .Vectorized import checkFloatType, multiplyQuats, quatsToMatrices
+
+
+def forwardKinematics(root: Joint, frames: Union[int, Iterable[int]] = None, dtype: numpy.dtype = numpy.float64) -> tuple[numpy.ndarray, numpy.ndarray]:
+    """Calculates the world positions and rotations of all joints for many frames at once.
+    - The animation is calculated as in ``loadPose()``, so that the results match ``PositionWorld`` and ``RotationWorld``.
+    - Joints are in the order of ``root.layout()``.
+    - If root has a parent -> Its current world space is included, it is the same for all frames.
+    - If frames is None -> All frames up to the last keyframe of the hierarchy are calculated.
+    - If frames is an integer -> The frames from 0 to frames are calculated.
+    - Joints are processed from parent to child, each one for all frames at once.
+    - dtype is float64 or float32 of the results and of the intermediate world spaces.
+    Each joint is calculated in float64 from the stored values of its parent, so float32 errors grow with the depth of the joint, not the frame count.
+
+    Returns the positions with the shape (frames, joints, 3) and the rotations as (w, x, y, z) with the shape (frames, joints, 4)."""
+    if frames is None: frames = root.getKeyframeRange()[1] + 1
+    frames = numpy.arange(frames) if isinstance(frames, (int, numpy.integer)) else numpy.asarray(list(frames), dtype=int)
+
+    joints = [joint for joint, _, _ in root.layout()]
+    indices = {id(joint): index for index, joint in enumerate(joints)}
+    dtype = checkFloatType(dtype)
+    positions = numpy.empty((len(frames), len(joints), 3), dtype=dtype)
+    rotations = numpy.empty((len(frames), len(joints), 4), dtype=dtype)
+    spaces = numpy.empty((len(frames), len(joints), 3, 3), dtype=dtype)
+
+    # the space of the parent of root does not change with the frames
+    if root.Parent is None:
+        baseSpace, baseRotation = numpy.identity(4), numpy.array([1.0, 0, 0, 0])
+    else:
+        baseSpace = numpy.array(root.Parent.SpaceWorld.to_list()).T
+        baseRotation = numpy.array(root.Parent.RotationWorld.to_list())
+
+    for index, joint in enumerate(joints):
+        position, rotation, scale = _sampleLocalPoses(joint, frames)
+
+        # world space = parent space * translate(position) * scale(scale) * rotate(rotation)
+        if joint is root:
+            parentSpace, parentPosition, parentRotation = baseSpace[:3, :3], baseSpace[:3, 3], baseRotation
+        else:
+            parent = indices[id(joint.Parent)]
+            parentSpace, parentPosition, parentRotation = spaces[:, parent], positions[:, parent], rotations[:, parent]
+
+        positions[:, index] = numpy.einsum('...ij,...j->...i', parentSpace, position) + parentPosition
+        rotations[:, index] = multiplyQuats(parentRotation, rotation)
+        spaces[:, index] = numpy.matmul(parentSpace, scale[:, :, None] * quatsToMatrices(rotation))
+
+    return positions, rotations
+
+
+def _sampleLocalPoses(joint: Joint, frames: numpy.ndarray) -> tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray]:
+    # local pose as loadPose() sets it -> the keyframe in the space of the rest pose
+    rest = joint.RestPose
+    restPosition = numpy.array(rest.Position.to_list())
+    restRotation = numpy.array(rest.Rotation.to_list())
+    restScale = numpy.array(rest.Scale.to_list())
+
+    keyPosition, keyRotation, keyScale = joint.sampleKeyframes(frames)
+
+    position = restPosition + restScale * numpy.einsum('ij,...j->...i', quatsToMatrices(restRotation), keyPosition)
+    rotation = multiplyQuats(restRotation, keyRotation)
+    scale = restScale * keyScale
+    return position, rotation, scale
@@ -1,23 +1,41 @@
 import errno
+import io
+import mmap
 import os
-from io import TextIOWrapper
-from typing import Optional
+import re
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from multiprocessing import resource_tracker, shared_memory
+from typing import IO, Callable, Iterable, Iterator, Optional, Union
 
 import glm
 import numpy
-from SpatialTransform import Euler, Pose, Transform
+from SpatialTransform import Pose, Transform
 
 from .bvh import *
 from .hierarchy import *
+from .BvhCache import BvhCache
+from .Compression import detectMagic, isCompressed, openFile, openStream
+from .Profiling import stage
+from .Vectorized import checkFloatType, multiplyQuats, quatsToEuler
 
+_WHITESPACE = numpy.isin(numpy.arange(256), numpy.frombuffer(b' \t\n\r\x0b\x0c', dtype=numpy.uint8))
+_FRAMES_PER_BLOCK = 4096
+_RANGE_BYTES = (1 << 16, 1 << 24)
+_SCAN_BYTES = 1 << 18
+_HEAD_BYTES = 1 << 12
 
-def parseLine(file: TextIOWrapper, lineNumber: int) -> tuple[int, list[str], tuple[TextIOWrapper, int, int, str]]:
+
+def parseLine(file: IO, lineNumber: int) -> tuple[int, list[str], tuple[IO, int, int, str]]:
     tokens: list[str] = []
 
     try:
         while len(tokens) < 1:
             lineNumber += 1
             line = file.readline()
+            if isinstance(line, bytes): line = line.decode()
+            if not line: raise SyntaxError('Unexpected end of file', (file, lineNumber, 0, line))
             tokens = line.strip().split()
     except StopIteration:
         pass
@@ -26,79 +44,362 @@ def parseLine(file: TextIOWrapper, lineNumber: int) -> tuple[int, list[str], tup
     return (lineNumber, tokens, debugInfo)
 
 
-def readAsBvh(path: str, loadKeyFrames: bool = True) -> BvhContainer:
-    """Deserialize .bvh file into a simple structure."""
-    if not os.path.exists(path):
+JointFilter = Union[Iterable[str], str, re.Pattern, Callable[[BvhJoint], bool]]
+BvhSource = Union[str, os.PathLike, bytes, bytearray, memoryview, mmap.mmap, IO[bytes]]
+BvhTarget = Union[str, os.PathLike, IO, None]
+
+
+def readAsBvh(path: BvhSource, loadKeyFrames: bool = True, cache: BvhCache = None, workers: int = None,
+              start: int = None, stop: int = None, step: int = None, joints: JointFilter = None, dtype: numpy.dtype = numpy.float64) -> BvhContainer:
+    """Deserialize .bvh file into a simple structure.
+    - Path is the path of a file, or the data itself as bytes, memoryview, mmap or binary file-like object.
+    The data is tokenized as bytes, a file-like object is read from its current position and is not closed.
+    Buffers are not copied, only the motion that is decoded, streams that can not seek are read into memory first.
+    Lines may end with a line feed, a carriage return and line feed, or a bare carriage return, as in text mode.
+    - If cache is set -> The file is loaded from the cache if it has a valid entry, otherwise it is parsed and stored there.
+    - If workers is set -> The motion is split into ranges of lines, which are parsed by that many processes.
+    This pays off for very large files, the result and errors are the same as without workers.
+    - Files compressed with gzip, bz2, xz or lzma are detected by their first bytes and decompressed while they are read.
+    Their motion is parsed without workers, because the ranges of lines can not be read independently.
+    - If start, stop or step is set -> Only the selected frames are loaded, they behave like slice indices.
+    Lines before and between the selected frames are skipped without being parsed.
+    FrameCount is the count of selected frames and FrameTime is multiplied by step, so the clip keeps its speed.
+    Selected frames are not stored in the cache, but they are taken from a valid entry.
+    - If joints is set -> Only the motion of the selected joints is kept, the other joints lose their channels and stay in their rest pose.
+    Joints are selected by a list of names, a regular expression that matches the whole name, or a predicate on ``BvhJoint``.
+    The rows are decoded in blocks that are reduced to the selected columns, so the matrix of all channels is never allocated.
+    The motion is selected the same way from a valid cache entry, it is not stored in the cache.
+    - Cache and workers are only used for paths, because they need to read the file again.
+    - dtype is float64 or float32 of the channel matrix, the values are parsed directly into it.
+    float32 halves the memory and keeps about 7 significant digits, every value is the nearest float32 of the text.
+    A cache entry of float64 values is also used for float32, but not the other way around."""
+    isPath = isinstance(path, (str, os.PathLike))
+    dtype = checkFloatType(dtype)
+    if isPath and not os.path.exists(path):
         raise FileNotFoundError(errno.ENOENT, os.strerror(errno.ENOENT), path)
+    if step is not None and step < 1:
+        raise ValueError('Step must be at least 1')
+    select = start is not None or stop is not None or step is not None or joints is not None
+    cache = cache if isPath else None
+
+    with stage('readAsBvh'):
+        if cache is not None:
+            with stage('cacheLoad') as timing:
+                bvh = cache.load(path, loadKeyFrames, dtype)
+                timing.count(objects=int(bvh is not None))
+            if bvh is not None:
+                frames = range(*slice(start, stop, step).indices(bvh.FrameCount))
+                columns = _selectJoints(bvh.Root, joints)
+                if bvh.Motion is not None:
+                    motion = bvh.Motion[frames.start:frames.stop:frames.step]
+                    bvh.setMotion(motion if columns is None else motion[:, columns])
+                return _selectFrames(bvh, frames)
+
+        with _openSource(path) as file:
+            with stage('header') as timing:
+                begin = file.tell()
+                bvh, line = _parseHeader(file)
+                if timing: timing.count(objects=len(bvh.Root.layout()), bytes=file.tell() - begin)
+
+            # parse motion data, workers read ranges of bytes from the file, which is not possible for compressed streams
+            channelCount = _countChannels(bvh.Root)
+            columns = _selectJoints(bvh.Root, joints)
+            frames = range(*slice(start, stop, step).indices(bvh.FrameCount))
+            parallel = isPath and workers is not None and workers >= 2 and _isMappable(file)
+            if loadKeyFrames:
+                with stage('motion') as timing:
+                    begin = file.tell()
+                    if len(frames) != bvh.FrameCount:
+                        motion = _parseMotionFrames(file, path, line, channelCount, frames, workers if parallel else None, dtype, columns)
+                    elif not parallel:
+                        motion = _parseMotion(file, line, bvh.FrameCount, channelCount, dtype, columns)
+                    else:
+                        motion = _parseMotionParallel(file, path, line, bvh.FrameCount, channelCount, workers, dtype=dtype, columns=columns)
+                    if timing: timing.count(objects=len(motion), bytes=(file.tell() if len(frames) != bvh.FrameCount or not parallel else os.fstat(file.fileno()).st_size) - begin)
+                bvh.setMotion(motion)
+            _selectFrames(bvh, frames)
+
+        if cache is not None and loadKeyFrames and not select:
+            with stage('cacheStore'):
+                cache.store(path, bvh)
+        return bvh
+
+
+@contextmanager
+def _openSource(source: BvhSource) -> Iterator[IO[bytes]]:
+    # every source is read as seekable binary stream, buffers are wrapped without copying them
+    if isinstance(source, (str, os.PathLike)):
+        with openFile(source, "rb") as file:
+            yield _translateNewlines(file, _detectNewline(file))
+        return
+
+    if isinstance(source, (bytes, bytearray, memoryview, mmap.mmap)):
+        with _BufferReader(source) as buffer, _openSource(buffer) as file:
+            yield file
+        return
+
+    file = source if source.seekable() else io.BytesIO(source.read())
+    position = file.tell()
+    compression = detectMagic(file.read(6))
+    file.seek(position)
+    if compression is None:
+        yield _translateNewlines(file, _detectNewline(file))
+        return
+
+    with openStream(file, compression, "rb") as stream:
+        yield _translateNewlines(stream, _detectNewline(stream))
+
+
+def _detectNewline(file: IO[bytes]) -> bytes:
+    # the first line break decides for the whole file, it is b'\r' if lines end with a bare carriage return
+    position = file.tell()
+    head = file.read(_HEAD_BYTES)
+    file.seek(position)
+    match = re.search(rb'\r\n?|\n', head)
+    return b'\r' if match is not None and match.group() == b'\r' and match.end() < len(head) else b'\n'
+
+
+def _translateNewlines(file: IO[bytes], newline: bytes) -> IO[bytes]:
+    # lines that end with a bare carriage return are read as lines that end with a line feed, like text files read them
+    return file if newline == b'\n' else io.BufferedReader(_CarriageReader(file))
+
+
+class _BufferReader(io.RawIOBase):
+    """Seekable binary stream over a buffer like ``io.BytesIO``, but the buffer is not copied.
+    - Only the bytes that are read are copied, the motion rows are located in the buffer itself."""
+
+    def __init__(self, buffer: Union[bytes, bytearray, memoryview, mmap.mmap]) -> None:
+        super().__init__()
+        self._Buffer = memoryview(buffer).cast('B')
+        self._Position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._Position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._Position, io.SEEK_END: len(self._Buffer)}[whence]
+        self._Position = max(0, base + offset)
+        return self._Position
+
+    def read(self, size: int = -1) -> bytes:
+        stop = len(self._Buffer) if size is None or size < 0 else min(len(self._Buffer), self._Position + size)
+        data = self._Buffer[self._Position:stop].tobytes()
+        self._Position = max(self._Position, stop)
+        return data
+
+    def readall(self) -> bytes:
+        return self.read()
+
+    def readinto(self, target) -> int:
+        data = self.read(len(target))
+        target[:len(data)] = data
+        return len(data)
+
+    def readline(self, size: int = -1) -> bytes:
+        # the line break is searched in growing pieces, so long lines are not copied more than twice
+        stop = len(self._Buffer) if size is None or size < 0 else min(len(self._Buffer), self._Position + size)
+        end, length = self._Position, 256
+        while end < stop:
+            found = self._Buffer[end:min(stop, end + length)].tobytes().find(b'\n')
+            if found >= 0:
+                stop = end + found + 1
+                break
+            end, length = min(stop, end + length), length * 2
+        return self.read(stop - self._Position)
+
+    def getbuffer(self) -> memoryview:
+        """Returns the whole buffer as bytes, without copying it."""
+        return self._Buffer
+
+    def close(self) -> None:
+        # the buffer is released, so that a memory map can be closed by its owner
+        if not self.closed:
+            self._Buffer.release()
+        super().close()
+
 
+class _CarriageReader(io.RawIOBase):
+    """Binary stream over a stream whose lines end with a bare carriage return, like files of classic Mac OS.
+    - Every carriage return is read as line feed of the same size, so positions are the positions in the stream.
+    - The stream is not closed with the reader."""
+
+    def __init__(self, file: IO[bytes]) -> None:
+        super().__init__()
+        self._File = file
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return self._File.seekable()
+
+    def tell(self) -> int:
+        return self._File.tell()
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        return self._File.seek(offset, whence)
+
+    def readinto(self, target) -> int:
+        data = self._File.read(len(target)).replace(b'\r', b'\n')
+        target[:len(data)] = data
+        return len(data)
+
+
+def _selectFrames(bvh: BvhContainer, frames: range) -> BvhContainer:
+    bvh.FrameCount = len(frames)
+    bvh.FrameTime = bvh.FrameTime * frames.step
+    return bvh
+
+
+def _selectJoints(root: BvhJoint, joints: JointFilter) -> Optional[list[int]]:
+    # channels of joints that are not selected are removed, returns the motion columns of the selected ones
+    if joints is None:
+        return None
+
+    if callable(joints):
+        isSelected = joints
+    elif isinstance(joints, (str, re.Pattern)):
+        pattern = re.compile(joints)
+        isSelected = lambda joint: pattern.fullmatch(joint.Name) is not None  # noqa: E731
+    else:
+        names = set(joints)
+        unknown = names - {joint.Name for joint, index, depth in root.layout()}
+        if unknown:
+            raise ValueError(f'Joints {sorted(unknown)} are not part of the skeleton')
+        isSelected = lambda joint: joint.Name in names  # noqa: E731
+
+    columns, column = [], 0
+    for joint, index, depth in root.layout():
+        count = len(joint.Channels)
+        if isSelected(joint): columns.extend(range(column, column + count))
+        else: joint.Channels = []
+        column += count
+    return columns
+
+
+def iterateBvh(path: BvhSource, chunkSize: int = 4096, dtype: numpy.dtype = numpy.float64) -> Iterator[BvhContainer]:
+    """Deserialize a .bvh file chunk by chunk, so that only the frames of one chunk are held in memory.
+    - The hierarchy is parsed once, every chunk is a container with its own copy of the skeleton.
+    - A chunk holds up to chunkSize frames as channel matrix, its keyframes start at frame 0.
+    - The file stays open until all chunks are read or the iterator is closed.
+    - Compressed files are decompressed while they are read, see ``readAsBvh``.
+    - Path can also be the data itself as bytes, memoryview, mmap or binary file-like object, see ``readAsBvh``.
+    - dtype is float64 or float32 of the channel matrices, see ``readAsBvh``."""
+    if isinstance(path, (str, os.PathLike)) and not os.path.exists(path):
+        raise FileNotFoundError(errno.ENOENT, os.strerror(errno.ENOENT), path)
+    if chunkSize < 1:
+        raise ValueError('Chunk size must be at least 1')
+
+    return _iterateMotion(path, chunkSize, checkFloatType(dtype))
+
+
+def _iterateMotion(path: BvhSource, chunkSize: int, dtype: numpy.dtype) -> Iterator[BvhContainer]:
+    with _openSource(path) as file:
+        header, line = _parseHeader(file)
+        channels = _countChannels(header.Root)
+
+        for start in range(0, header.FrameCount, chunkSize):
+            frameCount = min(chunkSize, header.FrameCount - start)
+
+            # collect the lines of the chunk, empty lines do not count as frames
+            lines = []
+            frames = 0
+            while frames < frameCount:
+                lines.append(file.readline())
+                if not lines[-1]: raise SyntaxError('Unexpected end of file', (file, line + len(lines), 0, ''))
+                if lines[-1].strip(): frames += 1
+
+            motion = _parseMotion(io.BytesIO(b''.join(lines)), line, frameCount, channels, dtype)
+            line += len(lines)
+            yield BvhContainer(header.Root.duplicate(recursive=True), frameCount, header.FrameTime, motion)
+
+
+def _parseHeader(file: IO) -> tuple[BvhContainer, int]:
     bvh = BvhContainer()
-    with open(path, "r") as file:
-        # check for 'HIERARCHY' start
-        line, tokens, debugInfo = parseLine(file, 0)
-        if not tokens[0] == 'HIERARCHY' and len(tokens) == 1:
-            raise SyntaxError('First line must be only "HIERARCHY"', debugInfo)
 
-        # parse joints recursivly
-        line, tokens, debugInfo = parseLine(file, line)
-        if tokens[0] != 'ROOT':
-            raise SyntaxError('First Joint must be defined as "ROOT"', debugInfo)
-        bvh.Root = _parseJoint(file, _deserializeJointName(tokens, debugInfo))
+    # check for 'HIERARCHY' start
+    line, tokens, debugInfo = parseLine(file, 0)
+    if not tokens[0] == 'HIERARCHY' and len(tokens) == 1:
+        raise SyntaxError('First line must be only "HIERARCHY"', debugInfo)
 
-        # check for 'MOTION' start
-        line, tokens, debugInfo = parseLine(file, line)
-        if not tokens[0] == 'MOTION' or not len(tokens) == 1:
-            raise SyntaxError('After end of hierarchy must follow "MOTION"', debugInfo)
+    # parse joints recursivly
+    line, tokens, debugInfo = parseLine(file, line)
+    if tokens[0] != 'ROOT':
+        raise SyntaxError('First Joint must be defined as "ROOT"', debugInfo)
+    bvh.Root = _parseJoint(file, _deserializeJointName(tokens, debugInfo))
 
-        # check for frame count
-        line, tokens, debugInfo = parseLine(file, line)
-        if not tokens[0] == 'Frames:' or not len(tokens) == 2:
-            raise SyntaxError('First line of "MOTION" section has to be "Frames: X"', debugInfo)
-        else:
-            bvh.FrameCount = _deserializeFrameCount(tokens[1:], debugInfo)
+    # check for 'MOTION' start
+    line, tokens, debugInfo = parseLine(file, line)
+    if not tokens[0] == 'MOTION' or not len(tokens) == 1:
+        raise SyntaxError('After end of hierarchy must follow "MOTION"', debugInfo)
 
-        # check for frame rate
-        line, tokens, debugInfo = parseLine(file, line)
-        if not tokens[0] == 'Frame' or not len(tokens) == 3:
-            raise SyntaxError('After frame count must follow "Frame Time"', debugInfo)
-        else:
-            bvh.FrameTime = _deserializeFrameTime(tokens[2:], debugInfo)
+    # check for frame count
+    line, tokens, debugInfo = parseLine(file, line)
+    if not tokens[0] == 'Frames:' or not len(tokens) == 2:
+        raise SyntaxError('First line of "MOTION" section has to be "Frames: X"', debugInfo)
+    else:
+        bvh.FrameCount = _deserializeFrameCount(tokens[1:], debugInfo)
 
-        # parse motion data
-        if loadKeyFrames:
-            for _ in range(bvh.FrameCount):
-                line, tokens, debugInfo = parseLine(file, line)
-                _deserializeMotion(bvh.Root, _deserializeKeyframe(tokens, debugInfo))
+    # check for frame rate
+    line, tokens, debugInfo = parseLine(file, line)
+    if not tokens[0] == 'Frame' or not len(tokens) == 3:
+        raise SyntaxError('After frame count must follow "Frame Time"', debugInfo)
+    else:
+        bvh.FrameTime = _deserializeFrameTime(tokens[2:], debugInfo)
 
-        return bvh
+    return bvh, line
 
 
-def convertBvhToHierarchy(bvh: BvhJoint) -> Joint:
-    """Converts a deserialized bvh structure into a joint hierarchy."""
+def _countChannels(root: BvhJoint) -> int:
+    return sum(len(joint.Channels) for joint, index, depth in root.layout())
+
+
+def convertBvhToHierarchy(bvh: BvhJoint, dtype: numpy.dtype = numpy.float32) -> Joint:
+    """Converts a deserialized bvh structure into a joint hierarchy.
+    - dtype is float32 or float64 of the keyframe arrays, float32 matches the precision of the glm types."""
     # copy data into a joint
     restPose = Transform(name=f'RestPose.{bvh.Name}', position=bvh.Offset, rotation=bvh.getRotation())
     joint = Joint(bvh.Name, restPose=restPose)
-    for frame, key in enumerate(bvh.Keyframes):
-        joint.setKeyframe(frame, Transform.fromPose(key), keep=None)
-
-    # correct bvh keyframe data
-    for frame, key in joint.Keyframes:
-        # project offset into rest pose because it is given as overwrite and does not include the rest pose rotation.
-        key.Position = joint.RestPose.SpaceInverse * key.Position
 
-        # the rotation is already given as difference, but the multiplication order is switched.
-        key.Rotation = key.Rotation * joint.RestPose.Rotation
-        key.Rotation = (glm.inverse(joint.RestPose.Rotation) * key.Rotation)
+    # joints without channels are not animated, they keep their rest pose without keyframes
+    if not bvh.Channels:
+        for child in bvh.Children:
+            _attachChild(joint, convertBvhToHierarchy(child, dtype))
+        return joint
+
+    # correct bvh keyframe data for all frames at once, float32 math follows glm, so the keys equal the ones of keyframe poses
+    # project offset into rest pose because it is given as overwrite and does not include the rest pose rotation.
+    dtype = checkFloatType(dtype)
+    positions = _transformPoints(joint.RestPose.SpaceInverse, bvh.getKeyframePositions(dtype))
+
+    # the rotation is already given as difference, but the multiplication order is switched.
+    rotation = numpy.array(joint.RestPose.Rotation.to_list(), dtype=dtype)
+    rotationInverse = numpy.array(glm.inverse(joint.RestPose.Rotation).to_list(), dtype=dtype)
+    with stage('eulerToQuats') as timing:
+        rotations = bvh.getKeyframeRotations(dtype)
+        timing.count(objects=len(rotations))
+    rotations = multiplyQuats(rotationInverse, multiplyQuats(rotations, rotation))
+    joint.setKeyframes(numpy.arange(len(positions)), positions, rotations, dtype=dtype)
 
     for child in bvh.Children:
-        # correct the rest pose, because its given without the parents rest pose rotation.
-        childJoint = convertBvhToHierarchy(child)
-        childJoint.RestPose.Position = glm.inverse(joint.RestPose.Rotation) * childJoint.RestPose.Position
-        childJoint.RestPose.Rotation = glm.inverse(joint.RestPose.Rotation) * childJoint.RestPose.Rotation
-        joint.attach(childJoint, keep=None)
+        _attachChild(joint, convertBvhToHierarchy(child, dtype))
 
     return joint
 
 
+def _attachChild(joint: Joint, child: Joint) -> None:
+    # correct the rest pose, because its given without the parents rest pose rotation.
+    child.RestPose.Position = glm.inverse(joint.RestPose.Rotation) * child.RestPose.Position
+    child.RestPose.Rotation = glm.inverse(joint.RestPose.Rotation) * child.RestPose.Rotation
+    joint.attach(child, keep=None)
+
+
 def convertHierarchyToBvh(joint: Joint, frames: int, worldSpace: Optional[Pose] = None) -> BvhJoint:
     """Converts a joint structure into a deseralized bvh structure."""
 
@@ -108,22 +409,26 @@ def convertHierarchyToBvh(joint: Joint, frames: int, worldSpace: Optional[Pose]
     bvh = BvhJoint(joint.Name)
     bvh.Offset = worldSpace.Space * joint.RestPose.Position
     bvh.EndSite = (worldSpace.Space * (0, 1, 0)) * glm.length(joint.RestPose.Position) * 0.3
-    bvh.Keyframes = [joint.getKeyframe(frame).toPose(worldSpace=False) for frame in range(frames)]
+    positions, rotations, _ = joint.sampleKeyframes(numpy.arange(frames), numpy.float32)
 
     worldSpace.Rotation = worldSpace.Rotation * joint.RestPose.Rotation
     worldSpace.Scale = worldSpace.Scale * joint.RestPose.Scale
 
-    if 1e-02 < glm.l1Norm(sum([glm.abs(pose.Position) for pose in bvh.Keyframes])):
+    # channels are only needed if the keyframes change the rest pose
+    if 1e-02 < numpy.abs(positions).sum():
         bvh.Channels.extend(['Xposition', 'Yposition', 'Zposition'])
 
-    if 1e-02 < (sum([sum([abs(d) for d in (pose.Rotation - glm.quat()).to_list()]) for pose in bvh.Keyframes])):
+    if 1e-02 < numpy.abs(rotations - numpy.float32([1, 0, 0, 0])).sum():
         bvh.Channels.extend(['Zrotation', 'Xrotation', 'Yrotation'])
 
-    # convert data to bvh
-    for key in bvh.Keyframes:
-        key.Position = bvh.Offset + (worldSpace.Space * key.Position)
-        key.Rotation = worldSpace.Rotation * key.Rotation
-        key.Rotation = (key.Rotation * glm.inverse(worldSpace.Rotation))
+    # convert data to bvh, the float32 math follows glm, so the values equal the ones of keyframe poses
+    rotation = numpy.array(worldSpace.Rotation.to_list(), dtype=numpy.float32)
+    rotationInverse = numpy.array(glm.inverse(worldSpace.Rotation).to_list(), dtype=numpy.float32)
+    positions = _transformPoints(worldSpace.Space, positions) + numpy.float32(bvh.Offset.to_list())
+    rotations = multiplyQuats(multiplyQuats(rotation, rotations), rotationInverse)
+
+    # the motion is handed over as arrays, so no pose is created for each frame
+    bvh.setKeyframes(positions, rotations)
 
     # add children
     for child in joint.Children:
@@ -133,12 +438,102 @@ def convertHierarchyToBvh(joint: Joint, frames: int, worldSpace: Optional[Pose]
     return bvh
 
 
-def readAsHierarchy(path: str, loadKeyFrames: bool = True) -> Joint:
-    """Deserialize a .bvh file into a joint hierarchy."""
-    return convertBvhToHierarchy(readAsBvh(path, loadKeyFrames).Root).loadRestPose(recursive=True)
+def _transformPoints(space: glm.mat4, points: numpy.ndarray) -> numpy.ndarray:
+    # multiplies points (N, 3) with a matrix in the same order of operations as glm does for a single point
+    columns = numpy.array(space.to_list(), dtype=points.dtype)
+    return (columns[0, :3] * points[:, 0:1] + columns[1, :3] * points[:, 1:2]) + (columns[2, :3] * points[:, 2:3] + columns[3, :3])
+
+
+def readAsHierarchy(path: BvhSource, loadKeyFrames: bool = True, cache: BvhCache = None, workers: int = None,
+                    start: int = None, stop: int = None, step: int = None, joints: JointFilter = None, dtype: numpy.dtype = numpy.float32) -> Joint:
+    """Deserialize a .bvh file into a joint hierarchy.
+    - Path is the path of a file, or the data itself as bytes, memoryview, mmap or binary file-like object, see ``readAsBvh``.
+    - If cache is set -> The file is loaded from the cache if it has a valid entry, otherwise it is parsed and stored there.
+    - If workers is set -> The motion is parsed by that many processes, see ``readAsBvh``.
+    - If start, stop or step is set -> Only the selected frames are loaded as keyframes 0 to n, see ``readAsBvh``.
+    - If joints is set -> Only the selected joints have keyframes, the others keep their rest pose, see ``readAsBvh``.
+    - dtype is float32 or float64 of the keyframe arrays.
+    The channels are parsed as float64 in both cases, because the matrix is only held while the keyframes are calculated from it."""
+    dtype = checkFloatType(dtype)
+    with stage('readAsHierarchy'):
+        bvh = readAsBvh(path, loadKeyFrames, cache, workers, start, stop, step, joints)
+        with stage('convertBvhToHierarchy') as timing:
+            root = convertBvhToHierarchy(bvh.Root, dtype)
+            if timing: timing.count(objects=len(root.layout()))
+        with stage('loadRestPose'):
+            return root.loadRestPose(recursive=True)
+
+
+def readMany(paths: Iterable[str], workers: int = None, ordered: bool = True, asHierarchy: bool = False,
+             loadKeyFrames: bool = True, maxPending: int = None) -> Iterator[tuple[str, Union[BvhContainer, Joint, None], Optional[Exception]]]:
+    """Deserialize many .bvh files in worker processes.
+    - Yields a tuple of path, result and error for each file, the result is None if the file could not be read.
+    - An error of a single file does not stop the other files from being read.
+    - If workers is None -> As many processes as cpu cores are used, if it is below 2 the files are read in this process.
+    - If ordered is True -> The results are in the order of the paths, otherwise in the order they are finished.
+    - If asHierarchy is True -> The results are joint hierarchies, otherwise bvh containers.
+    - maxPending limits the number of files which are read or waiting to be consumed, defaults to twice the workers."""
+    workers = (os.cpu_count() or 1) if workers is None else workers
+    if workers < 2:
+        for path in paths:
+            try:
+                result = readAsHierarchy(path, loadKeyFrames) if asHierarchy else readAsBvh(path, loadKeyFrames)
+            except Exception as error:
+                yield (path, None, error)
+            else:
+                yield (path, result, None)
+        return
+
+    maxPending = (2 * workers) if maxPending is None else max(1, maxPending)
+    paths = iter(paths)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        try:
+            while True:
+                # keep the number of files in flight bounded, so results do not pile up in memory
+                for path in paths:
+                    pending.append((executor.submit(_readCompact, path, loadKeyFrames), path))
+                    if len(pending) >= maxPending:
+                        break
+                if not pending:
+                    return
+
+                if ordered:
+                    future, path = pending.popleft()
+                else:
+                    done, _ = wait([future for future, _ in pending], return_when=FIRST_COMPLETED)
+                    future, path = next(item for item in pending if item[0] in done)
+                    pending.remove((future, path))
+
+                try:
+                    result = _rebuildCompact(future.result(), asHierarchy)
+                except Exception as error:
+                    yield (path, None, error)
+                else:
+                    yield (path, result, None)
+        finally:
+            # files which are not started yet are dropped if the caller stops early
+            for future, _ in pending:
+                future.cancel()
+
+
+def _readCompact(path: str, loadKeyFrames: bool) -> tuple[dict, int, float, Optional[numpy.ndarray]]:
+    # plain data and one array are much cheaper to send between processes than joint and pose objects
+    try:
+        bvh = readAsBvh(path, loadKeyFrames)
+    except SyntaxError as error:
+        # the open file in the error details cannot be sent back to the parent process
+        raise SyntaxError(error.msg, (path, error.lineno, error.offset, error.text)) from None
+    return (bvh.Root.toDict(), bvh.FrameCount, bvh.FrameTime, bvh.Motion)
+
+
+def _rebuildCompact(data: tuple[dict, int, float, Optional[numpy.ndarray]], asHierarchy: bool) -> Union[BvhContainer, Joint]:
+    root, frameCount, frameTime, motion = data
+    bvh = BvhContainer(BvhJoint.fromDict(root), frameCount, frameTime, motion)
+    return convertBvhToHierarchy(bvh.Root).loadRestPose(recursive=True) if asHierarchy else bvh
 
 
-def _parseJoint(file: TextIOWrapper, name: str, line: int = 0) -> BvhJoint:
+def _parseJoint(file: IO, name: str, line: int = 0) -> BvhJoint:
     # check for open bracket
     line, tokens, debugInfo = parseLine(file, line)
     if tokens[0] != '{' or len(tokens) > 1:
@@ -165,13 +560,13 @@ def _parseJoint(file: TextIOWrapper, name: str, line: int = 0) -> BvhJoint:
     return joint
 
 
-def _deserializeJointName(tokens: list[str], debugInfo: tuple[TextIOWrapper, int, int, str]) -> str:
+def _deserializeJointName(tokens: list[str], debugInfo: tuple[IO, int, int, str]) -> str:
     if not isinstance(tokens, list) and len(tokens) != 2:
         raise SyntaxError('Joint header must be 2-dimensional tuple', debugInfo)
     return tokens[1]
 
 
-def _deserializeOffset(file: TextIOWrapper, line: int) -> glm.vec3:
+def _deserializeOffset(file: IO, line: int) -> glm.vec3:
     line, tokens, debugInfo = parseLine(file, line)
     if tokens[0] != 'OFFSET':
         raise SyntaxError('Expected OFFSET definition for joint', debugInfo)
@@ -183,7 +578,7 @@ def _deserializeOffset(file: TextIOWrapper, line: int) -> glm.vec3:
         raise SyntaxError('Offset must be numerics only', debugInfo)
 
 
-def _deserializeChannles(file: TextIOWrapper, line: int) -> list[str]:
+def _deserializeChannles(file: IO, line: int) -> list[str]:
     line, tokens, debugInfo = parseLine(file, line)
     if tokens[0] != 'CHANNELS':
         raise SyntaxError('Expected CHANNELS definition for joint', debugInfo)
@@ -198,7 +593,7 @@ def _deserializeChannles(file: TextIOWrapper, line: int) -> list[str]:
     return tokens[2:]
 
 
-def _deserializeEndSite(file: TextIOWrapper, line: int) -> glm.vec3:
+def _deserializeEndSite(file: IO, line: int) -> glm.vec3:
     line, tokens, debugInfo = parseLine(file, line)
     if tokens[0] != '{':
         raise SyntaxError('End Site definition must start with an opening bracket', debugInfo)
@@ -234,56 +629,335 @@ def _deserializeKeyframe(data: list, debugInfo: tuple) -> numpy.ndarray:
         raise SyntaxError('Keyframe must be numerics only', debugInfo)
 
 
-def _deserializeMotion(joint: BvhJoint, data: numpy.ndarray, index=0) -> int:
-    position = glm.vec3(joint.Offset)
-    rotation = glm.vec3(0)
-    rotOrder = ''
+def _parseMotion(file: IO, line: int, frameCount: int, channelCount: int, dtype: numpy.dtype = numpy.float64, columns: list[int] = None) -> numpy.ndarray:
+    start = file.tell()
+    motion = _decodeMotion(file.read(), frameCount, channelCount, dtype, columns)
+    if motion is not None:
+        return motion
 
-    for channel in joint.Channels:
-        if 'Xposition' == channel: position.x = data[index]
-        elif 'Yposition' == channel: position.y = data[index]
-        elif 'Zposition' == channel: position.z = data[index]
-        elif 'Xrotation' == channel: rotation.x = data[index]; rotOrder += 'X'
-        elif 'Yrotation' == channel: rotation.y = data[index]; rotOrder += 'Y'
-        elif 'Zrotation' == channel: rotation.z = data[index]; rotOrder += 'Z'
-        else: index -= 1
-        index += 1
-
-    rotation = Euler.toQuatFrom(glm.radians(rotation), order=rotOrder, extrinsic=False)
-    joint.Keyframes.append(Pose(position, rotation))
+    # the data is irregular, so it is parsed line by line to find the malformed line
+    file.seek(start)
+    motion = numpy.empty((frameCount, channelCount if columns is None else len(columns)), dtype=dtype)
+    for frame in range(frameCount):
+        line, tokens, debugInfo = parseLine(file, line)
+        keyframe = _deserializeKeyframe(tokens, debugInfo)
+        if len(keyframe) < channelCount:
+            raise SyntaxError('Keyframe has less values than channels are defined', debugInfo)
+        motion[frame] = keyframe[:channelCount] if columns is None else keyframe[columns]
+    return motion
+
+
+def _parseMotionFrames(file: IO, path: str, line: int, channelCount: int, frames: range, workers: int, dtype: numpy.dtype = numpy.float64, columns: list[int] = None) -> numpy.ndarray:
+    # rows are located by their line breaks only, so skipped rows are never tokenized
+    if len(frames) == 0:
+        return numpy.empty((0, channelCount if columns is None else len(columns)), dtype=dtype)
+
+    # buffers are searched in place, streams without file can not be mapped, their remaining lines are read into memory instead
+    if isinstance(file, _BufferReader):
+        return _parseMotionRows(file, path, file.getbuffer(), file.tell(), line, channelCount, frames, None, dtype, columns)
+    if isinstance(file, io.BytesIO):
+        return _parseMotionRows(file, path, file.getvalue(), file.tell(), line, channelCount, frames, None, dtype, columns)
+    if not _isMappable(file):
+        return _parseMotionFrames(io.BytesIO(file.read()), path, line, channelCount, frames, None, dtype, columns)
+
+    with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        return _parseMotionRows(file, path, data, file.tell(), line, channelCount, frames, workers, dtype, columns)
+
+
+def _isMappable(file: IO) -> bool:
+    # compressed streams return the descriptor of the compressed file
+    if isCompressed(file):
+        return False
+    try:
+        file.fileno()
+    except (AttributeError, OSError, ValueError):
+        return False
+    return True
+
+
+def _parseMotionRows(file: IO, path: str, data: Union[mmap.mmap, bytes, memoryview], position: int, line: int, channelCount: int, frames: range, workers: int, dtype: numpy.dtype, columns: list[int]) -> numpy.ndarray:
+    # data is the content of the whole file, so positions in data are positions in the file
+    end, line, rows = _findRows(data, position, line, frames[-1] + 1, frames.start, frames.step)
+    if len(rows) < len(frames):
+        raise SyntaxError('Unexpected end of file', (file, line + 1, 0, ''))
+    file.seek(end)
+
+    begin, line = int(rows[0, 0]), int(rows[0, 2]) - 1
+    if frames.step == 1:
+        if workers is not None and workers >= 2:
+            file.seek(begin)
+            motion = _parseMotionParallel(file, path, line, len(frames), channelCount, workers, end, dtype, columns)
+            file.seek(end)
+            return motion
+        return _parseMotion(io.BytesIO(bytes(data[begin:end])), line, len(frames), channelCount, dtype, columns)
+
+    motion = _decodeMotion(b'\n'.join([data[start:stop] for start, stop, _ in rows.tolist()]), len(rows), channelCount, dtype, columns)
+    if motion is not None:
+        return motion
+
+    # the selected rows are irregular, so they are parsed one by one to find the malformed row
+    motion = numpy.empty((len(rows), channelCount if columns is None else len(columns)), dtype=dtype)
+    for index, (start, stop, number) in enumerate(rows.tolist()):
+        motion[index] = _parseMotion(io.BytesIO(bytes(data[start:stop])), number - 1, 1, channelCount, dtype, columns)[0]
+    return motion
+
+
+def _findRows(data: Union[mmap.mmap, bytes, memoryview], position: int, line: int, count: int, start: int = 0, step: int = 1,
+              newline: bytes = b'\n') -> tuple[int, int, numpy.ndarray]:
+    """Locates the first count rows after position, a row is a line with at least one non whitespace character.
+    - The line breaks are found at once in windows of whole lines, which are small enough to stay in the cache.
+    - Only the rows start, start + step, ... are returned as (begin, end, line number) with the shape (N, 3).
+    - Newline is the byte that ends a line, b'\r' if the lines end with a bare carriage return.
+
+    Returns the position and line number after the last row, or at the end of data if there are less rows."""
+    selected = []
+    found = 0
+    size = len(data)
+    newline = ord(newline)
+    while found < count and position < size:
+        # the window ends after its last line break, it grows if a line is longer than the window
+        end = min(size, position + _SCAN_BYTES)
+        buffer = numpy.frombuffer(data, dtype=numpy.uint8, count=end - position, offset=position)
+        newlines = numpy.flatnonzero(buffer == newline)
+        while end < size and len(newlines) == 0:
+            end = min(size, end + (end - position))
+            buffer = numpy.frombuffer(data, dtype=numpy.uint8, count=end - position, offset=position)
+            newlines = numpy.flatnonzero(buffer == newline)
+        if end < size:
+            end = position + int(newlines[-1]) + 1
+            buffer = buffer[:end - position]
+        begins = numpy.concatenate(([0], newlines + 1))
+        ends = numpy.append(newlines, end - position)
+
+        # lines that start with a non whitespace character are rows, only the others are checked for other characters
+        filled = ends > begins
+        filled[filled] = ~_WHITESPACE[buffer[begins[filled]]]
+        del buffer
+        for index in numpy.flatnonzero(~filled & (ends > begins)).tolist():
+            filled[index] = len(bytes(data[position + begins[index]:position + ends[index]]).strip()) > 0
+        lines = numpy.flatnonzero(filled)[:count - found]
+
+        # rows of this window are numbered from found on, the selection keeps every step-th row from start on
+        numbers = numpy.arange(found, found + len(lines)) - start
+        keep = lines[(numbers >= 0) & (numbers % step == 0)]
+        selected.append(numpy.stack([begins[keep] + position, ends[keep] + position, keep + line + 1], axis=1))
+        found += len(lines)
+
+        if found == count and len(lines) > 0:
+            last = int(lines[-1])
+            line += last + 1
+            position = min(position + (int(newlines[last]) + 1 if last < len(newlines) else end - position), size)
+        else:
+            line += len(newlines) + (data[end - 1] != newline)
+            position = end
+
+    rows = numpy.concatenate(selected).astype(numpy.int64) if selected else numpy.empty((0, 3), dtype=numpy.int64)
+    return position, line, rows
+
+
+def _parseMotionParallel(file: IO, path: str, line: int, frameCount: int, channelCount: int, workers: int, end: int = None, dtype: numpy.dtype = numpy.float64, columns: list[int] = None) -> numpy.ndarray:
+    dtype = numpy.dtype(dtype)
+    start = file.tell()
+    ranges = _splitLines(file, start, os.fstat(file.fileno()).st_size if end is None else end, workers)
+    if channelCount == 0 or frameCount == 0 or len(ranges) < 2:
+        file.seek(start)
+        return _parseMotion(file, line, frameCount, channelCount, dtype, columns)
+
+    # workers have to share the tracker of the shared memory, otherwise each of them would release it on exit
+    resource_tracker.ensure_running()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # the rows of each range are counted first, so that every range knows its place in the matrix
+        jobs = []
+        row = 0
+        for span, rows in zip(ranges, executor.map(_countRows, [path] * len(ranges), ranges)):
+            rows = min(rows, frameCount - row)
+            if rows > 0:
+                jobs.append((span[0], span[1], row, rows))
+            row += rows
+
+        width = channelCount if columns is None else len(columns)
+        if row == frameCount and width > 0:
+            memory = shared_memory.SharedMemory(create=True, size=frameCount * width * dtype.itemsize)
+            try:
+                count = len(jobs)
+                if all(executor.map(_parseRange, [path] * count, jobs, [memory.name] * count, [channelCount] * count, [dtype.str] * count, [columns] * count)):
+                    return numpy.ndarray((frameCount, width), dtype=dtype, buffer=memory.buf).copy()
+            finally:
+                memory.close()
+                memory.unlink()
+
+    # missing or malformed rows are parsed again serially, so the error is reported as without workers
+    file.seek(start)
+    return _parseMotion(file, line, frameCount, channelCount, dtype, columns)
+
+
+def _splitLines(file: IO, start: int, size: int, workers: int) -> list[tuple[int, int]]:
+    # several ranges per worker balance the load, the ranges end on line breaks
+    length = min(max((size - start) // (workers * 4), _RANGE_BYTES[0]), _RANGE_BYTES[1])
+    ranges = []
+    while start < size:
+        file.seek(min(start + length, size))
+        end = size if file.tell() >= size else file.tell() + len(file.readline())
+        ranges.append((start, end))
+        start = end
+    return ranges
+
+
+def _readRange(path: str, begin: int, end: int) -> bytes:
+    with open(path, "rb") as file:
+        file.seek(begin)
+        return file.read(end - begin)
+
+
+def _countRows(path: str, span: tuple[int, int]) -> int:
+    # a row is a line with at least one non whitespace character, like the lines parseLine() does not skip
+    buffer = numpy.frombuffer(_readRange(path, *span), dtype=numpy.uint8)
+    lines = numpy.searchsorted(numpy.flatnonzero(buffer == 10), numpy.flatnonzero(~_WHITESPACE[buffer]))
+    return 0 if len(lines) == 0 else int(numpy.count_nonzero(numpy.diff(lines))) + 1
+
+
+def _parseRange(path: str, job: tuple[int, int, int, int], name: str, channelCount: int, dtype: str, columns: list[int] = None) -> bool:
+    begin, end, row, rows = job
+    try:
+        motion = _parseMotion(io.BytesIO(_readRange(path, begin, end)), 0, rows, channelCount, numpy.dtype(dtype), columns)
+    except SyntaxError:
+        return False
 
-    for child in joint.Children:
-        index = _deserializeMotion(child, data, index)
-    return index
+    memory = shared_memory.SharedMemory(name=name)
+    try:
+        numpy.ndarray((row + rows, motion.shape[1]), dtype=motion.dtype, buffer=memory.buf)[row:] = motion
+    finally:
+        memory.close()
+    return True
+
+
+def _decodeMotion(data: bytes, frameCount: int, channelCount: int, dtype: numpy.dtype = numpy.float64, columns: list[int] = None) -> Optional[numpy.ndarray]:
+    """Decodes the motion lines in a single pass into a (frameCount, channelCount) matrix.
+    - Values are parsed directly into dtype, float32 values are the nearest float32 of the text.
+    - If columns is set -> The rows are decoded in blocks and only the columns are kept, so the matrix of all channels is never allocated.
+    - Returns None if the data is not exactly one line per frame with one value per channel."""
+    if columns is not None:
+        return _decodeColumns(data, frameCount, channelCount, dtype, columns)
+    if channelCount == 0:
+        return numpy.empty((frameCount, 0), dtype=dtype)
+
+    # locate tokens and lines, so that the line structure can be validated without splitting
+    buffer = numpy.frombuffer(data, dtype=numpy.uint8)
+    whitespace = _WHITESPACE[buffer]
+    tokens = numpy.flatnonzero(~whitespace & numpy.concatenate(([True], whitespace[:-1])))
+    newlines = numpy.flatnonzero(buffer == 10)
+    tokensPerLine = numpy.bincount(numpy.searchsorted(newlines, tokens), minlength=len(newlines) + 1)
+
+    # empty lines are skipped, lines after the last frame are ignored
+    lines = numpy.flatnonzero(tokensPerLine)[:frameCount]
+    if len(lines) < frameCount or numpy.any(tokensPerLine[lines] != channelCount):
+        return None
+    if frameCount == 0:
+        return numpy.empty((0, channelCount), dtype=dtype)
+
+    end = newlines[lines[-1]] if lines[-1] < len(newlines) else len(data)
+    try:
+        values = numpy.fromstring(data if end == len(data) else data[:end], dtype=dtype, sep=' ')
+    except ValueError:
+        return None
+    if len(values) != frameCount * channelCount:
+        return None
+
+    return values.reshape((frameCount, channelCount))
 
 
-def writeBvh(path: str, bvh: BvhContainer, percision: int = 9) -> None:
-    with open(path, "w") as file:
-        file.write('HIERARCHY\n')
-        writeJoint(file, bvh.Root, 0, True, percision)
+def _decodeColumns(data: bytes, frameCount: int, channelCount: int, dtype: numpy.dtype, columns: list[int]) -> Optional[numpy.ndarray]:
+    # the rows are located first, each block of rows is decoded on its own and reduced to the columns
+    _, _, rows = _findRows(data, 0, 0, frameCount)
+    if len(rows) < frameCount:
+        return None
 
-        file.write('MOTION\n')
-        file.write(f'Frames: {bvh.FrameCount}\n')
-        file.write(f'Frame Time: {bvh.FrameTime}\n')
+    motion = numpy.empty((frameCount, len(columns)), dtype=dtype)
+    for start in range(0, frameCount, _FRAMES_PER_BLOCK):
+        stop = min(start + _FRAMES_PER_BLOCK, frameCount)
+        block = _decodeMotion(data[rows[start, 0]:rows[stop - 1, 1]], stop - start, channelCount, dtype)
+        if block is None:
+            return None
+        motion[start:stop] = block[:, columns]
+    return motion
 
-        for frame in range(bvh.FrameCount):
-            writeMotion(file, bvh.Root, frame, percision)
-            file.write('\n')
 
+def writeBvh(path: BvhTarget, bvh: BvhContainer, percision: int = 9, workers: int = None) -> Optional[bytes]:
+    """Serializes the simple bvh structure into a .bvh file.
+    - percision limits the percision of floating numbers be written.
+    - The motion of all joints is collected into one channel matrix, which is formatted and written in blocks of frames.
+    - If workers is set -> The blocks are formatted by that many processes, which pays off for very long animations.
+    - If the path ends with .gz, .bz2, .xz or .lzma -> The file is compressed while it is written.
+    - If path is a text or binary file-like object -> The data is written into it from its current position, it is not closed.
+    - If path is None -> The data is returned as bytes, otherwise None is returned.
+    - Data will be overwritten if the file already exists"""
+    buffer = io.BytesIO() if path is None else None
+    with stage('writeBvh'):
+        with stage('serialize') as timing:
+            motion = _serializeMotion(bvh.Root, bvh.FrameCount)
+            timing.count(objects=motion.size, bytes=motion.nbytes)
+
+        with _openTarget(path if buffer is None else buffer) as file:
+            with stage('header') as timing:
+                header = io.StringIO()
+                header.write('HIERARCHY\n')
+                writeJoint(header, bvh.Root, 0, True, percision)
+
+                header.write('MOTION\n')
+                header.write(f'Frames: {bvh.FrameCount}\n')
+                header.write(f'Frame Time: {bvh.FrameTime}\n')
+                timing.count(objects=len(bvh.Root.layout()), bytes=file.write(header.getvalue()))
+
+            with stage('motion') as timing:
+                blocks = [motion[start:start + _FRAMES_PER_BLOCK] for start in range(0, len(motion), _FRAMES_PER_BLOCK)]
+                if workers is None or workers < 2 or len(blocks) < 2:
+                    for block in blocks:
+                        timing.count(bytes=file.write(_formatMotion(block, percision)))
+                else:
+                    with ProcessPoolExecutor(max_workers=workers) as executor:
+                        for text in executor.map(_formatMotion, blocks, [percision] * len(blocks)):
+                            timing.count(bytes=file.write(text))
+                timing.count(objects=len(motion))
+
+    return None if buffer is None else buffer.getvalue()
+
+
+@contextmanager
+def _openTarget(target: BvhTarget) -> Iterator[IO[str]]:
+    # binary streams are wrapped for writing text, the wrapper is detached so that the stream stays open
+    if isinstance(target, (str, os.PathLike)):
+        with openFile(target, "w") as file:
+            yield file
+    elif isinstance(target, io.TextIOBase):
+        yield target
+    else:
+        file = io.TextIOWrapper(target, encoding='utf-8', write_through=True)
+        try:
+            yield file
+        finally:
+            file.flush()
+            file.detach()
 
-def writeHierarchy(path: str, root: Joint, frameTime: float, frames: int = None, percision: int = 9) -> None:
+
+def writeHierarchy(path: BvhTarget, root: Joint, frameTime: float, frames: int = None, percision: int = 9, workers: int = None) -> Optional[bytes]:
     """Creates an .bvh file from the given hierarchy.
     - frameTime defines the FPS
     - IF frames is None -> THe whole animation is written.
     - If frames is set -> The Animation is written from frame 0 to frame.
     - percision limits the percision of floating numbers be written.
+    - If workers is set -> The motion is formatted by that many processes, see ``writeBvh``.
+    - If the path ends with .gz, .bz2, .xz or .lzma -> The file is compressed, see ``writeBvh``.
+    - If path is a file-like object -> The data is written into it, if it is None the data is returned as bytes, see ``writeBvh``.
     - Data will be overwritten if the file already exists"""
-    frames = (root.getKeyframeRange()[1] + 1) if frames is None else frames
-    container = BvhContainer(convertHierarchyToBvh(root, frames + 1), frames, frameTime)
-    writeBvh(path, container, percision)
+    with stage('writeHierarchy'):
+        frames = (root.getKeyframeRange()[1] + 1) if frames is None else frames
+        with stage('convertHierarchyToBvh') as timing:
+            container = BvhContainer(convertHierarchyToBvh(root, frames + 1), frames, frameTime)
+            if timing: timing.count(objects=len(root.layout()))
+        return writeBvh(path, container, percision, workers)
 
 
-def writeJoint(file: TextIOWrapper, joint: BvhJoint, indent: int, isFirst: bool, percision: int) -> None:
+def writeJoint(file: IO, joint: BvhJoint, indent: int, isFirst: bool, percision: int) -> None:
     file.write(f'{"  "*indent}{"ROOT" if isFirst else "JOINT"} {joint.Name}\n')
     file.write(f'{"  "*indent}{{\n')
     file.write(f'{"  "*(indent+1)}OFFSET ')
@@ -305,7 +979,45 @@ def writeJoint(file: TextIOWrapper, joint: BvhJoint, indent: int, isFirst: bool,
     file.write(f'{"  "*indent}}}\n')
 
 
-def writeMotion(file: TextIOWrapper, joint: BvhJoint, frame: int, percision: int) -> None:
+def _serializeMotion(root: BvhJoint, frameCount: int) -> numpy.ndarray:
+    joints = [joint for joint, index, depth in root.layout()]
+    motion = numpy.zeros((frameCount, _countChannels(root)))
+
+    index = 0
+    for joint in joints:
+        if not joint.Channels:
+            continue
+        if joint.getKeyframeCount() < frameCount:
+            raise ValueError(f'Joint "{joint.Name}" has less keyframes than the frame count of {frameCount}')
+
+        rotOrder = ''.join([rot[0] for rot in joint.Channels if rot[1:] == 'rotation'])
+        if 'Z' not in rotOrder: rotOrder += 'Z'
+        if 'X' not in rotOrder: rotOrder += 'X'
+        if 'Y' not in rotOrder: rotOrder += 'Y'
+
+        # values are taken in the precision of the keyframe poses, so they are written like poses are written
+        positions = joint.getKeyframePositions(numpy.float32)[:frameCount]
+        rotations = quatsToEuler(joint.getKeyframeRotations(numpy.float32)[:frameCount], rotOrder, extrinsic=False)
+
+        for channel in joint.Channels:
+            if 'Xposition' == channel: motion[:, index] = positions[:, 0]
+            elif 'Yposition' == channel: motion[:, index] = positions[:, 1]
+            elif 'Zposition' == channel: motion[:, index] = positions[:, 2]
+            elif 'Xrotation' == channel: motion[:, index] = rotations[:, 0]
+            elif 'Yrotation' == channel: motion[:, index] = rotations[:, 1]
+            elif 'Zrotation' == channel: motion[:, index] = rotations[:, 2]
+            index += 1
+
+    return motion
+
+
+def _formatMotion(motion: numpy.ndarray, percision: int) -> str:
+    if motion.shape[1] == 0:
+        return '\n' * len(motion)
+    return ''.join([' '.join([str(round(value, percision)) for value in frame]) + ' \n' for frame in motion.tolist()])
+
+
+def writeMotion(file: IO, joint: BvhJoint, frame: int, percision: int) -> None:
     rotOrder = ''.join([rot[0] for rot in joint.Channels if rot[1:] == 'rotation'])
     if 'Z' not in rotOrder: rotOrder += 'Z'
     if 'X' not in rotOrder: rotOrder += 'X'
@@ -0,0 +1,155 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator, Union
+
+
+class _ThreadState(threading.local):
+    # profiles that are recording and the open stages of one thread, stages are only measured if there is at least one profile
+    def __init__(self) -> None:
+        self.Profiles: list["ProfileStats"] = []
+        self.Stages: list[str] = []
+
+
+_STATE = _ThreadState()
+
+
+class StageStats:
+    """Measurements of one stage, summed over all of its calls.
+
+    Name is the path of the stage, nested stages are joined with a dot, like 'readAsHierarchy.readAsBvh.motion'.
+
+    Objects and Bytes count what the stage has processed, their meaning depends on the stage, like joints or frames."""
+    Name: str
+    Calls: int
+    Seconds: float
+    Objects: int
+    Bytes: int
+
+    def __init__(self, name: str) -> None:
+        self.Name = name
+        self.Calls = 0
+        self.Seconds = 0.0
+        self.Objects = 0
+        self.Bytes = 0
+
+    def __repr__(self) -> str:
+        return (f'{self.Name}: {self.Calls} calls, {self.Seconds:.6f}s, {self.Objects} objects, {self.Bytes} bytes')
+
+    def toDict(self) -> dict:
+        """Converts the stats into a dictionary that can be logged or stored as JSON."""
+        return {'name': self.Name, 'calls': self.Calls, 'seconds': self.Seconds, 'objects': self.Objects, 'bytes': self.Bytes}
+
+
+class ProfileStats:
+    """Stats of all stages that were run while the profile was recording.
+
+    Stages are in the order of their first call.
+
+    Seconds is the wall time of the whole profile."""
+    Stages: dict[str, StageStats]
+    Seconds: float
+
+    def __init__(self) -> None:
+        self.Stages = {}
+        self.Seconds = 0.0
+
+    def __repr__(self) -> str:
+        return '\n'.join([f'{"Stage":<48}{"Calls":>8}{"Seconds":>12}{"Objects":>12}{"Bytes":>14}'] + [
+            f'{stage.Name:<48}{stage.Calls:>8}{stage.Seconds:>12.6f}{stage.Objects:>12}{stage.Bytes:>14}'
+            for stage in self.Stages.values()])
+
+    def __str__(self) -> str:
+        return self.__repr__()
+
+    def getStage(self, name: str) -> StageStats:
+        """Returns the stats of the stage with the given path, or None if it was not called."""
+        return self.Stages.get(name)
+
+    def toDict(self) -> dict:
+        """Converts the stats into a dictionary that can be logged or stored as JSON."""
+        return {'seconds': self.Seconds, 'stages': [stage.toDict() for stage in self.Stages.values()]}
+
+    def record(self, name: str, seconds: float, objects: int, bytes: int) -> "ProfileStats":
+        """Adds one call of a stage.
+
+        Returns itself."""
+        stage = self.Stages.get(name)
+        if stage is None:
+            stage = self.Stages[name] = StageStats(name)
+        stage.Calls += 1
+        stage.Seconds += seconds
+        stage.Objects += objects
+        stage.Bytes += bytes
+        return self
+
+
+@contextmanager
+def profile() -> Iterator[ProfileStats]:
+    """Records the stages of all bvhio calls within the context.
+    - Returns the stats object right away, it is filled while the context is open.
+    - Profiles can be nested, each one records the stages of its own context.
+    - Profiles are per thread, they only record the calls of the thread that opened them, other threads can profile at the same time.
+    - Without a profile the stages are not measured, which costs close to nothing.
+    - Work of worker processes is measured as part of the stage that waits for them."""
+    stats = ProfileStats()
+    _STATE.Profiles.append(stats)
+    start = time.perf_counter()
+    try:
+        yield stats
+    finally:
+        stats.Seconds = time.perf_counter() - start
+        _STATE.Profiles.remove(stats)
+
+
+class _Stage:
+    def __init__(self, name: str) -> None:
+        self.Name = name
+        self.Objects = 0
+        self.Bytes = 0
+
+    def __enter__(self) -> "_Stage":
+        _STATE.Stages.append(self.Name)
+        self.Path = '.'.join(_STATE.Stages)
+        for stats in _STATE.Profiles:
+            if self.Path not in stats.Stages: stats.Stages[self.Path] = StageStats(self.Path)
+        self.Start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exception) -> bool:
+        seconds = time.perf_counter() - self.Start
+        _STATE.Stages.pop()
+        for stats in _STATE.Profiles:
+            stats.record(self.Path, seconds, self.Objects, self.Bytes)
+        return False
+
+    def __bool__(self) -> bool:
+        return True
+
+    def count(self, objects: int = 0, bytes: int = 0) -> None:
+        self.Objects += objects
+        self.Bytes += bytes
+
+
+class _NoStage:
+    def __enter__(self) -> "_NoStage":
+        return self
+
+    def __exit__(self, *exception) -> bool:
+        return False
+
+    def __bool__(self) -> bool:
+        return False
+
+    def count(self, objects: int = 0, bytes: int = 0) -> None:
+        pass
+
+
+_NO_STAGE = _NoStage()
+
+
+def stage(name: str) -> Union[_Stage, _NoStage]:
+    """Context manager that measures the wall time of a stage, if a profile is recording.
+    - Objects and bytes are added with ``count()`` of the returned object.
+    - The returned object is false if no profile is recording, so that expensive counts can be skipped."""
+    return _Stage(name) if _STATE.Profiles else _NO_STAGE
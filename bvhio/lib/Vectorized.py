@@ -0,0 +1,163 @@
+import glm
+import numpy
+
+
+def multiplyQuats(a: numpy.ndarray, b: numpy.ndarray) -> numpy.ndarray:
+    """Multiplies quaternions (w, x, y, z) element wise as ``a * b``.
+    - Arrays must have the shape (..., 4) and are broadcasted against each other.
+    - The terms are summed in the order of glm, so float32 quaternions match the glm result exactly."""
+    aw, ax, ay, az = numpy.moveaxis(numpy.asarray(a), -1, 0)
+    bw, bx, by, bz = numpy.moveaxis(numpy.asarray(b), -1, 0)
+    return numpy.stack([
+        aw * bw - ax * bx - ay * by - az * bz,
+        aw * bx + ax * bw + ay * bz - az * by,
+        aw * by + ay * bw + az * bx - ax * bz,
+        aw * bz + az * bw + ax * by - ay * bx,
+    ], axis=-1)
+
+
+def slerpQuats(a: numpy.ndarray, b: numpy.ndarray, weights: numpy.ndarray) -> numpy.ndarray:
+    """Spherical linear interpolation of quaternions (w, x, y, z) element wise, like ``glm.slerp``.
+    - Arrays must have the shape (N, 4) and weights the shape (N,).
+    - The interpolation takes the short path, nearly equal quaternions are interpolated linearly.
+    - float32 quaternions are interpolated with float32 math in the order of glm and the trigonometry of glm, exactly like ``glm.slerp``.
+
+    Returns an array with the shape (N, 4), float32 for float32 quaternions and float64 otherwise."""
+    a, b = numpy.asarray(a), numpy.asarray(b)
+    dtype = numpy.float32 if numpy.result_type(a, b) == numpy.float32 else numpy.float64
+    a = a.astype(dtype).reshape((-1, 4))
+    b = b.astype(dtype).reshape((-1, 4))
+    weights = numpy.asarray(weights, dtype=dtype).reshape((-1, 1))
+
+    cos = (a[:, 0:1] * b[:, 0:1] + a[:, 1:2] * b[:, 1:2]) + (a[:, 2:3] * b[:, 2:3] + a[:, 3:4] * b[:, 3:4])
+    b = numpy.where(cos < 0, -b, b)
+    cos = numpy.where(cos < 0, -cos, cos)
+    linear = cos > dtype(1) - numpy.finfo(numpy.float32).eps
+
+    if dtype == numpy.float32:
+        # glm divides the weighted sum by the sine, the weights of the linear case are the ones of glm.mix
+        angle = _applyGlm(glm.acos, numpy.minimum(cos, 1))
+        sines = _applyGlm(glm.sin, numpy.concatenate([(dtype(1) - weights) * angle, weights * angle, angle], axis=1))
+        with numpy.errstate(divide='ignore', invalid='ignore'):
+            spherical = (sines[:, 0:1] * a + sines[:, 1:2] * b) / sines[:, 2:3]
+        return numpy.where(linear, a * (dtype(1) - weights) + b * weights, spherical)
+
+    angle = numpy.arccos(numpy.minimum(cos, 1))
+    sin = numpy.sin(angle)
+    sin = numpy.where(linear, 1, sin)
+    weightA = numpy.where(linear, 1 - weights, numpy.sin((1 - weights) * angle) / sin)
+    weightB = numpy.where(linear, weights, numpy.sin(weights * angle) / sin)
+    return weightA * a + weightB * b
+
+
+def eulerToQuats(degrees: numpy.ndarray, order: str = 'ZXY', extrinsic: bool = False) -> numpy.ndarray:
+    """Converts euler angles to quaternions (w, x, y, z) for many rotations at once.
+    - Degrees are given with the shape (N, 3), where the columns are the X, Y and Z angle.
+    - Order is given as 'XYZ' in any order. Partial orders like 'ZX' are allowed, missing axes are not applied.
+    - Defaults to intrinsic rotations, which are used by .bvh channels.
+    - Matches ``Euler.toQuatFrom(glm.radians(degrees), order, extrinsic)`` for each row.
+    - float32 degrees are converted with float32 math and the sine and cosine of glm, exactly like the glm based conversion.
+
+    Returns an array with the shape (N, 4), float32 for float32 degrees and float64 otherwise."""
+    degrees = numpy.asarray(degrees)
+    dtype = numpy.float32 if degrees.dtype == numpy.float32 else numpy.float64
+    degrees = degrees.astype(dtype).reshape((-1, 3))
+    if dtype == numpy.float32:
+        halfRadians = (degrees * dtype(0.01745329251994329576923690768489)) * dtype(0.5)
+        cos, sin = _applyGlm(glm.cos, halfRadians), _applyGlm(glm.sin, halfRadians)
+    else:
+        halfRadians = numpy.radians(degrees) * 0.5
+        cos, sin = numpy.cos(halfRadians), numpy.sin(halfRadians)
+
+    order = order.upper()
+    if extrinsic: order = order[::-1]
+
+    result = numpy.zeros((len(degrees), 4), dtype=dtype)
+    result[:, 0] = 1
+    for axis in order:
+        if axis not in 'XYZ' or len(axis) != 1:
+            raise ValueError(f'given order "{order}" is invalid. Must be "XYZ" in any order')
+
+        # the axis is scaled by the sine like glm.rotate does, which keeps the sign of zeros
+        column = 'XYZ'.index(axis)
+        rotation = numpy.empty((len(degrees), 4), dtype=dtype)
+        rotation[:, 0] = cos[:, column]
+        rotation[:, 1:] = numpy.eye(3, dtype=dtype)[column] * sin[:, column, None]
+        result = multiplyQuats(result, rotation)
+
+    return result
+
+
+def _applyGlm(function, values: numpy.ndarray) -> numpy.ndarray:
+    # applies a glm function to the rows of a float32 array with the shape (N, 1) to (N, 4), with the float32 precision of glm
+    if len(values) == 0:
+        return values.copy()
+    results = glm.array(numpy.ascontiguousarray(values)).map(function)
+    return numpy.frombuffer(results.to_bytes(), dtype=numpy.float32).reshape(values.shape)
+
+
+def quatsToEuler(quats: numpy.ndarray, order: str = 'ZXY', extrinsic: bool = False) -> numpy.ndarray:
+    """Converts quaternions (w, x, y, z) to euler angles in degrees for many rotations at once.
+    - Quaternions are given with the shape (N, 4), the result has the shape (N, 3) with the X, Y and Z angle as columns.
+    - Order must be given as 'XYZ' in any order.
+    - Defaults to intrinsic rotations, which are used by .bvh channels.
+    - Gimbal locks are resolved like ``Euler.fromQuatTo``, which is matched for each row.
+    - float32 quaternions are converted with float32 matrices, exactly like the glm based conversion."""
+    quats = numpy.asarray(quats)
+    dtype = numpy.float32 if quats.dtype == numpy.float32 else numpy.float64
+    w, x, y, z = numpy.moveaxis(quats.reshape((-1, 4)).astype(dtype), -1, 0)
+
+    order = order.upper()
+    if extrinsic: order = order[::-1]
+    if sorted(order) != ['X', 'Y', 'Z']:
+        raise ValueError(f'given order "{order}" is invalid. Must be "XYZ" in any order')
+
+    # rotation matrix as in glm.mat3_cast, indexed as [column][row]
+    xx, yy, zz = x * x, y * y, z * z
+    xy, xz, yz = x * y, x * z, y * z
+    wx, wy, wz = w * x, w * y, w * z
+    mat = [
+        [1 - 2 * (yy + zz), 2 * (xy + wz), 2 * (xz - wy)],
+        [2 * (xy - wz), 1 - 2 * (xx + zz), 2 * (yz + wx)],
+        [2 * (xz + wy), 2 * (yz - wx), 1 - 2 * (xx + yy)],
+    ]
+    mat = [[value.astype(numpy.float64) for value in column] for column in mat]
+
+    atan2 = numpy.arctan2
+
+    def asin(a: numpy.ndarray) -> numpy.ndarray:
+        return numpy.arctan2(a, numpy.sqrt(numpy.maximum(0, 1 - a**2)))
+
+    if order == 'XYZ': radians = (atan2(-mat[2][1], mat[2][2]), asin(mat[2][0]), atan2(-mat[1][0], mat[0][0]))
+    elif order == 'XZY': radians = (atan2(mat[1][2], mat[1][1]), atan2(mat[2][0], mat[0][0]), asin(-mat[1][0]))
+    elif order == 'YXZ': radians = (asin(-mat[2][1]), atan2(mat[2][0], mat[2][2]), atan2(mat[0][1], mat[1][1]))
+    elif order == 'YZX': radians = (atan2(-mat[2][1], mat[1][1]), atan2(-mat[0][2], mat[0][0]), asin(mat[0][1]))
+    elif order == 'ZXY': radians = (asin(mat[1][2]), atan2(-mat[0][2], mat[2][2]), atan2(-mat[1][0], mat[1][1]))
+    else: radians = (atan2(mat[1][2], mat[2][2]), asin(-mat[0][2]), atan2(mat[0][1], mat[0][0]))
+
+    radians = numpy.stack(radians, axis=-1).astype(dtype)
+    return radians * dtype(57.295779513082320876798154814105)
+
+
+def quatsToMatrices(quats: numpy.ndarray) -> numpy.ndarray:
+    """Converts quaternions (w, x, y, z) to rotation matrices for many rotations at once.
+    - Quaternions are given with the shape (..., 4), the result has the shape (..., 3, 3).
+    - The matrices are indexed as [row][column], so that they rotate column vectors by ``matrix @ vector``."""
+    w, x, y, z = numpy.moveaxis(numpy.asarray(quats, dtype=numpy.float64), -1, 0)
+    xx, yy, zz = x * x, y * y, z * z
+    xy, xz, yz = x * y, x * z, y * z
+    wx, wy, wz = w * x, w * y, w * z
+    return numpy.stack([
+        numpy.stack([1 - 2 * (yy + zz), 2 * (xy - wz), 2 * (xz + wy)], axis=-1),
+        numpy.stack([2 * (xy + wz), 1 - 2 * (xx + zz), 2 * (yz - wx)], axis=-1),
+        numpy.stack([2 * (xz - wy), 2 * (yz + wx), 1 - 2 * (xx + yy)], axis=-1),
+    ], axis=-2)
+
+
+def checkFloatType(dtype: numpy.dtype) -> numpy.dtype:
+    """Returns the dtype as numpy dtype, it must be float32 or float64.
+    - float32 holds about 7 significant digits, which covers the 4 to 6 digits of motion capture data."""
+    dtype = numpy.dtype(dtype)
+    if dtype not in (numpy.float32, numpy.float64):
+        raise ValueError(f'dtype must be float32 or float64, not {dtype}')
+    return dtype
@@ -1,3 +1,5 @@
+import numpy
+
 from .BvhJoint import BvhJoint
 
 
@@ -8,12 +10,37 @@ class BvhContainer:
 
     Frame time the frame time.
 
-    Frams are the count of keyframes of the motion."""
+    Frams are the count of keyframes of the motion.
+
+    Motion is the optional channel matrix of all joints with the shape (frames, channels)."""
     Root: BvhJoint
     FrameCount: int
     FrameTime: float
+    Motion: numpy.ndarray
 
-    def __init__(self, root: BvhJoint = None, frameCount: int = None, frameTime: float = None):
+    def __init__(self, root: BvhJoint = None, frameCount: int = None, frameTime: float = None, motion: numpy.ndarray = None):
         self.Root: BvhJoint = root
         self.FrameCount: int = frameCount
         self.FrameTime: float = frameTime
+        self.Motion: numpy.ndarray = None
+
+        if motion is not None:
+            self.setMotion(motion)
+
+    def setMotion(self, motion: numpy.ndarray) -> "BvhContainer":
+        """Sets the channel matrix with the shape (frames, channels) and hands each joint a view of its columns.
+        - The columns follow the joint order of ``Root.layout()`` and the channels of each joint.
+        - Joints whose keyframes are accessed or replaced later on do not read from the matrix anymore.
+
+        Returns itself."""
+        joints = [joint for joint, index, depth in self.Root.layout()]
+        if motion.ndim != 2 or motion.shape[1] != sum(len(joint.Channels) for joint in joints):
+            raise ValueError('Motion columns must match the channels of all joints')
+
+        index = 0
+        for joint in joints:
+            joint.setMotion(motion[:, index:index + len(joint.Channels)])
+            index += len(joint.Channels)
+
+        self.Motion = motion
+        return self
@@ -1,6 +1,9 @@
 import glm
+import numpy
 from SpatialTransform import Pose
 
+from ..Vectorized import eulerToQuats
+
 
 class BvhJoint:
     """Data structure for the bvh skeleton definition. Contains the attributes as in the BVH file.
@@ -9,17 +12,46 @@ class BvhJoint:
     Name: str
     Offset: glm.vec3
     EndSite: glm.vec3
-    Keyframes: list[Pose]
     Channels: list[str]
     Children: list["BvhJoint"]
 
+    @property
+    def Keyframes(self) -> list[Pose]:
+        """Motion data of the joint as one pose per frame, a channel matrix or keyframe arrays are turned into poses on the first access and released."""
+        if self._Keyframes is None:
+            positions = self.getKeyframePositions(numpy.float32).tolist()
+            rotations = self.getKeyframeRotations(numpy.float32).tolist()
+            self._Keyframes = [Pose(position, glm.quat(*rotation)) for position, rotation in zip(positions, rotations)]
+            self._Motion = None
+            self._KeyframeArrays = None
+        return self._Keyframes
+
+    @Keyframes.setter
+    def Keyframes(self, value: list[Pose]) -> None:
+        self._Keyframes = list(value)
+        self._Motion = None
+        self._KeyframeArrays = None
+
+    @property
+    def Motion(self) -> numpy.ndarray:
+        """Channel matrix with the shape (frames, channels) in the order of ``MotionChannels``, or None if the motion is given otherwise."""
+        return self._Motion
+
+    @property
+    def MotionChannels(self) -> list[str]:
+        """Channels of the columns of the channel matrix, which may differ from the current channels of the joint."""
+        return list(self._MotionChannels)
+
     def __init__(self, name: str, offset: glm.vec3 = None) -> None:
         self.Name = name
         self.Offset = glm.vec3() if offset is None else glm.vec3(offset)
         self.EndSite = glm.vec3(0, 1, 0)
-        self.Keyframes = []
         self.Channels = []
         self.Children = []
+        self._Keyframes: list[Pose] = []
+        self._Motion: numpy.ndarray = None
+        self._MotionChannels: list[str] = []
+        self._KeyframeArrays: tuple[numpy.ndarray, numpy.ndarray] = None
 
     def __repr__(self) -> str:
         return (f"{self.Name}")
@@ -63,3 +95,108 @@ class BvhJoint:
         for child in self.Children:
             result.extend(child.layout(result[-1][1] + 1, depth + 1))
         return result
+
+    def duplicate(self, recursive: bool = True) -> "BvhJoint":
+        """Returns a copy of the joint definition and its motion data.
+        - A channel matrix and keyframe arrays are shared with the duplicate, keyframe poses are copied.
+        - If recursive is True -> The children are duplicated as well."""
+        joint = BvhJoint(self.Name, self.Offset)
+        joint.EndSite = glm.vec3(self.EndSite)
+        joint.Channels = list(self.Channels)
+        joint._Motion = self._Motion
+        joint._MotionChannels = list(self._MotionChannels)
+        joint._KeyframeArrays = self._KeyframeArrays
+        joint._Keyframes = None if self._Keyframes is None else [pose.duplicate() for pose in self._Keyframes]
+
+        if recursive:
+            joint.Children = [child.duplicate(recursive=True) for child in self.Children]
+        return joint
+
+    def toDict(self) -> dict:
+        """Returns the joint definition and its children as plain data, without motion data."""
+        return {
+            'Name': self.Name,
+            'Offset': self.Offset.to_list(),
+            'EndSite': self.EndSite.to_list(),
+            'Channels': list(self.Channels),
+            'Children': [child.toDict() for child in self.Children],
+        }
+
+    @staticmethod
+    def fromDict(data: dict) -> "BvhJoint":
+        """Creates a joint and its children from the plain data of ``toDict()``."""
+        joint = BvhJoint(data['Name'], data['Offset'])
+        joint.EndSite = glm.vec3(data['EndSite'])
+        joint.Channels = list(data['Channels'])
+        joint.Children = [BvhJoint.fromDict(child) for child in data['Children']]
+        return joint
+
+    def setMotion(self, motion: numpy.ndarray) -> "BvhJoint":
+        """Sets the motion data of the joint as channel matrix with the shape (frames, channels).
+        - The columns must follow the current channels of the joint.
+        - The matrix is not copied, so views of a bigger matrix do not allocate memory.
+        - Keyframes are only created from the matrix when they are accessed.
+
+        Returns itself."""
+        if motion.ndim != 2 or motion.shape[1] != len(self.Channels):
+            raise ValueError(f'Motion of joint "{self.Name}" must have the shape (frames, {len(self.Channels)})')
+
+        self._Motion = motion
+        self._MotionChannels = list(self.Channels)
+        self._KeyframeArrays = None
+        self._Keyframes = None
+        return self
+
+    def setKeyframes(self, positions: numpy.ndarray, rotations: numpy.ndarray) -> "BvhJoint":
+        """Sets the motion data of the joint as positions (frames, 3) and quaternions (w, x, y, z) with the shape (frames, 4).
+        - The arrays are not copied and keep their dtype, float32 arrays hold the same values as keyframe poses.
+        - Keyframes are only created from the arrays when they are accessed.
+
+        Returns itself."""
+        if positions.shape != (len(positions), 3) or rotations.shape != (len(positions), 4):
+            raise ValueError(f'Keyframes of joint "{self.Name}" must have the shapes (frames, 3) and (frames, 4)')
+
+        self._KeyframeArrays = (positions, rotations)
+        self._Motion = None
+        self._Keyframes = None
+        return self
+
+    def getKeyframeCount(self) -> int:
+        """Number of frames of the motion data, without creating keyframes."""
+        if self._Keyframes is not None: return len(self._Keyframes)
+        if self._KeyframeArrays is not None: return len(self._KeyframeArrays[0])
+        return len(self._Motion)
+
+    def getKeyframePositions(self, dtype: numpy.dtype = numpy.float64) -> numpy.ndarray:
+        """Positions of all frames as array with the shape (frames, 3).
+        - Position channels overwrite the offset, missing channels keep the offset value.
+        - dtype float32 gives the values of the keyframe poses."""
+        if self._Keyframes is not None:
+            return numpy.array([pose.Position.to_list() for pose in self._Keyframes], dtype=dtype).reshape((-1, 3))
+        if self._KeyframeArrays is not None:
+            return self._KeyframeArrays[0].astype(dtype)
+
+        positions = numpy.empty((len(self._Motion), 3), dtype=dtype)
+        positions[:] = self.Offset.to_list()
+        for index, channel in enumerate(self._MotionChannels):
+            if 'Xposition' == channel: positions[:, 0] = self._Motion[:, index]
+            elif 'Yposition' == channel: positions[:, 1] = self._Motion[:, index]
+            elif 'Zposition' == channel: positions[:, 2] = self._Motion[:, index]
+        return positions
+
+    def getKeyframeRotations(self, dtype: numpy.dtype = numpy.float64) -> numpy.ndarray:
+        """Rotations of all frames as quaternions (w, x, y, z) with the shape (frames, 4).
+        - dtype float32 gives the values of the keyframe poses, channels are converted like ``Euler.toQuatFrom()`` does."""
+        if self._Keyframes is not None:
+            return numpy.array([pose.Rotation.to_list() for pose in self._Keyframes], dtype=dtype).reshape((-1, 4))
+        if self._KeyframeArrays is not None:
+            return self._KeyframeArrays[1].astype(dtype)
+
+        degrees = numpy.zeros((len(self._Motion), 3), dtype=dtype)
+        rotOrder = ''
+        for index, channel in enumerate(self._MotionChannels):
+            if 'Xrotation' == channel: degrees[:, 0] = self._Motion[:, index]; rotOrder += 'X'
+            elif 'Yrotation' == channel: degrees[:, 1] = self._Motion[:, index]; rotOrder += 'Y'
+            elif 'Zrotation' == channel: degrees[:, 2] = self._Motion[:, index]; rotOrder += 'Z'
+
+        return eulerToQuats(degrees, order=rotOrder, extrinsic=False)
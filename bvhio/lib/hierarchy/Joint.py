@@ -1,6 +1,12 @@
 import glm
 import bisect
+import numpy
+from typing import Optional
+from collections import OrderedDict
 from SpatialTransform import Transform, Pose
+from ..Vectorized import checkFloatType, slerpQuats
+
+_INTERPOLATION_CACHE_SIZE = 1024
 
 
 class Joint(Transform):
@@ -10,7 +16,8 @@ class Joint(Transform):
     - Positive rotations are counter clockwise.
     - The animation is a cualculation of ``Pose = RestPose + Keyframe``
     - The RestPose and Keyframe data is in local space only.
-    - The method ``readPose()`` combines the RestPose and Keframes."""
+    - The method ``readPose()`` combines the RestPose and Keframes.
+    - Keyframes can be stored as arrays with ``setKeyframes()``, transforms are only created when the ``Keyframes`` property is accessed."""
 
     @property
     def Parent(self) -> "Joint":
@@ -30,13 +37,22 @@ class Joint(Transform):
         """Animation data for the joint. A keyframe holds the change of local properties in relation to the rest pose, so that ``Pose = RestPose + Keyframe``.
     - The first element in the tuple is the frame id and the second element are the local keyframe properties.
     - This is an ordered list by the frame id.
-    - Negative frame ids should not exist."""
+    - Negative frame ids should not exist.
+    - Keyframes stored as arrays are turned into transforms when this property is accessed, and are not stored as arrays anymore."""
+        if self._Keyframes is None:
+            self.__createKeyframeTransforms()
+
+        # the list can be modified from outside, so the frame ids are collected again on the next lookup
+        self._KeyframeFrames = None
         return self._Keyframes
 
     @Keyframes.setter
     def Keyframes(self, value: list[tuple[int, Transform]]) -> None:
         self._Keyframes = list(value)
-        self._KeyframeMap = {frame: key for frame, key in self._Keyframes}
+        self._KeyframeFrames = None
+        self._KeyframeArrays = None
+        self._KeyframeSamples = None
+        self._InterpolationCache.clear()
         self.RestPose.clearChildren(keep=[None])
         self.RestPose.attach(*[key for frame, key in value], keep=[None])
 
@@ -63,90 +79,243 @@ class Joint(Transform):
 
         self._RestPose: Transform = Transform(name='RestPose') if restPose is None else restPose
         self._Keyframes: list[tuple[int, Transform]] = [] if keyFrames is None else keyFrames
-        self._KeyframeMap = {frame: key for frame, key in self._Keyframes}
+        self._KeyframeFrames: list[int] = None
+        self._KeyframeArrays: tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray, numpy.ndarray] = None
+        self._KeyframeSamples: tuple[Optional[int], glm.array, glm.array, glm.array] = None
+        self._InterpolationCache: OrderedDict[int, tuple[glm.vec3, glm.quat, glm.vec3]] = OrderedDict()
         self._CurrentFrame = -1
 
-    def __findFrameIndex(self, frame: int):
-        if not self.Keyframes:
-            return 0
+    def __getFrameIds(self) -> list[int]:
+        # the frame ids are kept next to the keyframes, they are collected again after the list has been handed out
+        if self._KeyframeFrames is None:
+            self._KeyframeFrames = [frame for frame, _ in self._Keyframes]
+        return self._KeyframeFrames
+
+    def __getKeyframeSamples(self) -> tuple[Optional[int], glm.array, glm.array, glm.array]:
+        # glm copies of the keyframe arrays, reading a single keyframe from them is much faster than from numpy
+        # the first frame id is kept if the frame ids have no gaps, so the index of a frame is known without a search
+        if self._KeyframeSamples is None:
+            frames, positions, rotations, scales = self._KeyframeArrays
+            first, last = int(frames[0]), int(frames[-1])
+            self._KeyframeSamples = (
+                first if last - first == len(frames) - 1 else None,
+                glm.array(numpy.ascontiguousarray(positions, dtype=numpy.float32)),
+                glm.array(numpy.ascontiguousarray(rotations, dtype=numpy.float32)).reinterpret_cast(glm.quat),
+                glm.array(numpy.ascontiguousarray(scales, dtype=numpy.float32)))
+        return self._KeyframeSamples
 
-        if frame > self.Keyframes[-1][0]:
-            return len(self.Keyframes)
+    def __findFrameIndex(self, frame: int):
+        if self._Keyframes is None:
+            count = len(self._KeyframeArrays[0])
+            first = self.__getKeyframeSamples()[0] if count > 0 else None
+            if first is not None:
+                return min(max(frame - first, 0), count)
+            return int(numpy.searchsorted(self._KeyframeArrays[0], frame))
+
+        return bisect.bisect_left(self.__getFrameIds(), frame)
+
+    def __getFrameId(self, index: int) -> int:
+        if self._Keyframes is not None:
+            return self._Keyframes[index][0]
+
+        first = self.__getKeyframeSamples()[0]
+        return first + index if first is not None else int(self._KeyframeArrays[0][index])
+
+    def __insertKeyframe(self, index: int, frame: int, key: Transform) -> None:
+        self.__getFrameIds().insert(index, frame)
+        self._Keyframes.insert(index, (frame, key))
+
+    def __createKeyframeTransforms(self) -> None:
+        frames, positions, rotations, scales = self._KeyframeArrays
+        self.Keyframes = [
+            (frame, Transform(name=f'Key {frame}', position=glm.vec3(position), rotation=glm.quat(*rotation), scale=glm.vec3(scale)))
+            for frame, position, rotation, scale in zip(frames.tolist(), positions.tolist(), rotations.tolist(), scales.tolist())]
+
+    def __getKeyframeValues(self, index: int) -> tuple[glm.vec3, glm.quat, glm.vec3]:
+        if self._Keyframes is not None:
+            key = self._Keyframes[index][1]
+            return (key.Position, key.Rotation, key.Scale)
+
+        _, positions, rotations, scales = self.__getKeyframeSamples()
+        return (positions[index], rotations[index], scales[index])
+
+    def __locateKeyframe(self, frame: int) -> tuple[int, int]:
+        # indices of the keyframes before and after the frame, both are the same if no interpolation is needed
+        count = self.getKeyframeCount()
+        index = self.__findFrameIndex(frame)
+        if index == count:
+            return (count - 1, count - 1)
+
+        if self.__getFrameId(index) == frame or index == 0:
+            return (index, index)
+        return (index - 1, index)
+
+    def __sampleKeyframe(self, frame: int) -> tuple[glm.vec3, glm.quat, glm.vec3]:
+        # keyframe values in the space of the rest pose, without creating transforms
+        if self.getKeyframeCount() == 0:
+            return (glm.vec3(0), glm.quat(), glm.vec3(1))
+
+        if self._Keyframes is None and isinstance(frame, int):
+            first, positions, rotations, scales = self.__getKeyframeSamples()
+            if first is not None:
+                # without gaps in the frame ids every frame is a keyframe, or out of the range and takes the nearest one
+                index = min(max(frame - first, 0), len(positions) - 1)
+                return (positions[index], rotations[index], scales[index])
+
+        before, after = self.__locateKeyframe(frame)
+        if before == after:
+            return self.__getKeyframeValues(before)
+
+        # only interpolations of array stores are cached, transform keyframes can be changed from outside at any time
+        cached = self._InterpolationCache.get(frame) if self._Keyframes is None else None
+        if cached is not None:
+            self._InterpolationCache.move_to_end(frame)
+            return cached
+
+        beforeFrame, afterFrame = self.__getFrameId(before), self.__getFrameId(after)
+        weight = (frame - beforeFrame) / (afterFrame - beforeFrame)
+        beforeValues = self.__getKeyframeValues(before)
+        afterValues = self.__getKeyframeValues(after)
+        result = (
+            glm.lerp(beforeValues[0], afterValues[0], weight),
+            glm.slerp(beforeValues[1], afterValues[1], weight),
+            glm.lerp(beforeValues[2], afterValues[2], weight))
+
+        if self._Keyframes is None:
+            self._InterpolationCache[frame] = result
+            if len(self._InterpolationCache) > _INTERPOLATION_CACHE_SIZE:
+                self._InterpolationCache.popitem(last=False)
+        return result
+
+    def __resolveFrame(self, frame: int) -> int:
+        return max(0, self.getKeyframeRange(includeChildren=False)[1] + 1 - frame) if frame < 0 else frame
+
+    def setKeyframes(self, frames: numpy.ndarray, positions: numpy.ndarray, rotations: numpy.ndarray, scales: numpy.ndarray = None, dtype: numpy.dtype = numpy.float32) -> "Joint":
+        """Replaces all keyframes with the given arrays, without creating a transform for each keyframe.
+        - Frames are the frame ids with the shape (N,), they must be sorted and unique.
+        - Positions (N, 3), rotations (N, 4) as (w, x, y, z) and scales (N, 3) are given in the space of the rest pose.
+        - If scales is None -> All keyframes have a scale of (1, 1, 1).
+        - The values are stored as dtype, float32 like the glm types or float64 to keep the precision of the arrays.
+        - The arrays are copied, so changing the keyframes later on does not change the given arrays.
 
-        return bisect.bisect_left([key[0] for key in self.Keyframes], frame)
+        Returns itself."""
+        dtype = checkFloatType(dtype)
+        frames = numpy.array(frames, dtype=numpy.int64).reshape(-1)
+        positions = numpy.array(positions, dtype=dtype).reshape((-1, 3))
+        rotations = numpy.array(rotations, dtype=dtype).reshape((-1, 4))
+        scales = numpy.ones((len(frames), 3), dtype=dtype) if scales is None else numpy.array(scales, dtype=dtype).reshape((-1, 3))
+        if not (len(frames) == len(positions) == len(rotations) == len(scales)):
+            raise ValueError(f'Keyframe arrays of joint "{self.Name}" must have the same length')
+        if numpy.any(numpy.diff(frames) <= 0):
+            raise ValueError(f'Keyframe frames of joint "{self.Name}" must be sorted and unique')
+
+        self.Keyframes = []
+        self._Keyframes = None
+        self._KeyframeArrays = (frames, positions, rotations, scales)
+        self._KeyframeSamples = None
+        return self
 
-    def __insertKeyframe(self, frame: int, key: Transform) -> None:
-        bisect.insort(self.Keyframes, (frame, key))
-        self._KeyframeMap[frame] = key
+    def getKeyframeCount(self) -> int:
+        """Number of keyframes, without creating transforms for keyframes stored as arrays."""
+        return len(self._KeyframeArrays[0]) if self._Keyframes is None else len(self._Keyframes)
+
+    def getKeyframeFrames(self) -> numpy.ndarray:
+        """Frame ids of all keyframes as array with the shape (keyframes,)."""
+        if self._Keyframes is None:
+            return self._KeyframeArrays[0].copy()
+        return numpy.array([frame for frame, _ in self._Keyframes], dtype=numpy.int64)
+
+    def getKeyframePositions(self) -> numpy.ndarray:
+        """Positions of all keyframes in the space of the rest pose as array with the shape (keyframes, 3)."""
+        if self._Keyframes is None:
+            return self._KeyframeArrays[1].copy()
+        return numpy.array([key.Position.to_list() for _, key in self._Keyframes], dtype=numpy.float32).reshape((-1, 3))
+
+    def getKeyframeRotations(self) -> numpy.ndarray:
+        """Rotations of all keyframes in the space of the rest pose as quaternions (w, x, y, z) with the shape (keyframes, 4)."""
+        if self._Keyframes is None:
+            return self._KeyframeArrays[2].copy()
+        return numpy.array([key.Rotation.to_list() for _, key in self._Keyframes], dtype=numpy.float32).reshape((-1, 4))
+
+    def getKeyframeScales(self) -> numpy.ndarray:
+        """Scales of all keyframes in the space of the rest pose as array with the shape (keyframes, 3)."""
+        if self._Keyframes is None:
+            return self._KeyframeArrays[3].copy()
+        return numpy.array([key.Scale.to_list() for _, key in self._Keyframes], dtype=numpy.float32).reshape((-1, 3))
 
     def getKeyframe(self, frame: int) -> Transform:
         """Returns the pose at the given frame id.
         - If the frame number is negative, it will look for the n-th frame from the end.
         - If there are no keyframes, the joint propetries will not change.
         - If the frame id is out of the keyframe length, the nearest keyframe propetires are used.
-        - If the frame id is between two keyframes, pose properties are linearly interpolated."""
-        if len(self.Keyframes) == 0:
+        - If the frame id is between two keyframes, positions and scales are linearly and rotations spherically interpolated.
+        - Stored keyframes are returned as they are, so changing them changes the animation.
+        - Keyframes stored as arrays are returned as a transform of this keyframe only, which reads and writes its values in the arrays.
+        - Interpolated keyframes are returned as copy, changing them does not change the animation."""
+        if self.getKeyframeCount() == 0:
             key = Transform(name=f'Key {frame} (placeholder)')
             self.RestPose.duplicate(recursive=False).attach(key, keep=None)
             return key
 
-        if frame < 0:
-            frame = max(0, self.getKeyframeRange(includeChildren=False)[1] + 1 - frame)
-
-        existingFrame = self._KeyframeMap.get(frame)
-        if existingFrame:
-            return existingFrame
+        frame = self.__resolveFrame(frame)
+        before, after = self.__locateKeyframe(frame)
+        if before == after:
+            # the stored key is returned and may be modified from outside, keys of array stores write into the arrays
+            if self._Keyframes is not None:
+                return self._Keyframes[before][1]
+            key = _ArrayKeyframe(self, self.__getFrameId(before))
+            self.RestPose.duplicate(recursive=False).attach(key, keep=None)
+            return key
 
-        # pose definition
-        index = self.__findFrameIndex(frame)
-        if index == len(self.Keyframes):
-            # index is bigger than last frame, take last key
-            return self.Keyframes[-1][1]
-        elif self.Keyframes[index][0] == frame:
-            # index matches a keyframe
-            return self.Keyframes[index][1]
-        else:
-            if index == 0:
-                # index is smaller than first frame, take first key
-                return self.Keyframes[-1][1]
-            else:
-                # index is in between two keyframes, interpolate
-                before = self.Keyframes[index - 1]
-                after = self.Keyframes[index]
-                weight = (before[0] + frame) / after[0]
-
-                restPoseCopy = self.RestPose.duplicate(recursive=False).attach(
-                    Transform(
-                        name=f'Key {frame} (interpolated)',
-                        position=glm.lerp(before[1].Position, after[1].Position, weight),
-                        rotation=glm.lerp(before[1].Rotation, after[1].Rotation, weight),
-                        scale=glm.lerp(before[1].Scale, after[1].Scale, weight)
-                    ), keep=None
-                )
-                return restPoseCopy.Children[0]
+        position, rotation, scale = self.__sampleKeyframe(frame)
+        restPoseCopy = self.RestPose.duplicate(recursive=False).attach(
+            Transform(name=f'Key {frame}' if before == after else f'Key {frame} (interpolated)', position=position, rotation=rotation, scale=scale), keep=None)
+        return restPoseCopy.Children[0]
 
     def setKeyframe(self, frame: int, pose: Transform = None, keep: list[str] = ['position', 'rotation', 'scale']) -> "Joint":
         """Inserts the given pose to the the keyframes.
         - If the pose is none, the current pose of the joint is used as keyframe.
         - If there is already a keyframe at the frame id, it will be overwritten.
         - If the frame number is negative, it counts as the n-th frame from the end."""
-        if frame < 0: frame = max(0, self.getKeyframeRange(includeChildren=False)[1] + 1 - frame)
+        frame = self.__resolveFrame(frame)
         index = self.__findFrameIndex(frame)
         pose = (pose or self).duplicate(False)
+        self._InterpolationCache.clear()
+
+        if self._Keyframes is None:
+            # same correction as attaching the key to the rest pose
+            keep = keep or []
+            position = self.RestPose.SpaceWorldInverse * pose.Position if 'position' in keep else pose.Position
+            rotation = self.RestPose.RotationWorldInverse * pose.Rotation if 'rotation' in keep else pose.Rotation
+            scale = self.RestPose.ScaleWorldInverse * pose.Scale if 'scale' in keep else pose.Scale
+
+            frames, positions, rotations, scales = self._KeyframeArrays
+            self._KeyframeSamples = None
+            if index == len(frames) or frames[index] != frame:
+                self._KeyframeArrays = (
+                    numpy.insert(frames, index, frame),
+                    numpy.insert(positions, index, position.to_list(), axis=0),
+                    numpy.insert(rotations, index, rotation.to_list(), axis=0),
+                    numpy.insert(scales, index, scale.to_list(), axis=0))
+            else:
+                positions[index] = position.to_list()
+                rotations[index] = rotation.to_list()
+                scales[index] = scale.to_list()
+            return self
 
-        if index == len(self.Keyframes) or self.Keyframes[index][0] != frame:
+        if index == len(self._Keyframes) or self._Keyframes[index][0] != frame:
             newKey = Transform(name=f'Key {frame}', position=pose.Position, rotation=pose.Rotation, scale=pose.Scale)
-            self.__insertKeyframe(frame, newKey)
+            self.__insertKeyframe(index, frame, newKey)
             self.RestPose.attach(newKey, keep=keep)
         else:
-            if 'position' in keep: self.Keyframes[index][1].PositionWorld = pose.Position
-            else: self.Keyframes[index][1].Position = pose.Position
+            if 'position' in keep: self._Keyframes[index][1].PositionWorld = pose.Position
+            else: self._Keyframes[index][1].Position = pose.Position
 
-            if 'rotation' in keep: self.Keyframes[index][1].RotationWorld = pose.Rotation
-            else: self.Keyframes[index][1].Rotation = pose.Rotation
+            if 'rotation' in keep: self._Keyframes[index][1].RotationWorld = pose.Rotation
+            else: self._Keyframes[index][1].Rotation = pose.Rotation
 
-            if 'scale' in keep: self.Keyframes[index][1].ScaleWorld = pose.Scale
-            else: self.Keyframes[index][1].Scale = pose.Scale
+            if 'scale' in keep: self._Keyframes[index][1].ScaleWorld = pose.Scale
+            else: self._Keyframes[index][1].Scale = pose.Scale
 
         return self
 
@@ -156,9 +325,15 @@ class Joint(Transform):
 
         Returns itself."""
         index = self.__findFrameIndex(frame)
+        self._InterpolationCache.clear()
 
-        if index != len(self.Keyframes) and self.Keyframes[index][0] == frame:
-            self.Keyframes.pop(index)[1].clearParent(keep=None)
+        if self._Keyframes is None:
+            if index != self.getKeyframeCount() and self._KeyframeArrays[0][index] == frame:
+                self._KeyframeArrays = tuple(numpy.delete(array, index, axis=0) for array in self._KeyframeArrays)
+                self._KeyframeSamples = None
+        elif index != len(self._Keyframes) and self._Keyframes[index][0] == frame:
+            self.__getFrameIds().pop(index)
+            self._Keyframes.pop(index)[1].clearParent(keep=None)
 
         if recursive:
             for child in self.Children:
@@ -171,11 +346,11 @@ class Joint(Transform):
         - This is the animation data without rest pose.
 
         Returns itself."""
-        key = self.getKeyframe(frame)
+        position, rotation, scale = self.__sampleKeyframe(self.__resolveFrame(frame))
 
-        if 'position' in use: self.Position = key.Position
-        if 'rotation' in use: self.Rotation = key.Rotation
-        if 'scale' in use: self.Scale = key.Scale
+        if 'position' in use: self.Position = position
+        if 'rotation' in use: self.Rotation = rotation
+        if 'scale' in use: self.Scale = scale
 
         if recursive:
             for child in self.Children:
@@ -235,14 +410,17 @@ class Joint(Transform):
         - If recursive is True -> Child joints do also load their pose.
 
         Returns itself."""
-        # get animation data
-        key = self.getKeyframe(frame)
+        # get animation data, world space includes the transform from the rest pose
+        position, rotation, scale = self.__sampleKeyframe(self.__resolveFrame(frame))
+        position = self.RestPose.SpaceWorld * position
+        rotation = self.RestPose.RotationWorld * rotation
+        scale = self.RestPose.ScaleWorld * scale
 
-        # set animation pose, world space includes the transform from the rest pose
+        # set animation pose
         self._CurrentFrame = frame
-        if 'position' in use: self.Position = key.PositionWorld
-        if 'rotation' in use: self.Rotation = key.RotationWorld
-        if 'scale' in use: self.Scale = key.ScaleWorld
+        if 'position' in use: self.Position = position
+        if 'rotation' in use: self.Rotation = rotation
+        if 'scale' in use: self.Scale = scale
 
         # may do it recursively
         if recursive:
@@ -272,18 +450,96 @@ class Joint(Transform):
     def getKeyframeRange(self, includeChildren: bool = True) -> tuple[int, int]:
         """Returns the earliest and latest frame id of the animation.
         - If there are no keyframes, `(0, 0)` is returned.
+        - Joints without keyframes do not change the range of the others.
         - If includeChildren is True -> The range considers the earliest and latest frames from its children too.
         The tuple layout is -> [FirstFrameId, LastFrameId]"""
-        if len(self.Keyframes) == 0: return (0, 0)
-        range = (self.Keyframes[0][0], self.Keyframes[-1][0])
+        range = self.__getKeyframeRange(includeChildren)
+        return (0, 0) if range is None else range
+
+    def __getKeyframeRange(self, includeChildren: bool) -> Optional[tuple[int, int]]:
+        # None if there are no keyframes, so joints without keyframes do not widen the range of their parents or children
+        range = None
+        if self.getKeyframeCount() == 0: pass
+        elif self._Keyframes is None: range = (int(self._KeyframeArrays[0][0]), int(self._KeyframeArrays[0][-1]))
+        else: range = (self._Keyframes[0][0], self._Keyframes[-1][0])
 
         if includeChildren:
             for child in self.Children:
-                childRange = child.getKeyframeRange(includeChildren=True)
-                range = (min(range[0], childRange[0]), max(range[1], childRange[1]))
+                childRange = child.__getKeyframeRange(includeChildren=True)
+                if childRange is None: continue
+                range = childRange if range is None else (min(range[0], childRange[0]), max(range[1], childRange[1]))
 
         return range
 
+    def resample(self, sourceFrameTime: float, targetFrameTime: float, recursive: bool = True) -> "Joint":
+        """Changes the frame time of the animation, e.g. from 120 to 60 fps, by sampling the keyframes at the times of the new frames.
+        - All new frames of a joint are calculated at once, positions and scales are linearly and rotations spherically interpolated.
+        - The new keyframes start at frame 0, one for each frame, and are stored as arrays.
+        - If recursive is True -> Child joints are resampled too, over the frame range of the whole hierarchy.
+        - The animation has to be written with the new frame time afterwards, e.g. ``writeHierarchy(path, joint, targetFrameTime)``.
+
+        Returns itself."""
+        if sourceFrameTime <= 0 or targetFrameTime <= 0:
+            raise ValueError('Frame times must be greater than 0')
+
+        ratio = targetFrameTime / sourceFrameTime
+        lastFrame = self.getKeyframeRange(includeChildren=recursive)[1]
+        times = numpy.arange(int(numpy.floor(lastFrame / ratio + 1e-09)) + 1) * ratio
+        self.__resampleKeyframes(times, recursive)
+        return self
+
+    def __resampleKeyframes(self, times: numpy.ndarray, recursive: bool) -> None:
+        if self.getKeyframeCount() > 0:
+            dtype = numpy.float32 if self._Keyframes is not None else self._KeyframeArrays[1].dtype
+            self.setKeyframes(numpy.arange(len(times)), *self.sampleKeyframes(times), dtype=dtype)
+
+        if recursive:
+            for child in self.Children:
+                child.__resampleKeyframes(times, recursive=True)
+
+    def sampleKeyframes(self, frames: numpy.ndarray, dtype: numpy.dtype = numpy.float64) -> tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray]:
+        """Returns the keyframe properties at many frames at once, like ``getKeyframe()`` does for a single frame.
+        - Frames are given with the shape (N,) and may be fractional.
+        - If there are no keyframes, the properties do not change the rest pose.
+        - If a frame is out of the keyframe range, the nearest keyframe propetires are used.
+        - If a frame is between two keyframes, positions and scales are linearly and rotations spherically interpolated.
+        - dtype is float64 or float32 of the results. float32 is interpolated in the order of glm, so the values equal the ones of ``getKeyframe()``.
+
+        Returns the positions (N, 3), rotations (N, 4) as (w, x, y, z) and scales (N, 3) in the space of the rest pose."""
+        dtype = checkFloatType(dtype)
+        frames = numpy.asarray(frames, dtype=numpy.float64).reshape(-1)
+        if self.getKeyframeCount() == 0:
+            return (
+                numpy.zeros((len(frames), 3), dtype=dtype),
+                numpy.tile(numpy.array([1.0, 0.0, 0.0, 0.0], dtype=dtype), (len(frames), 1)),
+                numpy.ones((len(frames), 3), dtype=dtype))
+
+        keyFrames = self.getKeyframeFrames()
+        positions = self.getKeyframePositions().astype(dtype)
+        rotations = self.getKeyframeRotations().astype(dtype)
+        scales = self.getKeyframeScales().astype(dtype)
+
+        # frames out of the keyframe range take the nearest keyframe
+        after = numpy.searchsorted(keyFrames, frames, side='right')
+        before = numpy.clip(after - 1, 0, len(keyFrames) - 1)
+        after = numpy.clip(after, 0, len(keyFrames) - 1)
+        span = numpy.maximum(keyFrames[after] - keyFrames[before], 1)
+        weights = numpy.clip((frames - keyFrames[before]) / span, 0, 1)[:, None]
+
+        if dtype == numpy.float64:
+            return (
+                positions[before] + (positions[after] - positions[before]) * weights,
+                slerpQuats(rotations[before], rotations[after], weights),
+                scales[before] + (scales[after] - scales[before]) * weights)
+
+        # glm.lerp weights both values, keyframes themselves are taken as they are stored like getKeyframe() does
+        weights = weights.astype(numpy.float32)
+        stored = weights == 0
+        return (
+            numpy.where(stored, positions[before], positions[before] * (1 - weights) + positions[after] * weights),
+            numpy.where(stored, rotations[before], slerpQuats(rotations[before], rotations[after], weights)),
+            numpy.where(stored, scales[before], scales[before] * (1 - weights) + scales[after] * weights))
+
     def getRootChain(self) -> list["Joint"]:
         """Returns the all joints up to the root. Order is from root to self. Does not include itself"""
         chain: list[Joint] = [self]
@@ -350,6 +606,10 @@ class Joint(Transform):
 
         Returns itself.
         """
+        # the keyframes are children of the rest pose and are updated by it
+        if self._Keyframes is None: self.__createKeyframeTransforms()
+        self._InterpolationCache.clear()
+
         change, changeInverse = self.RestPose._applyPositionGetChanges(position)
         self.RestPose.applyPosition(position, recursive=False)
 
@@ -372,6 +632,10 @@ class Joint(Transform):
 
         Returns itself.
         """
+        # the keyframes are children of the rest pose and are updated by it
+        if self._Keyframes is None: self.__createKeyframeTransforms()
+        self._InterpolationCache.clear()
+
         change, changeInverse = self.RestPose._applyRotationGetChanges(rotation)
         self.RestPose.applyRotation(rotation, recursive=False, bake=bakeKeyframes)
 
@@ -394,6 +658,10 @@ class Joint(Transform):
 
         Returns itself.
         """
+        # the keyframes are children of the rest pose and are updated by it
+        if self._Keyframes is None: self.__createKeyframeTransforms()
+        self._InterpolationCache.clear()
+
         change, changeInverse = self.RestPose._applyScaleGetChanges(scale)
         self.RestPose.applyScale(scale, recursive=False, bake=bakeKeyframes)
 
@@ -416,3 +684,67 @@ class Joint(Transform):
 
     def layout(self, index: int = 0, depth: int = 0) -> list[tuple["Joint", int, int]]:
         return super().layout(index, depth)
+
+
+class _ArrayKeyframe(Transform):
+    """Stored keyframe of a joint that holds its keyframes as arrays, without turning the other keyframes into transforms.
+    - Position, rotation and scale are read from the row of the frame id and written into it, so changes change the animation.
+    - If the keyframe is removed or the arrays are replaced, the transform keeps the values it had last."""
+
+    @property
+    def Space(self) -> glm.mat4:
+        # the arrays can be changed by the joint, so the space is not cached
+        return glm.scale(glm.translate(self.Position), self.Scale) * glm.mat4_cast(self.Rotation)
+
+    @property
+    def _Position(self) -> glm.vec3:
+        return self.__readValue(1, glm.vec3)
+
+    @_Position.setter
+    def _Position(self, value: glm.vec3) -> None:
+        self.__writeValue(1, glm.vec3(value))
+
+    @property
+    def _Rotation(self) -> glm.quat:
+        return self.__readValue(2, glm.quat)
+
+    @_Rotation.setter
+    def _Rotation(self, value: glm.quat) -> None:
+        self.__writeValue(2, glm.quat(value))
+
+    @property
+    def _Scale(self) -> glm.vec3:
+        return self.__readValue(3, glm.vec3)
+
+    @_Scale.setter
+    def _Scale(self, value: glm.vec3) -> None:
+        self.__writeValue(3, glm.vec3(value))
+
+    def __init__(self, joint: Joint, frame: int) -> None:
+        self._Joint: Joint = None
+        self._Frame = frame
+        self._Values: dict[int, object] = {}
+        super().__init__(name=f'Key {frame}')
+        self._Joint = joint
+
+    def __findIndex(self) -> Optional[int]:
+        # the index is searched on every access, because keyframes may be inserted or removed before this one
+        if self._Joint is None or self._Joint._Keyframes is not None:
+            return None
+        frames = self._Joint._KeyframeArrays[0]
+        index = int(numpy.searchsorted(frames, self._Frame))
+        return index if index < len(frames) and frames[index] == self._Frame else None
+
+    def __readValue(self, column: int, kind: type) -> object:
+        index = self.__findIndex()
+        if index is not None:
+            self._Values[column] = kind(*self._Joint._KeyframeArrays[column][index].tolist())
+        return kind(self._Values[column])
+
+    def __writeValue(self, column: int, value: object) -> None:
+        self._Values[column] = value
+        index = self.__findIndex()
+        if index is not None:
+            self._Joint._KeyframeArrays[column][index] = value.to_list()
+            self._Joint._KeyframeSamples = None
+            self._Joint._InterpolationCache.clear()
@@ -0,0 +1,47 @@
+import filecmp
+import os
+import tempfile
+import unittest
+import bvhio
+import benchmarks
+
+
+class Generator(unittest.TestCase):
+    def test_generateBvh(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = benchmarks.generateBvh(os.path.join(directory, 'a.bvh'), joints=30, depth=8, frames=50, channels='mixed', seed=3)
+            again = benchmarks.generateBvh(os.path.join(directory, 'b.bvh'), joints=30, depth=8, frames=50, channels='mixed', seed=3)
+            self.assertTrue(filecmp.cmp(path, again, shallow=False))
+            bvh = bvhio.readAsBvh(path)
+
+        layout = bvh.Root.layout()
+        self.assertEqual(len(layout), 30)
+        self.assertEqual(max(depth for _, _, depth in layout), 7)
+        self.assertEqual(bvh.FrameCount, 50)
+        self.assertEqual(bvh.Motion.shape, (50, sum(len(joint.Channels) for joint, _, _ in layout)))
+
+    def test_generateBvh_invalid(self):
+        with self.assertRaises(ValueError):
+            benchmarks.generateBvh('unused.bvh', joints=5, depth=6)
+        with self.assertRaises(ValueError):
+            benchmarks.generateBvh('unused.bvh', channels='unknown')
+
+
+class Suite(unittest.TestCase):
+    def test_runBenchmarks(self):
+        grid = [{'joints': 5, 'depth': 3, 'frames': 10, 'channels': 'rotation'}]
+        results = benchmarks.runBenchmarks(grid, ['readAsBvh', 'forwardKinematics'], repeat=1)
+        self.assertEqual([result['name'] for result in results['results']], ['readAsBvh', 'forwardKinematics'])
+        self.assertGreater(results['results'][0]['peakBytes'], 0)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'results.json')
+            benchmarks.saveResults(path, results)
+            loaded = benchmarks.loadResults(path)
+
+        comparison = benchmarks.compareResults(loaded, results)
+        self.assertEqual(len(comparison), 2)
+        self.assertFalse(any(result['regression'] for result in comparison))
+
+        slower = {**results, 'results': [{**result, 'best': result['best'] * 2} for result in results['results']]}
+        self.assertTrue(all(result['regression'] for result in benchmarks.compareResults(results, slower)))
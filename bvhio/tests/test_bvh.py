@@ -1,6 +1,7 @@
 import unittest
 import bvhio
 import glm
+import numpy
 from .utils import *
 
 class Container(unittest.TestCase):
@@ -13,6 +14,10 @@ class Container(unittest.TestCase):
     def test_FrameCount(self):
         self.assertEqual(self.instance.FrameCount, 2)
 
+    def test_Motion(self):
+        channels = sum(len(j.Channels) for j, i, d in self.instance.Root.layout())
+        self.assertEqual(self.instance.Motion.shape, (2, channels))
+
 class BvhJoint(unittest.TestCase):
     def setUp(self):
         self.instance = bvhio.readAsBvh('bvhio/tests/example.bvh').Root
@@ -102,3 +107,35 @@ class BvhJoint(unittest.TestCase):
                 self.assertEqual(pose.Position, self.frames[i][frame][0])
                 self.assertEqual(pose.Scale, glm.vec3(1))
                 self.assertGreater(1e-05, glm.length(pose.Rotation - self.frames[i][frame][1]))
+
+    def test_getKeyframePositions(self):
+        for j, i, d in self.instance.layout():
+            positions = j.getKeyframePositions()
+            self.assertEqual(positions.shape, (len(self.frames[i]), 3))
+            for frame, position in enumerate(positions):
+                self.assertGreater(1e-05, deviationPosition(glm.vec3(position), self.frames[i][frame][0]))
+
+    def test_getKeyframeRotations(self):
+        for j, i, d in self.instance.layout():
+            rotations = j.getKeyframeRotations()
+            self.assertEqual(rotations.shape, (len(self.frames[i]), 4))
+            for frame, rotation in enumerate(rotations):
+                self.assertGreater(1e-05, deviationQuaternion(glm.quat(*rotation), self.frames[i][frame][1]))
+
+    def test_getKeyframeRotations_float32(self):
+        # float32 rotations are the quaternions of the keyframe poses, like Euler.toQuatFrom() creates them
+        for j, i, d in self.instance.layout():
+            rotations = j.getKeyframeRotations(numpy.float32)
+            self.assertEqual(rotations.dtype, numpy.float32)
+            self.assertEqual(rotations.tolist(), [pose.Rotation.to_list() for pose in j.Keyframes])
+
+    def test_setKeyframes(self):
+        positions = numpy.array([[1, 2, 3], [4, 5, 6]], dtype=numpy.float32)
+        rotations = numpy.array([[1, 0, 0, 0], [0, 1, 0, 0]], dtype=numpy.float32)
+        self.instance.setKeyframes(positions, rotations)
+        self.assertIsNone(self.instance.Motion)
+        self.assertEqual(self.instance.getKeyframeCount(), 2)
+        self.assertEqual(self.instance.getKeyframePositions().tolist(), positions.tolist())
+        self.assertEqual([pose.Rotation for pose in self.instance.Keyframes], [glm.quat(1, 0, 0, 0), glm.quat(0, 1, 0, 0)])
+        with self.assertRaises(ValueError):
+            self.instance.setKeyframes(positions, rotations[:1])
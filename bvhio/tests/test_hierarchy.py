@@ -1,6 +1,7 @@
 import unittest
 import bvhio
 import glm
+import numpy
 from .utils import *
 
 Joints = [ # for j, i, d in root.layout(): print(f"( {d}, {len(j.Children)}, {len(j.Keyframes)}, {j.KeyframeRange}, '{j.Name}', ),")
@@ -280,3 +281,236 @@ class Methods(unittest.TestCase):
         self.assertGreater(1e-04, deviationPosition((+.3,1,0), lowerLegL.PositionWorld))
         self.assertGreater(1e-04, deviationPosition((-.3,2.1,0), upperLegR.PositionWorld))
         self.assertGreater(1e-04, deviationPosition((-.3,1,0), lowerLegR.PositionWorld))
+
+class KeyframeArrays(unittest.TestCase):
+    def assertSamePose(self, a: bvhio.Joint, b: bvhio.Joint):
+        for (jointA, _, _), (jointB, _, _) in zip(a.layout(), b.layout()):
+            self.assertEqual(jointA.PositionWorld, jointB.PositionWorld)
+            self.assertEqual(jointA.RotationWorld, jointB.RotationWorld)
+            self.assertEqual(jointA.ScaleWorld, jointB.ScaleWorld)
+
+    def test_readAsHierarchy(self):
+        instance = bvhio.readAsHierarchy('bvhio/tests/example.bvh')
+        transforms = bvhio.readAsHierarchy('bvhio/tests/example.bvh')
+        for joint, _, _ in instance.layout():
+            self.assertEqual(joint.getKeyframeCount(), 2)
+            self.assertEqual(len(joint.RestPose.Children), 0)
+        for joint, _, _ in transforms.layout():
+            self.assertEqual(len(joint.Keyframes), 2)
+            self.assertEqual(len(joint.RestPose.Children), 2)
+
+        for frame in [0, 1, 5, -1]:
+            self.assertSamePose(instance.loadPose(frame), transforms.loadPose(frame))
+            self.assertSamePose(instance.loadKeyframe(frame), transforms.loadKeyframe(frame))
+
+    def test_setKeyframes(self):
+        arrays = bvhio.Joint('Arrays')
+        transforms = bvhio.Joint('Transforms')
+        positions = [randomPosition() for _ in range(3)]
+        rotations = [randomRotation() for _ in range(3)]
+        arrays.setKeyframes([0, 4, 9], [p.to_list() for p in positions], [r.to_list() for r in rotations])
+        for frame, position, rotation in zip([0, 4, 9], positions, rotations):
+            transforms.setKeyframe(frame, bvhio.Transform(position=position, rotation=rotation))
+
+        self.assertEqual(arrays.getKeyframeRange(), (0, 9))
+        for frame in range(11):
+            self.assertSamePose(arrays.loadPose(frame), transforms.loadPose(frame))
+
+        with self.assertRaises(ValueError):
+            arrays.setKeyframes([4, 0], [(0, 0, 0)] * 2, [(1, 0, 0, 0)] * 2)
+        with self.assertRaises(ValueError):
+            arrays.setKeyframes([0, 4], [(0, 0, 0)] * 2, [(1, 0, 0, 0)] * 3)
+
+    def test_setKeyframes_copy(self):
+        # the joint owns its arrays, changing its keyframes does not change the arrays of the caller
+        motion = numpy.arange(5 * 7, dtype=numpy.float64).reshape((5, 7)) / 10
+        frames = numpy.arange(5)
+        expected = motion.copy()
+        joint = bvhio.Joint('Arrays').setKeyframes(frames, motion[:, :3], motion[:, 3:], dtype=numpy.float64)
+        joint.setKeyframe(2, bvhio.Transform(position=(9, 9, 9)), keep=None)
+        joint.getKeyframe(3).Rotation = glm.quat()
+        joint.removeKeyframe(4)
+        self.assertTrue((motion == expected).all())
+        self.assertTrue((frames == numpy.arange(5)).all())
+        self.assertEqual(joint.getKeyframePositions()[2].tolist(), [9, 9, 9])
+
+    def test_setKeyframes_dtype(self):
+        joint = bvhio.Joint('Arrays')
+        positions = numpy.array([[0.1, 0.2, 0.3], [1e-09, 2, 3]])
+        joint.setKeyframes([0, 1], positions, [(1, 0, 0, 0)] * 2)
+        self.assertEqual(joint.getKeyframePositions().dtype, numpy.float32)
+        joint.setKeyframes([0, 1], positions, [(1, 0, 0, 0)] * 2, dtype=numpy.float64)
+        self.assertTrue((joint.getKeyframePositions() == positions).all())
+
+        # resampling keeps the precision of the arrays
+        joint.resample(1, 0.5)
+        self.assertEqual(joint.getKeyframeRotations().dtype, numpy.float64)
+        self.assertEqual(joint.getKeyframeRange(), (0, 2))
+
+    def test_setKeyframe(self):
+        instance = bvhio.readAsHierarchy('bvhio/tests/example.bvh')
+        transforms = bvhio.readAsHierarchy('bvhio/tests/example.bvh')
+        for joint, _, _ in transforms.layout():
+            joint.Keyframes
+
+        for root in [instance, transforms]:
+            chest = root.filter('Chest')[0]
+            chest.setKeyframe(6, bvhio.Transform(position=(1, 2, 3), rotation=glm.angleAxis(1, (0, 0, 1))))
+            chest.setKeyframe(0, bvhio.Transform(scale=(1, 2, 1)), keep=['rotation'])
+            chest.removeKeyframe(1)
+            chest.removeKeyframe(3)
+
+        self.assertEqual(instance.filter('Chest')[0].getKeyframeFrames().tolist(), [0, 6])
+        self.assertEqual(transforms.filter('Chest')[0].getKeyframeFrames().tolist(), [0, 6])
+        for frame in range(8):
+            self.assertSamePose(instance.loadPose(frame), transforms.loadPose(frame))
+            self.assertEqual(instance.filter('Chest')[0].getKeyframe(frame).Position, transforms.filter('Chest')[0].getKeyframe(frame).Position)
+
+    def test_getKeyframe(self):
+        instance = bvhio.readAsHierarchy('bvhio/tests/example.bvh')
+        transforms = bvhio.readAsHierarchy('bvhio/tests/example.bvh')
+        instance.filter('Chest')[0].getKeyframe(1).Position = (1, 2, 3)
+        transforms.filter('Chest')[0].Keyframes[1][1].Position = (1, 2, 3)
+
+        # stored keyframes are returned as they are, also if they were stored as arrays, the other keyframes stay arrays
+        self.assertEqual(instance.filter('Chest')[0].getKeyframe(1).Position, glm.vec3(1, 2, 3))
+        self.assertIsNone(instance.filter('Chest')[0]._Keyframes)
+        for frame in range(3):
+            self.assertSamePose(instance.loadPose(frame), transforms.loadPose(frame))
+
+    def test_getKeyframe_arrays(self):
+        instance = bvhio.readAsHierarchy('bvhio/tests/example.bvh').filter('Chest')[0]
+        transforms = bvhio.readAsHierarchy('bvhio/tests/example.bvh').filter('Chest')[0]
+        transforms.Keyframes
+
+        key, reference = instance.getKeyframe(1), transforms.getKeyframe(1)
+        self.assertIsNone(instance._Keyframes)
+        self.assertEqual(key.Space, reference.Space)
+        self.assertEqual(key.RotationWorld, reference.RotationWorld)
+        for pose in [key, reference]:
+            pose.RotationWorld = glm.angleAxis(1, glm.vec3(0, 1, 0))
+            pose.setEuler((10, 20, 30))
+            pose.Scale = (1, 2, 1)
+
+        # the key follows its frame id, also if keyframes are inserted or removed before it
+        for joint in [instance, transforms]:
+            joint.setKeyframe(5, bvhio.Transform(position=(1, 1, 1)))
+            joint.removeKeyframe(0)
+        self.assertIsNone(instance._Keyframes)
+        self.assertEqual(key.Rotation, instance.getKeyframe(1).Rotation)
+        self.assertTrue(numpy.array_equal(instance.getKeyframeRotations(), transforms.getKeyframeRotations()))
+        self.assertTrue(numpy.array_equal(instance.getKeyframeScales(), transforms.getKeyframeScales()))
+        for frame in [0, 1, 2.5, 5]:
+            self.assertEqual(instance.getKeyframe(frame).Rotation, transforms.getKeyframe(frame).Rotation)
+
+        # a removed key keeps its values and does not change the animation anymore
+        instance.removeKeyframe(1)
+        key.Position = (7, 8, 9)
+        self.assertEqual(key.Scale, glm.vec3(1, 2, 1))
+        self.assertEqual(instance.getKeyframeFrames().tolist(), [5])
+
+class Interpolation(unittest.TestCase):
+    def createJoint(self) -> bvhio.Joint:
+        joint = bvhio.Joint('Joint')
+        joint.setKeyframe(10, bvhio.Transform(position=(0, 0, 0), rotation=glm.angleAxis(0, (0, 1, 0))))
+        joint.setKeyframe(20, bvhio.Transform(position=(10, 0, 0), rotation=glm.angleAxis(glm.radians(160), (0, 1, 0))))
+        return joint
+
+    def test_weight(self):
+        joint = self.createJoint()
+        for frame in [12, 15, 19]:
+            key = joint.getKeyframe(frame)
+            weight = (frame - 10) / 10
+            self.assertGreater(1e-05, deviationPosition(key.Position, (10 * weight, 0, 0)))
+            self.assertGreater(1e-05, deviationQuaternion(key.Rotation, glm.angleAxis(glm.radians(160 * weight), (0, 1, 0))))
+
+    def test_outOfRange(self):
+        joint = self.createJoint()
+        self.assertEqual(joint.getKeyframe(5).Position, glm.vec3(0, 0, 0))
+        self.assertEqual(joint.getKeyframe(25).Position, glm.vec3(10, 0, 0))
+
+    def test_invalidation(self):
+        joint = self.createJoint()
+        joint.loadKeyframe(15)
+        self.assertGreater(1e-05, deviationPosition(joint.Position, (5, 0, 0)))
+
+        joint.setKeyframe(20, bvhio.Transform(position=(20, 0, 0)))
+        joint.loadKeyframe(15)
+        self.assertGreater(1e-05, deviationPosition(joint.Position, (10, 0, 0)))
+
+        joint.removeKeyframe(20)
+        joint.loadKeyframe(15)
+        self.assertGreater(1e-05, deviationPosition(joint.Position, (0, 0, 0)))
+
+        joint.Keyframes[0][1].Position = (0, 4, 0)
+        joint.loadKeyframe(15)
+        self.assertGreater(1e-05, deviationPosition(joint.Position, (0, 4, 0)))
+
+    def test_editedKeys(self):
+        joint = bvhio.Joint('Joint')
+        joint.setKeyframe(0, bvhio.Transform(position=(0, 0, 0)))
+        joint.setKeyframe(10, bvhio.Transform(position=(10, 0, 0)))
+
+        # keys that were handed out before the interpolation can still be changed
+        key = joint.getKeyframe(10)
+        self.assertGreater(1e-05, deviationPosition(joint.getKeyframe(5).Position, (5, 0, 0)))
+        key.Position = (20, 0, 0)
+        self.assertGreater(1e-05, deviationPosition(joint.getKeyframe(5).Position, (10, 0, 0)))
+
+        keyframes = joint.Keyframes
+        self.assertGreater(1e-05, deviationPosition(joint.loadPose(5).Position, (10, 0, 0)))
+        keyframes[1][1].Position = (30, 0, 0)
+        self.assertGreater(1e-05, deviationPosition(joint.getKeyframe(5).Position, (15, 0, 0)))
+        self.assertGreater(1e-05, deviationPosition(joint.loadPose(5).Position, (15, 0, 0)))
+
+    def test_editedKeyframeList(self):
+        joint = self.createJoint()
+        joint.setKeyframe(30, bvhio.Transform(position=(30, 0, 0)))
+
+        # the same number of keyframes, but other frame ids
+        key = joint.Keyframes[1][1]
+        joint.Keyframes[1] = (25, key)
+        self.assertGreater(1e-05, deviationPosition(joint.getKeyframe(22).Position, (8, 0, 0)))
+        self.assertIs(joint.getKeyframe(25), key)
+        self.assertIsNot(joint.getKeyframe(20), key)
+
+    def test_resample(self):
+        instance = bvhio.readAsHierarchy('bvhio/tests/example.bvh')
+        reference = bvhio.readAsHierarchy('bvhio/tests/example.bvh')
+        instance.resample(1/30, 1/120)
+        for joint, _, _ in instance.layout():
+            self.assertEqual(joint.getKeyframeRange(), (0, 4))
+
+        for frame in range(5):
+            instance.loadPose(frame)
+            for (joint, _, _), (expected, _, _) in zip(instance.layout(), reference.layout()):
+                key = expected.getKeyframe(0)
+                self.assertGreater(1e-04, deviationPosition(joint.Position, expected.RestPose.SpaceWorld * glm.mix(key.Position, expected.getKeyframe(1).Position, frame / 4)))
+                self.assertGreater(1e-05, deviationQuaternion(joint.Rotation, expected.RestPose.Rotation * glm.slerp(key.Rotation, expected.getKeyframe(1).Rotation, frame / 4)))
+
+        instance.resample(1/120, 1/30)
+        for joint, _, _ in instance.layout():
+            self.assertEqual(joint.getKeyframeRange(), (0, 1))
+
+    def test_sampleKeyframes(self):
+        joint = self.createJoint()
+        frames = numpy.array([0, 10, 12, 15, 19, 20, 25])
+        positions, rotations, scales = joint.sampleKeyframes(frames)
+        self.assertEqual(positions.shape, (len(frames), 3))
+        self.assertEqual(rotations.shape, (len(frames), 4))
+        self.assertEqual(scales.shape, (len(frames), 3))
+        for frame, position, rotation in zip(frames, positions, rotations):
+            key = joint.getKeyframe(int(frame))
+            self.assertGreater(1e-05, deviationPosition(key.Position, glm.vec3(*position)))
+            self.assertGreater(1e-05, deviationQuaternion(key.Rotation, glm.quat(*rotation)))
+
+    def test_sampleKeyframes_float32(self):
+        joint = self.createJoint()
+        frames = numpy.arange(-2, 26)
+        positions, rotations, scales = joint.sampleKeyframes(frames, numpy.float32)
+        self.assertEqual(positions.dtype, numpy.float32)
+        for frame, position, rotation, scale in zip(frames.tolist(), positions.tolist(), rotations.tolist(), scales.tolist()):
+            key = joint.getKeyframe(max(frame, 0))
+            self.assertEqual(position, key.Position.to_list())
+            self.assertEqual(rotation, key.Rotation.to_list())
+            self.assertEqual(scale, key.Scale.to_list())
@@ -1,5 +1,19 @@
+import gzip
+import io
+import lzma
+import mmap
+import os
+import re
+import shutil
+import tempfile
+import threading
 import unittest
+import unittest.mock
+from typing import Callable
 import bvhio
+from bvhio.lib.Compression import detectCompression
+import glm
+import numpy
 
 class Parser(unittest.TestCase):
     def test_readAsBVH(self):
@@ -12,3 +26,803 @@ class Parser(unittest.TestCase):
     def test_readAsHierarchy(self):
         data = bvhio.readAsHierarchy('bvhio/tests/example.bvh')
         self.assertEqual(bvhio.Joint, type(data))
+
+    def test_readAsBvh_malformedKeyframe(self):
+        with open('bvhio/tests/example.bvh') as file:
+            lines = file.read().split('\n')
+        frame = [line.startswith('Frame Time') for line in lines].index(True) + 1
+        lines[frame] = lines[frame].replace('8.03', '8.O3')
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'malformed.bvh')
+            with open(path, 'w') as file:
+                file.write('\n'.join(lines))
+            with self.assertRaises(SyntaxError):
+                bvhio.readAsBvh(path)
+
+    def test_readAsBvh_lineEndings(self):
+        # lines may end with a line feed, a carriage return and line feed, or a bare carriage return like text files
+        reference = bvhio.readAsBvh('bvhio/tests/example.bvh')
+        with open('bvhio/tests/example.bvh', 'rb') as file:
+            data = file.read().replace(b'\r\n', b'\n')
+        frames = 60
+        data = re.sub(rb'Frames:\s+\d+', f'Frames: {frames}'.encode(), data)
+        data = data[:data.index(b'Frame Time')] + data[data.index(b'Frame Time'):].split(b'\n', 1)[0] + b'\n'
+        motion = numpy.arange(frames * reference.Motion.shape[1]).reshape((frames, -1)) / 10
+        data += b''.join(b'\t' + ' '.join(str(value) for value in row).encode() + b'\n' for row in motion.tolist())
+
+        with tempfile.TemporaryDirectory() as directory:
+            for newline in [b'\r\n', b'\r']:
+                path = os.path.join(directory, 'lines.bvh')
+                with open(path, 'wb') as file:
+                    file.write(data.replace(b'\n', newline))
+                with open(path, 'rb') as file, gzip.open(f'{path}.gz', 'wb') as compressed:
+                    compressed.write(file.read())
+
+                for bvh in [bvhio.readAsBvh(path), bvhio.readAsBvh(path, workers=2), bvhio.readAsBvh(f'{path}.gz'),
+                            bvhio.readAsBvh(data.replace(b'\n', newline)), next(bvhio.iterateBvh(path))]:
+                    self.assertEqual(bvh.FrameCount, frames)
+                    self.assertTrue((bvh.Motion == motion).all())
+                for source in [path, data.replace(b'\n', newline)]:
+                    self.assertTrue((bvhio.readAsBvh(source, start=5, step=7).Motion == motion[5::7]).all())
+                    self.assertTrue((bvhio.readAsBvh(source, stop=10, joints=['Hips']).Motion == motion[:10, :6]).all())
+                with bvhio.BvhIndex(path) as index:
+                    self.assertEqual(index.FrameCount, frames)
+                    self.assertTrue((index.readMotion(40, 50) == motion[40:50]).all())
+                with bvhio.BvhCatalog(':memory:') as catalog:
+                    catalog.scan(directory, workers=1)
+                    self.assertEqual([entry.FrameCount for entry in catalog.find()], [frames, frames])
+
+                # errors report the line of the file, as for files with line feeds
+                malformed = data.replace(b'\n', newline).replace(b'\t0.0 ', b'\tO.0 ')
+                with self.assertRaises(SyntaxError) as expected:
+                    bvhio.readAsBvh(data.replace(b'\t0.0 ', b'\tO.0 '))
+                with self.assertRaises(SyntaxError) as error:
+                    bvhio.readAsBvh(malformed)
+                self.assertEqual(error.exception.lineno, expected.exception.lineno)
+
+    def test_writeBvh(self):
+        data = bvhio.readAsBvh('bvhio/tests/example.bvh')
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'written.bvh')
+            bvhio.writeBvh(path, data, percision=6)
+            written = bvhio.readAsBvh(path)
+
+        self.assertEqual(written.FrameCount, data.FrameCount)
+        self.assertEqual(written.FrameTime, data.FrameTime)
+        self.assertEqual(written.Motion.shape, data.Motion.shape)
+        self.assertGreater(1e-03, abs(written.Motion - data.Motion).max())
+
+
+class Workers(unittest.TestCase):
+    def writeLongFile(self, path: str, frames: int, malformed: int = None) -> None:
+        with open('bvhio/tests/example.bvh') as file:
+            lines = file.read().split('\n')
+        frame = [line.startswith('Frame Time') for line in lines].index(True) + 1
+        motion = [lines[frame + (index % 2)] for index in range(frames)]
+        if malformed is not None:
+            motion[malformed] = motion[malformed].replace('8.03', '8.O3')
+        header = [(f'Frames: {frames}' if line.startswith('Frames') else line) for line in lines[:frame]]
+        with open(path, 'w') as file:
+            file.write('\n'.join(header + motion) + '\n')
+
+    def test_readAsBvh(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'long.bvh')
+            self.writeLongFile(path, 1000)
+            serial = bvhio.readAsBvh(path)
+            parallel = bvhio.readAsBvh(path, workers=2)
+
+        self.assertEqual(parallel.FrameCount, 1000)
+        self.assertTrue((serial.Motion == parallel.Motion).all())
+
+    def test_readAsBvh_malformedKeyframe(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'long.bvh')
+            self.writeLongFile(path, 1000, malformed=900)
+            with self.assertRaises(SyntaxError) as serial:
+                bvhio.readAsBvh(path)
+            with self.assertRaises(SyntaxError) as parallel:
+                bvhio.readAsBvh(path, workers=2)
+
+        self.assertEqual(serial.exception.msg, parallel.exception.msg)
+        self.assertEqual(serial.exception.lineno, parallel.exception.lineno)
+        self.assertEqual(serial.exception.offset, parallel.exception.offset)
+
+
+class Frames(unittest.TestCase):
+    def writeFile(self, path: str, frames: int, malformed: int = None) -> numpy.ndarray:
+        with open('bvhio/tests/example.bvh') as file:
+            lines = file.read().split('\n')
+        frame = [line.startswith('Frame Time') for line in lines].index(True) + 1
+        header = [(f'Frames: {frames}' if line.startswith('Frames') else line) for line in lines[:frame]]
+        motion = numpy.arange(frames * 57).reshape((frames, 57)) / 10
+        rows = [' '.join(str(value) for value in row) for row in motion.tolist()]
+        if malformed is not None:
+            rows[malformed] = rows[malformed].replace('.', ',', 1)
+        rows[5] += '\n  \n'
+        with open(path, 'w') as file:
+            file.write('\n'.join(header + rows) + '\n')
+        return motion
+
+    def test_readAsBvh(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'frames.bvh')
+            motion = self.writeFile(path, 100)
+            for start, stop, step in [(10, 20, None), (None, None, 7), (-15, None, 4), (3, 99, 1), (50, 10, None), (None, 100, None)]:
+                for workers in [None, 2]:
+                    bvh = bvhio.readAsBvh(path, start=start, stop=stop, step=step, workers=workers)
+                    expected = motion[start:stop:step]
+                    self.assertEqual(bvh.FrameCount, len(expected))
+                    self.assertAlmostEqual(bvh.FrameTime, 0.033333 * (step or 1))
+                    self.assertTrue((bvh.Motion == expected).all())
+
+    def test_readAsBvh_windows(self):
+        # rows are found in windows of whole lines, lines may start with whitespace and windows may be shorter than a line
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'frames.bvh')
+            motion = self.writeFile(path, 100)
+            row = ' '.join(str(value) for value in motion[50].tolist())
+            with open(path) as file:
+                text = file.read().replace(f'\n{row}\n', f'\n\t \n  {row}\n')
+            with open(path, 'w') as file:
+                file.write(text)
+            for scanBytes in [64, 1 << 18]:
+                with unittest.mock.patch('bvhio.lib.Parser._SCAN_BYTES', scanBytes):
+                    for start, stop, step in [(40, 60, None), (None, None, 7), (-1, None, None), (51, None, 3)]:
+                        self.assertTrue((bvhio.readAsBvh(path, start=start, stop=stop, step=step).Motion == motion[start:stop:step]).all())
+                    with bvhio.BvhIndex(path) as index:
+                        self.assertTrue((index.readMotion(45, 55) == motion[45:55]).all())
+
+    def test_readAsBvh_missingFrames(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'frames.bvh')
+            self.writeFile(path, 100)
+            with open(path) as file:
+                text = file.read().replace('Frames: 100', 'Frames: 120')
+            with open(path, 'w') as file:
+                file.write(text)
+            with self.assertRaises(SyntaxError) as full:
+                bvhio.readAsBvh(path)
+            with self.assertRaises(SyntaxError) as selected:
+                bvhio.readAsBvh(path, start=90, step=3)
+            self.assertEqual(full.exception.lineno, selected.exception.lineno)
+
+    def test_readAsBvh_cache(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'frames.bvh')
+            motion = self.writeFile(path, 100)
+            cache = bvhio.BvhCache(os.path.join(directory, 'cache'))
+            bvhio.readAsBvh(path, cache=cache, start=10, stop=20)
+            self.assertEqual(cache.getSize(), 0)
+            bvhio.readAsBvh(path, cache=cache)
+            bvh = bvhio.readAsBvh(path, cache=cache, start=10, step=3)
+            self.assertEqual(bvh.FrameCount, 30)
+            self.assertTrue((bvh.Motion == motion[10::3]).all())
+            del bvh
+
+    def test_readAsBvh_malformedKeyframe(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'frames.bvh')
+            self.writeFile(path, 100, malformed=40)
+            with self.assertRaises(SyntaxError) as full:
+                bvhio.readAsBvh(path)
+            with self.assertRaises(SyntaxError) as selected:
+                bvhio.readAsBvh(path, start=30, step=2)
+            self.assertEqual(full.exception.lineno, selected.exception.lineno)
+            self.assertEqual(bvhio.readAsBvh(path, start=41).FrameCount, 59)
+            with self.assertRaises(ValueError):
+                bvhio.readAsBvh(path, step=0)
+
+    def test_readAsHierarchy(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'frames.bvh')
+            self.writeFile(path, 100)
+            reference = bvhio.readAsHierarchy(path)
+            root = bvhio.readAsHierarchy(path, start=20, step=10)
+
+        self.assertEqual(root.getKeyframeRange(), (0, 7))
+        for frame in range(8):
+            root.loadPose(frame)
+            reference.loadPose(20 + frame * 10)
+            for (joint, _, _), (expected, _, _) in zip(root.layout(), reference.layout()):
+                self.assertEqual(joint.PositionWorld, expected.PositionWorld)
+
+
+class Joints(unittest.TestCase):
+    def test_readAsBvh(self):
+        reference = bvhio.readAsBvh('bvhio/tests/example.bvh')
+        columns = {}
+        for joint, index, depth in reference.Root.layout():
+            columns[joint.Name] = numpy.arange(len(joint.Channels)) + sum(len(columns[name]) for name in columns)
+
+        for joints in [['Chest', 'Head'], 'Left.*', re.compile('.*Arm'), lambda joint: joint.Name.startswith('Right')]:
+            bvh = bvhio.readAsBvh('bvhio/tests/example.bvh', joints=joints)
+            selected = [joint.Name for joint, _, _ in bvh.Root.layout() if joint.Channels]
+            self.assertTrue(len(selected) > 0)
+            self.assertEqual(len(bvh.Root.layout()), len(reference.Root.layout()))
+            self.assertTrue((bvh.Motion == reference.Motion[:, numpy.concatenate([columns[name] for name in selected])]).all())
+
+        with self.assertRaises(ValueError):
+            bvhio.readAsBvh('bvhio/tests/example.bvh', joints=['Chest', 'Tail'])
+
+    def test_readAsBvh_blocks(self):
+        # all channels are only decoded for blocks of rows, the motion keeps the columns of the selected joints
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'frames.bvh')
+            motion = Frames().writeFile(path, 100)
+            decode = bvhio.lib.Parser._decodeMotion
+            with unittest.mock.patch('bvhio.lib.Parser._FRAMES_PER_BLOCK', 7), unittest.mock.patch('bvhio.lib.Parser._decodeMotion', wraps=decode) as decoder:
+                for start, step, workers in [(None, None, None), (10, None, None), (3, 4, None), (None, None, 2)]:
+                    bvh = bvhio.readAsBvh(path, joints=['Chest', 'Head'], start=start, step=step, workers=workers)
+                    self.assertTrue((bvh.Motion == motion[start::step][:, [6, 7, 8, 12, 13, 14]]).all())
+            blocks = [call.args[1] for call in decoder.call_args_list if call.args[4:] == ()]
+            self.assertTrue(len(blocks) > 0 and max(blocks) <= 7)
+
+            Frames().writeFile(path, 100, malformed=40)
+            with self.assertRaises(SyntaxError) as full:
+                bvhio.readAsBvh(path)
+            for start, step in [(None, None), (30, 2)]:
+                with self.assertRaises(SyntaxError) as selected:
+                    bvhio.readAsBvh(path, joints='Left.*', start=start, step=step)
+                self.assertEqual(full.exception.lineno, selected.exception.lineno)
+
+    def test_readAsBvh_frames_cache(self):
+        reference = bvhio.readAsBvh('bvhio/tests/example.bvh')
+        with tempfile.TemporaryDirectory() as directory:
+            cache = bvhio.BvhCache(os.path.join(directory, 'cache'))
+            bvhio.readAsBvh('bvhio/tests/example.bvh', cache=cache, joints=['Chest'])
+            self.assertEqual(cache.getSize(), 0)
+            bvhio.readAsBvh('bvhio/tests/example.bvh', cache=cache)
+            for cached in [None, cache]:
+                bvh = bvhio.readAsBvh('bvhio/tests/example.bvh', cache=cached, joints=['Chest'], start=2, step=2)
+                self.assertEqual(bvh.FrameCount, len(reference.Motion[2::2]))
+                self.assertTrue((bvh.Motion == reference.Motion[2::2, 6:9]).all())
+                self.assertEqual(bvh.Root.Channels, [])
+            del bvh
+
+    def test_readAsHierarchy(self):
+        reference = bvhio.readAsHierarchy('bvhio/tests/example.bvh')
+        root = bvhio.readAsHierarchy('bvhio/tests/example.bvh', joints='Left.*')
+        self.assertEqual(root.getKeyframeCount(), 0)
+        self.assertEqual(root.getKeyframeRange(), reference.getKeyframeRange())
+
+        for frame in [0, 5, -1]:
+            root.loadPose(frame)
+            reference.loadPose(frame)
+            for (joint, _, _), (expected, _, _) in zip(root.layout(), reference.layout()):
+                if joint.Name.startswith('Left'):
+                    self.assertEqual(joint.getKeyframeCount(), expected.getKeyframeCount())
+                    self.assertEqual(joint.Rotation, expected.Rotation)
+                else:
+                    self.assertEqual(joint.getKeyframeCount(), 0)
+                    self.assertEqual(joint.Position, joint.RestPose.Position)
+                    self.assertEqual(joint.Rotation, joint.RestPose.Rotation)
+
+
+class Buffers(unittest.TestCase):
+    def test_readAsBvh(self):
+        reference = bvhio.readAsBvh('bvhio/tests/example.bvh')
+        with open('bvhio/tests/example.bvh', 'rb') as file:
+            data = file.read()
+            source = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            sources = [data, bytearray(data), memoryview(data), source, io.BytesIO(data), io.BufferedReader(io.BytesIO(data)), gzip.compress(data)]
+            for source in sources:
+                bvh = bvhio.readAsBvh(source)
+                self.assertEqual(bvh.FrameCount, reference.FrameCount)
+                self.assertTrue((bvh.Motion == reference.Motion).all())
+            sources[3].close()
+
+    def test_readAsBvh_inPlace(self):
+        # buffers are not copied, frames are selected in the buffer and a memory map can be closed after reading
+        reference = bvhio.readAsBvh('bvhio/tests/example.bvh')
+        with open('bvhio/tests/example.bvh', 'rb') as file:
+            source = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            with unittest.mock.patch('io.BytesIO', wraps=io.BytesIO) as copies:
+                for data in [source, memoryview(source)[:]]:
+                    self.assertTrue((bvhio.readAsBvh(data, start=1).Motion == reference.Motion[1:]).all())
+                    self.assertTrue((bvhio.readAsBvh(data, step=2, joints=['Chest']).Motion == reference.Motion[::2, 6:9]).all())
+                    self.assertEqual(bvhio.readAsHierarchy(data).getKeyframeRange(), (0, 1))
+                    del data
+            self.assertTrue(all(len(call.args[0]) < len(source) // 2 for call in copies.call_args_list))
+            source.close()
+
+    def test_readAsBvh_stream(self):
+        reference = bvhio.readAsBvh('bvhio/tests/example.bvh')
+        with open('bvhio/tests/example.bvh', 'rb') as file:
+            data = file.read()
+
+        class Stream(io.RawIOBase):
+            def __init__(self, data: bytes) -> None:
+                self.Data = io.BytesIO(data)
+
+            def readable(self) -> bool:
+                return True
+
+            def readinto(self, buffer) -> int:
+                return self.Data.readinto(buffer)
+
+        # streams that can not seek are read completely, file-like objects are read from their position
+        bvh = bvhio.readAsBvh(io.BufferedReader(Stream(data)), start=1)
+        self.assertTrue((bvh.Motion == reference.Motion[1:]).all())
+
+        stream = io.BytesIO(b'prefix' + data)
+        stream.seek(6)
+        bvh = bvhio.readAsBvh(stream, joints=['Hips'])
+        self.assertTrue((bvh.Motion == reference.Motion[:, :6]).all())
+        self.assertFalse(stream.closed)
+
+        chunks = list(bvhio.iterateBvh(data, chunkSize=1))
+        self.assertEqual([chunk.FrameCount for chunk in chunks], [1, 1])
+
+        root = bvhio.readAsHierarchy(memoryview(data))
+        self.assertEqual(root.getKeyframeRange(), (0, 1))
+
+    def test_writeBvh(self):
+        reference = bvhio.readAsBvh('bvhio/tests/example.bvh')
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'written.bvh')
+            bvhio.writeBvh(path, reference)
+            with open(path, 'rb') as file:
+                expected = file.read()
+
+        self.assertEqual(bvhio.writeBvh(None, reference), expected)
+
+        binary = io.BytesIO()
+        self.assertIsNone(bvhio.writeBvh(binary, reference))
+        self.assertFalse(binary.closed)
+        self.assertEqual(binary.getvalue(), expected)
+
+        text = io.StringIO()
+        bvhio.writeBvh(text, reference)
+        self.assertEqual(text.getvalue().encode(), expected)
+
+        data = bvhio.writeHierarchy(None, bvhio.readAsHierarchy(expected), reference.FrameTime)
+        bvh = bvhio.readAsBvh(data)
+        self.assertEqual(bvh.FrameCount, reference.FrameCount)
+
+
+class Precision(unittest.TestCase):
+    def createMotion(self) -> bvhio.BvhContainer:
+        # values with 4 decimals and magnitudes from 0.0001 to 1000, like captured data
+        reference = bvhio.readAsBvh('bvhio/tests/example.bvh')
+        random = numpy.random.default_rng(0)
+        shape = (500, reference.Motion.shape[1])
+        motion = numpy.round(random.uniform(-1, 1, shape) * 10.0 ** random.integers(0, 4, shape), 4)
+        return bvhio.BvhContainer(reference.Root, len(motion), reference.FrameTime, motion)
+
+    def parseText(self, data: bytes) -> numpy.ndarray:
+        lines = data.decode().split('Frame Time:')[1].splitlines()[1:]
+        return numpy.array([[float(value) for value in line.split()] for line in lines])
+
+    def test_float64(self):
+        # each value is the nearest float64 of the text
+        data = bvhio.writeBvh(None, self.createMotion())
+        read = bvhio.readAsBvh(data)
+        self.assertEqual(read.Motion.dtype, numpy.float64)
+        self.assertTrue((read.Motion == self.parseText(data)).all())
+
+    def test_float32(self):
+        # each value is the nearest float32 of the text
+        data = bvhio.writeBvh(None, self.createMotion())
+        expected = self.parseText(data).astype(numpy.float32)
+        for read in [bvhio.readAsBvh(data, dtype=numpy.float32), bvhio.readAsBvh(data, dtype=numpy.float32, workers=2),
+                     bvhio.readAsBvh(data, dtype=numpy.float32, step=1, start=0), next(bvhio.iterateBvh(data, 1000, numpy.float32))]:
+            self.assertEqual(read.Motion.dtype, numpy.float32)
+            self.assertTrue((read.Motion == expected).all())
+
+        with self.assertRaises(ValueError):
+            bvhio.readAsBvh(data, dtype=numpy.float16)
+
+    def test_cache(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'example.bvh')
+            shutil.copy('bvhio/tests/example.bvh', path)
+            cache = bvhio.BvhCache(os.path.join(directory, 'cache'))
+            bvhio.readAsBvh(path, cache=cache, dtype=numpy.float32)
+            self.assertEqual(cache.load(path).Motion.dtype, numpy.float32)
+            self.assertIsNone(cache.load(path, dtype=numpy.float64))
+
+            parsed = bvhio.readAsBvh(path, cache=cache)
+            self.assertEqual(cache.load(path).Motion.dtype, numpy.float64)
+            single = bvhio.readAsBvh(path, cache=cache, dtype=numpy.float32)
+            self.assertTrue((single.Motion == parsed.Motion.astype(numpy.float32)).all())
+            del parsed, single
+
+
+class Index(unittest.TestCase):
+    def test_readMotion(self):
+        motion = bvhio.readAsBvh('bvhio/tests/example.bvh').Motion
+        with bvhio.BvhIndex('bvhio/tests/example.bvh') as index:
+            self.assertEqual(index.FrameCount, 2)
+            self.assertEqual(index.FrameTime, 0.033333)
+            self.assertEqual(index.readMotion().tolist(), motion.tolist())
+            self.assertEqual(index.readMotion(1).tolist(), motion[1:].tolist())
+            self.assertEqual(index.readFrame(-1).tolist(), motion[-1].tolist())
+
+    def test_readAsBvh(self):
+        bvh = bvhio.readAsBvh('bvhio/tests/example.bvh')
+        with bvhio.BvhIndex('bvhio/tests/example.bvh') as index:
+            frame = index.readAsBvh(1, 2)
+        self.assertEqual(frame.FrameCount, 1)
+        for (joint, _, _), (expected, _, _) in zip(frame.Root.layout(), bvh.Root.layout()):
+            self.assertEqual(joint.Name, expected.Name)
+            self.assertEqual(joint.getKeyframeRotations().tolist(), expected.getKeyframeRotations()[1:].tolist())
+
+    def test_save(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'example.bvh')
+            shutil.copyfile('bvhio/tests/example.bvh', path)
+            with bvhio.BvhIndex(path, save=True) as index:
+                offsets = index.Offsets
+                self.assertTrue(os.path.exists(index.getIndexPath()))
+            with bvhio.BvhIndex(path, save=True) as index:
+                self.assertEqual(index.Offsets.tolist(), offsets.tolist())
+
+
+class Iterate(unittest.TestCase):
+    def test_iterateBvh(self):
+        bvh = bvhio.readAsBvh('bvhio/tests/example.bvh')
+        chunks = list(bvhio.iterateBvh('bvhio/tests/example.bvh', chunkSize=1))
+        self.assertEqual([chunk.FrameCount for chunk in chunks], [1, 1])
+        self.assertEqual([chunk.FrameTime for chunk in chunks], [bvh.FrameTime] * 2)
+        self.assertEqual(numpy.concatenate([chunk.Motion for chunk in chunks]).tolist(), bvh.Motion.tolist())
+        self.assertEqual(chunks[1].Root.getKeyframePositions().tolist(), bvh.Root.getKeyframePositions()[1:].tolist())
+
+    def test_iterateBvh_chunkSize(self):
+        chunks = list(bvhio.iterateBvh('bvhio/tests/example.bvh', chunkSize=10))
+        self.assertEqual([chunk.FrameCount for chunk in chunks], [2])
+
+
+class Writer(unittest.TestCase):
+    def test_write(self):
+        bvh = bvhio.readAsBvh('bvhio/tests/example.bvh')
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'written.bvh')
+            with bvhio.BvhWriter(path, bvh.Root, bvh.FrameTime, percision=6) as writer:
+                writer.write(bvh.Motion[0])
+                writer.write(bvh.Motion)
+                self.assertEqual(writer.FrameCount, 3)
+            written = bvhio.readAsBvh(path)
+
+        self.assertEqual(written.FrameCount, 3)
+        self.assertEqual(written.FrameTime, bvh.FrameTime)
+        self.assertGreater(1e-03, abs(written.Motion - bvh.Motion[[0, 0, 1]]).max())
+
+    def test_write_writeBvh(self):
+        # the same motion is written as the same text by both writers
+        bvh = bvhio.readAsBvh('bvhio/tests/example.bvh')
+        bvh.Root.setMotion(numpy.array([[0, 0, 0, 30, 90, 0], [0, 0, 0, -45, -90, 10]]))
+        bvh = bvhio.readAsBvh(bvhio.writeBvh(None, bvh))
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'written.bvh')
+            with bvhio.BvhWriter(path, bvh.Root, bvh.FrameTime) as writer:
+                writer.write(bvh.Motion[0])
+                writer.write(bvh.Motion[1:])
+            with open(path, 'rb') as file:
+                written = file.read()
+
+        expected = bvhio.writeBvh(None, bvh)
+        self.assertEqual(written.split(b'Frame Time')[1], expected.split(b'Frame Time')[1])
+
+    def test_write_chunks(self):
+        bvh = bvhio.readAsBvh('bvhio/tests/example.bvh')
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'written.bvh')
+            with bvhio.BvhWriter(path, bvh.Root, bvh.FrameTime) as writer:
+                for chunk in bvhio.iterateBvh('bvhio/tests/example.bvh', chunkSize=1):
+                    writer.write(chunk)
+            written = bvhio.readAsBvh(path)
+
+        self.assertEqual(written.FrameCount, 2)
+        self.assertGreater(1e-03, abs(written.Motion - bvh.Motion).max())
+
+    def test_write_gimbalLock(self):
+        # angles at a gimbal lock are written like the glm based conversion of the keyframe poses does
+        bvh = bvhio.readAsBvh('bvhio/tests/example.bvh')
+        bvh.Root.setMotion(numpy.array([[0, 0, 0, 30, 90, 0], [0, 0, 0, -45, -90, 10]]))
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'written.bvh')
+            bvhio.writeBvh(path, bvh, percision=6)
+            written = bvhio.readAsBvh(path)
+
+        expected = [pose.getEuler('ZXY', extrinsic=False) for pose in bvh.Root.Keyframes]
+        self.assertEqual(written.Root.Motion[:, 3:].tolist(), [[round(e.z, 6), round(e.x, 6), round(e.y, 6)] for e in expected])
+
+
+class Golden(unittest.TestCase):
+    # the golden files are written by the per frame writer of the glm types, which the array based writer must match byte for byte
+    def createHierarchy(self, frames: list[int] = range(20)) -> bvhio.Joint:
+        root = bvhio.Joint('Hips', restPose=bvhio.Transform(position=(0, 90, 0)))
+        parent = root
+        for index in range(4):
+            rotation = glm.angleAxis(0.4 * index, glm.normalize(glm.vec3(1, 2, 3)))
+            child = bvhio.Joint(f'Joint{index}', restPose=bvhio.Transform(position=(0, 10, 1), rotation=rotation))
+            parent.attach(child)
+            parent = child
+        for number, (joint, index, depth) in enumerate(root.layout()):
+            for frame in frames:
+                angle = 0.1 * frame + 0.3 * number
+                key = bvhio.Transform(position=(glm.sin(angle), 0.5 * frame, glm.cos(angle) * number),
+                                      rotation=glm.angleAxis(angle, glm.normalize(glm.vec3(glm.cos(angle), 1, number))))
+                joint.setKeyframe(frame, key, keep=None)
+        return root
+
+    def convertPerFrame(self, joint: bvhio.Joint, frames: int, worldSpace: bvhio.Pose = None) -> bvhio.BvhJoint:
+        # the conversion of one glm pose per frame, which takes every keyframe from getKeyframe()
+        worldSpace = bvhio.Pose() if worldSpace is None else worldSpace
+        bvh = bvhio.BvhJoint(joint.Name)
+        bvh.Offset = worldSpace.Space * joint.RestPose.Position
+        bvh.EndSite = (worldSpace.Space * (0, 1, 0)) * glm.length(joint.RestPose.Position) * 0.3
+        keys = [joint.getKeyframe(frame).toPose() for frame in range(frames)]
+
+        worldSpace.Rotation = worldSpace.Rotation * joint.RestPose.Rotation
+        worldSpace.Scale = worldSpace.Scale * joint.RestPose.Scale
+        if 1e-02 < sum(glm.l1Norm(glm.abs(key.Position)) for key in keys):
+            bvh.Channels.extend(['Xposition', 'Yposition', 'Zposition'])
+        if 1e-02 < sum(sum(abs(value) for value in (key.Rotation - glm.quat()).to_list()) for key in keys):
+            bvh.Channels.extend(['Zrotation', 'Xrotation', 'Yrotation'])
+
+        for key in keys:
+            key.Position = bvh.Offset + (worldSpace.Space * key.Position)
+            key.Rotation = (worldSpace.Rotation * key.Rotation) * glm.inverse(worldSpace.Rotation)
+        bvh.Keyframes = keys
+        bvh.Children = [self.convertPerFrame(child, frames, worldSpace.duplicate()) for child in joint.Children]
+        return bvh
+
+    def readGolden(self, name: str) -> bytes:
+        with open(f'bvhio/tests/{name}', 'rb') as file:
+            return file.read()
+
+    def test_writeBvh(self):
+        data = bvhio.writeBvh(None, bvhio.readAsBvh('bvhio/tests/example.bvh'))
+        self.assertEqual(data, self.readGolden('golden_writeBvh.bvh'))
+
+    def test_readAsHierarchy(self):
+        data = bvhio.writeHierarchy(None, bvhio.readAsHierarchy('bvhio/tests/example.bvh'), 0.033333)
+        self.assertEqual(data, self.readGolden('golden_readAsHierarchy.bvh'))
+
+    def test_writeHierarchy(self):
+        data = bvhio.writeHierarchy(None, self.createHierarchy(), 0.033333)
+        self.assertEqual(data, self.readGolden('golden_writeHierarchy.bvh'))
+
+    def test_writeHierarchy_sparse(self):
+        # the frames between keyframes are interpolated, some keyframes are stored as arrays and some rotations have the other sign
+        root = self.createHierarchy([0, 1, 4, 5, 11, 19])
+        for number, (joint, index, depth) in enumerate(root.layout()):
+            rotations = joint.getKeyframeRotations() * numpy.float32([[-1], [1], [1], [-1], [1], [-1]])
+            rotations[3] = rotations[2]
+            if number % 2: joint.setKeyframes(joint.getKeyframeFrames(), joint.getKeyframePositions(), rotations)
+            else: joint.Keyframes = [(frame, bvhio.Transform(position=key.Position, rotation=glm.quat(*rotation))) for (frame, key), rotation in zip(joint.Keyframes, rotations.tolist())]
+
+        expected = bvhio.writeBvh(None, bvhio.BvhContainer(self.convertPerFrame(root, 21), 20, 0.033333))
+        self.assertEqual(bvhio.writeHierarchy(None, root, 0.033333), expected)
+
+
+class Many(unittest.TestCase):
+    def test_readMany(self):
+        paths = ['bvhio/tests/example.bvh', 'bvhio/tests/missing.bvh', 'bvhio/tests/example.bvh']
+        for workers in [1, 2]:
+            results = list(bvhio.readMany(paths, workers=workers, maxPending=1))
+            self.assertEqual([path for path, _, _ in results], paths)
+            self.assertEqual(type(results[0][1]), bvhio.BvhContainer)
+            self.assertEqual(results[0][1].FrameCount, 2)
+            self.assertIsNone(results[1][1])
+            self.assertEqual(type(results[1][2]), FileNotFoundError)
+
+    def test_readMany_unordered(self):
+        paths = ['bvhio/tests/example.bvh'] * 4
+        results = list(bvhio.readMany(paths, workers=2, ordered=False, asHierarchy=True))
+        self.assertEqual(len(results), 4)
+        for _, joint, error in results:
+            self.assertIsNone(error)
+            self.assertEqual(type(joint), bvhio.Joint)
+
+    def test_readMany_unknownCpuCount(self):
+        # os.cpu_count() returns None if the count can not be determined
+        with unittest.mock.patch('os.cpu_count', return_value=None):
+            results = list(bvhio.readMany(['bvhio/tests/example.bvh']))
+        self.assertIsNone(results[0][2])
+
+
+class Cache(unittest.TestCase):
+    def test_readAsBvh(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache = bvhio.BvhCache(os.path.join(directory, 'cache'))
+            parsed = bvhio.readAsBvh('bvhio/tests/example.bvh', cache=cache)
+            cached = bvhio.readAsBvh('bvhio/tests/example.bvh', cache=cache)
+
+        self.assertEqual(type(cached.Motion), numpy.memmap)
+        self.assertTrue((parsed.Motion == cached.Motion).all())
+        self.assertEqual(cached.FrameTime, parsed.FrameTime)
+        self.assertEqual(
+            [(joint.Name, joint.Offset, joint.Channels) for joint, _, _ in cached.Root.layout()],
+            [(joint.Name, joint.Offset, joint.Channels) for joint, _, _ in parsed.Root.layout()])
+
+    def test_invalidate(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'example.bvh')
+            shutil.copy('bvhio/tests/example.bvh', path)
+            cache = bvhio.BvhCache(os.path.join(directory, 'cache'))
+            bvhio.readAsBvh(path, cache=cache)
+
+            # touching the file keeps the entry, because the content is the same
+            os.utime(path, ns=(0, 0))
+            self.assertIsNotNone(cache.load(path))
+
+            with open(path, 'a') as file:
+                file.write('\n')
+            self.assertIsNone(cache.load(path))
+
+    def test_evict(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache = bvhio.BvhCache(os.path.join(directory, 'cache'), maxBytes=0)
+            bvhio.readAsBvh('bvhio/tests/example.bvh', cache=cache)
+            self.assertIsNone(cache.load('bvhio/tests/example.bvh'))
+            self.assertEqual(cache.getSize(), 0)
+
+
+class Catalog(unittest.TestCase):
+    def writeFiles(self, directory: str) -> None:
+        with open('bvhio/tests/example.bvh') as file:
+            text = file.read()
+        os.makedirs(os.path.join(directory, 'long'))
+        shutil.copy('bvhio/tests/example.bvh', os.path.join(directory, 'short.bvh'))
+        with open(os.path.join(directory, 'long', 'long.bvh'), 'w') as file:
+            file.write(text.replace('Frames:    2', 'Frames: 600'))
+        with open(os.path.join(directory, 'other.bvh'), 'w') as file:
+            file.write(text.replace('JOINT Chest', 'JOINT Spine'))
+        with open(os.path.join(directory, 'broken.bvh'), 'w') as file:
+            file.write(text.replace('MOTION', 'NOTION'))
+        with open(os.path.join(directory, 'notes.txt'), 'w') as file:
+            file.write('not a bvh file')
+
+    def test_scan(self):
+        with tempfile.TemporaryDirectory() as directory:
+            self.writeFiles(os.path.join(directory, 'clips'))
+            with bvhio.BvhCatalog(os.path.join(directory, 'catalog.db')) as catalog:
+                counts = catalog.scan(os.path.join(directory, 'clips'), workers=2)
+                self.assertEqual(counts, {'added': 4, 'updated': 0, 'unchanged': 0, 'removed': 0, 'failed': 1})
+                self.assertEqual(len(catalog), 3)
+                self.assertEqual(list(catalog.getErrors()), [os.path.join(directory, 'clips', 'broken.bvh')])
+
+            # a new catalog object reads the stored entries, only changed files are read again
+            os.remove(os.path.join(directory, 'clips', 'other.bvh'))
+            with open(os.path.join(directory, 'clips', 'short.bvh'), 'a') as file:
+                file.write('\n')
+            with bvhio.BvhCatalog(os.path.join(directory, 'catalog.db')) as catalog:
+                counts = catalog.scan(os.path.join(directory, 'clips'), workers=1)
+                self.assertEqual(counts, {'added': 0, 'updated': 1, 'unchanged': 2, 'removed': 1, 'failed': 0})
+                self.assertEqual(len(catalog), 2)
+
+    def test_find(self):
+        reference = bvhio.readAsBvh('bvhio/tests/example.bvh', loadKeyFrames=False)
+        with tempfile.TemporaryDirectory() as directory:
+            self.writeFiles(directory)
+            with bvhio.BvhCatalog(':memory:') as catalog:
+                catalog.scan(directory, workers=1)
+                skeleton = bvhio.hashSkeleton(reference.Root)
+                self.assertEqual(catalog.getSkeletons()[skeleton], 2)
+
+                entries = catalog.find(skeleton=skeleton, minDuration=10)
+                self.assertEqual([entry.Path for entry in entries], [os.path.join(directory, 'long', 'long.bvh')])
+                self.assertEqual(entries[0].FrameCount, 600)
+                self.assertAlmostEqual(entries[0].Duration, 600 * 0.033333)
+                self.assertEqual(entries[0].JointCount, len(reference.Root.layout()))
+                self.assertEqual(entries[0].getRoot().toDict(), reference.Root.toDict())
+
+                entry = catalog.get(os.path.join(directory, 'short.bvh'))
+                self.assertEqual([entry.Path for entry in catalog.find(hash=entry.Hash)], [entry.Path])
+                self.assertEqual(len(catalog.find(frameTime=0.033333, maxFrames=2)), 2)
+                self.assertEqual(len(catalog.find(skeleton='unknown')), 0)
+                self.assertIsNone(catalog.get(os.path.join(directory, 'broken.bvh')))
+
+    def test_scan_unknownCpuCount(self):
+        with tempfile.TemporaryDirectory() as directory, bvhio.BvhCatalog(':memory:') as catalog:
+            self.writeFiles(directory)
+            with unittest.mock.patch('os.cpu_count', return_value=None):
+                self.assertEqual(catalog.scan(directory)['added'], 4)
+
+
+class Compression(unittest.TestCase):
+    def test_writeBvh_readAsBvh(self):
+        reference = bvhio.readAsBvh('bvhio/tests/example.bvh')
+        with tempfile.TemporaryDirectory() as directory:
+            for extension, magic in [('gz', b'\x1f\x8b'), ('bz2', b'BZh'), ('xz', b'\xfd7zXZ'), ('lzma', b'\x5d\x00\x00')]:
+                path = os.path.join(directory, f'example.bvh.{extension}')
+                bvhio.writeBvh(path, reference)
+                with open(path, 'rb') as file:
+                    self.assertEqual(file.read(len(magic)), magic)
+
+                for bvh in [bvhio.readAsBvh(path), bvhio.readAsBvh(path, workers=2), next(bvhio.iterateBvh(path))]:
+                    self.assertEqual(bvh.FrameCount, reference.FrameCount)
+                    self.assertTrue(numpy.allclose(bvh.Motion, reference.Motion))
+                bvh = bvhio.readAsBvh(path, start=1)
+                self.assertTrue(numpy.allclose(bvh.Motion, reference.Motion[1:]))
+
+    def test_detect(self):
+        reference = bvhio.readAsBvh('bvhio/tests/example.bvh')
+        with tempfile.TemporaryDirectory() as directory:
+            # the content decides when reading, not the extension
+            path = os.path.join(directory, 'example.bvh')
+            shutil.copy('bvhio/tests/example.bvh', path)
+            with open(path, 'rb') as file, gzip.open(os.path.join(directory, 'renamed.bvh'), 'wb') as compressed:
+                compressed.write(file.read())
+            bvh = bvhio.readAsHierarchy(os.path.join(directory, 'renamed.bvh'))
+            self.assertEqual(bvh.getKeyframeCount(), reference.FrameCount)
+
+            with self.assertRaises(ValueError):
+                bvhio.BvhIndex(os.path.join(directory, 'renamed.bvh'))
+
+            # legacy lzma files have no magic bytes, they are detected by the default header of the lzma tool
+            legacy = os.path.join(directory, 'legacy.bvh')
+            with open(path, 'rb') as file, open(legacy, 'wb') as compressed:
+                compressed.write(lzma.compress(file.read(), format=lzma.FORMAT_ALONE))
+            self.assertEqual(detectCompression(legacy), 'lzma')
+            self.assertEqual(bvhio.readAsBvh(legacy).FrameCount, reference.FrameCount)
+            self.assertEqual(detectCompression('example.bvh.xz', reading=False), 'xz')
+
+            bvhio.writeBvh(os.path.join(directory, 'example.bvh.gz'), reference)
+            with bvhio.BvhCatalog(':memory:') as catalog:
+                catalog.scan(directory, workers=1)
+                self.assertEqual(len(catalog.find(skeleton=bvhio.hashSkeleton(reference.Root))), 4)
+
+    def test_BvhWriter(self):
+        reference = bvhio.readAsBvh('bvhio/tests/example.bvh')
+        with tempfile.TemporaryDirectory() as directory:
+            for extension in ['xz', 'lzma']:
+                path = os.path.join(directory, f'written.bvh.{extension}')
+                with bvhio.BvhWriter(path, reference.Root, reference.FrameTime) as writer:
+                    writer.write(reference.Motion)
+                    writer.write(reference.Motion[0])
+                bvh = bvhio.readAsBvh(path)
+
+                self.assertEqual(detectCompression(path), extension)
+                self.assertEqual(bvh.FrameCount, reference.FrameCount + 1)
+                self.assertTrue(numpy.allclose(bvh.Motion, numpy.concatenate([reference.Motion, reference.Motion[:1]])))
+
+
+class Profiling(unittest.TestCase):
+    def test_profile(self):
+        with bvhio.profile() as stats:
+            root = bvhio.readAsHierarchy('bvhio/tests/example.bvh')
+            with tempfile.TemporaryDirectory() as directory:
+                bvhio.writeHierarchy(os.path.join(directory, 'written.bvh'), root, 1/30)
+
+        names = list(stats.Stages)
+        self.assertEqual(names[:4], ['readAsHierarchy', 'readAsHierarchy.readAsBvh', 'readAsHierarchy.readAsBvh.header', 'readAsHierarchy.readAsBvh.motion'])
+        self.assertIn('writeHierarchy.writeBvh.motion', names)
+        self.assertEqual(stats.getStage('readAsHierarchy.readAsBvh.header').Objects, 18)
+        self.assertEqual(stats.getStage('readAsHierarchy.readAsBvh.motion').Objects, 2)
+        self.assertEqual(stats.getStage('readAsHierarchy.convertBvhToHierarchy.eulerToQuats').Calls, 18)
+        self.assertGreater(stats.Seconds, stats.getStage('readAsHierarchy').Seconds)
+        self.assertEqual(len(stats.toDict()['stages']), len(names))
+
+    def test_profile_threads(self):
+        # each thread records its own calls, stages of other threads are neither recorded nor nested
+        results = {}
+        ready = threading.Barrier(2)
+
+        def run(name: str, function: Callable) -> None:
+            with bvhio.profile() as stats:
+                ready.wait()
+                for _ in range(20):
+                    function('bvhio/tests/example.bvh')
+            results[name] = stats
+
+        with bvhio.profile() as outer:
+            threads = [threading.Thread(target=run, args=('bvh', bvhio.readAsBvh)), threading.Thread(target=run, args=('hierarchy', bvhio.readAsHierarchy))]
+            for thread in threads: thread.start()
+            for thread in threads: thread.join()
+
+        self.assertEqual(outer.Stages, {})
+        self.assertEqual(results['bvh'].getStage('readAsBvh').Calls, 20)
+        self.assertTrue(all(name.startswith('readAsBvh') for name in results['bvh'].Stages))
+        self.assertEqual(results['hierarchy'].getStage('readAsHierarchy.readAsBvh').Calls, 20)
+        self.assertTrue(all(name.startswith('readAsHierarchy') for name in results['hierarchy'].Stages))
+
+    def test_profile_disabled(self):
+        with bvhio.profile() as stats:
+            pass
+        bvhio.readAsBvh('bvhio/tests/example.bvh')
+        self.assertEqual(stats.Stages, {})
@@ -0,0 +1,135 @@
+import unittest
+import itertools
+import bvhio
+import glm
+import numpy
+from .utils import *
+
+Orders = [''.join(order) for count in range(4) for order in itertools.permutations('XYZ', count)]
+
+
+def randomDegrees(count: int) -> numpy.ndarray:
+    return numpy.array([(randomPosition() * 360).to_list() for _ in range(count)])
+
+
+class Euler(unittest.TestCase):
+    def test_eulerToQuats(self):
+        degrees = randomDegrees(randomSamples // 100)
+        for order, extrinsic in itertools.product(Orders, [False, True]):
+            quats = bvhio.eulerToQuats(degrees, order, extrinsic)
+            self.assertEqual(quats.shape, (len(degrees), 4))
+            for angles, quat in zip(degrees, quats):
+                expected = bvhio.Euler.toQuatFrom(glm.radians(glm.vec3(*angles)), order, extrinsic)
+                self.assertGreater(1e-06, deviationQuaternion(glm.quat(*quat), expected))
+
+    def test_eulerToQuats_float32(self):
+        degrees = randomDegrees(randomSamples // 100).astype(numpy.float32)
+        for order, extrinsic in itertools.product(Orders, [False, True]):
+            quats = bvhio.eulerToQuats(degrees, order, extrinsic)
+            self.assertEqual(quats.dtype, numpy.float32)
+            for angles, quat in zip(degrees, quats):
+                expected = bvhio.Euler.toQuatFrom(glm.radians(glm.vec3(*angles)), order, extrinsic)
+                self.assertEqual(quat.tolist(), expected.to_list())
+
+    def test_eulerToQuats_gimbalLock(self):
+        degrees = numpy.array([[90, 90, 0], [0, 90, 90], [-90, 0, 90], [90, 0, -90]])
+        for order in Orders:
+            for angles, quat in zip(degrees, bvhio.eulerToQuats(degrees, order)):
+                expected = bvhio.Euler.toQuatFrom(glm.radians(glm.vec3(*angles)), order, False)
+                self.assertGreater(1e-06, deviationQuaternion(glm.quat(*quat), expected))
+
+    def test_eulerToQuats_invalidOrder(self):
+        with self.assertRaises(ValueError):
+            bvhio.eulerToQuats(numpy.zeros((1, 3)), 'XWZ')
+
+    def test_quatsToEuler(self):
+        quats = numpy.array([randomRotation().to_list() for _ in range(randomSamples // 100)])
+        for order, extrinsic in itertools.product(bvhio.Euler.getOrders(), [False, True]):
+            degrees = bvhio.quatsToEuler(quats, order, extrinsic)
+            self.assertEqual(degrees.shape, (len(quats), 3))
+            for quat, rotation in zip(quats, bvhio.eulerToQuats(degrees, order, extrinsic)):
+                self.assertGreater(1e-06, 1 - abs(numpy.dot(quat, rotation)))
+
+    def test_quatsToEuler_float32(self):
+        quats = numpy.array([randomRotation().to_list() for _ in range(randomSamples // 100)], dtype=numpy.float32)
+        for order in bvhio.Euler.getOrders():
+            for quat, angles in zip(quats, bvhio.quatsToEuler(quats, order)):
+                expected = bvhio.Pose(rotation=glm.quat(*quat)).getEuler(order, extrinsic=False)
+                self.assertEqual(angles.tolist(), expected.to_list())
+
+    def test_quatsToEuler_gimbalLock(self):
+        degrees = numpy.array([[90, 90, 0], [0, 90, 90], [-90, 0, 90], [90, 0, -90], [0, -90, 45]])
+        for order in bvhio.Euler.getOrders():
+            quats = bvhio.eulerToQuats(degrees, order).astype(numpy.float32)
+            for quat, angles in zip(quats, bvhio.quatsToEuler(quats, order)):
+                expected = bvhio.Pose(rotation=glm.quat(*quat)).getEuler(order, extrinsic=False)
+                self.assertEqual(angles.tolist(), expected.to_list())
+
+    def test_quatsToEuler_invalidOrder(self):
+        with self.assertRaises(ValueError):
+            bvhio.quatsToEuler(numpy.array([[1, 0, 0, 0]]), 'ZX')
+
+
+class Kinematics(unittest.TestCase):
+    def test_quatsToMatrices(self):
+        quats = [randomRotation() for _ in range(100)]
+        matrices = bvhio.quatsToMatrices([quat.to_list() for quat in quats])
+        for quat, matrix in zip(quats, matrices):
+            expected = numpy.array(glm.mat3_cast(quat).to_list()).T
+            self.assertGreater(1e-06, abs(matrix - expected).max())
+
+    def test_slerpQuats(self):
+        a = [randomRotation() for _ in range(100)]
+        b = [randomRotation() for _ in range(100)]
+        weights = numpy.random.rand(100)
+        result = bvhio.slerpQuats([quat.to_list() for quat in a], [quat.to_list() for quat in b], weights)
+        for index in range(100):
+            expected = glm.slerp(a[index], b[index], weights[index])
+            self.assertGreater(1e-05, deviationQuaternion(glm.quat(*result[index]), expected))
+
+    def test_slerpQuats_float32(self):
+        # the other sign takes the other branch, equal quaternions are interpolated linearly
+        a = [randomRotation() for _ in range(100)]
+        b = [-randomRotation() if index % 3 == 0 else a[index] if index % 3 == 1 else randomRotation() for index in range(100)]
+        weights = numpy.random.rand(100).astype(numpy.float32)
+        result = bvhio.slerpQuats(numpy.float32([quat.to_list() for quat in a]), numpy.float32([quat.to_list() for quat in b]), weights)
+        self.assertEqual(result.dtype, numpy.float32)
+        for index in range(100):
+            self.assertEqual(result[index].tolist(), glm.slerp(a[index], b[index], float(weights[index])).to_list())
+
+    def test_forwardKinematics(self):
+        root = bvhio.readAsHierarchy('bvhio/tests/example.bvh')
+        root.RestPose.Scale = glm.vec3(1, 2, 0.5)
+        root.filter('Chest')[0].setKeyframe(6, bvhio.Transform(rotation=randomRotation()))
+        joints = [joint for joint, _, _ in root.layout()]
+
+        positions, rotations = bvhio.forwardKinematics(root, 8)
+        self.assertEqual(positions.shape, (8, len(joints), 3))
+        self.assertEqual(rotations.shape, (8, len(joints), 4))
+        for frame in range(8):
+            root.loadPose(frame)
+            for index, joint in enumerate(joints):
+                self.assertGreater(1e-04, glm.distance(joint.PositionWorld, glm.vec3(*positions[frame, index])))
+                self.assertGreater(1e-05, deviationQuaternion(joint.RotationWorld, glm.quat(*rotations[frame, index])))
+
+    def test_forwardKinematics_dtype(self):
+        root = bvhio.readAsHierarchy('bvhio/tests/example.bvh', dtype=numpy.float64)
+        positions, rotations = bvhio.forwardKinematics(root)
+        single, singleRotations = bvhio.forwardKinematics(root, dtype=numpy.float32)
+        self.assertEqual((single.dtype, singleRotations.dtype), (numpy.float32, numpy.float32))
+        self.assertGreater(1e-06, numpy.abs(single - positions).max() / numpy.abs(positions).max())
+        self.assertGreater(1e-06, numpy.abs(singleRotations - rotations).max())
+        with self.assertRaises(ValueError):
+            bvhio.forwardKinematics(root, dtype=numpy.int32)
+
+    def test_forwardKinematics_subHierarchy(self):
+        root = bvhio.readAsHierarchy('bvhio/tests/example.bvh')
+        arm = root.filter('LeftUpArm')[0]
+        joints = [joint for joint, _, _ in arm.layout()]
+
+        root.loadPose(1)
+        positions, _ = bvhio.forwardKinematics(arm, [0, 1])
+        for frame in [0, 1]:
+            arm.loadPose(frame)
+            for index, joint in enumerate(joints):
+                self.assertGreater(1e-04, glm.distance(joint.PositionWorld, glm.vec3(*positions[frame, index])))